@@ -0,0 +1,156 @@
+"""
+コマ合成のベンチマーク
+
+以前の combine_panels_vertical（全コマを読み込んでから、フル解像度のまま LANCZOS で
+1080×1350 の枠に引き伸ばす）と、scripts/compositor.py（draft / reduce で先に縮小し、
+1コマずつ開いて貼り付ける）で、1ページあたりの時間とピークメモリを比べる。
+
+ピークRSSは実装ごとに別プロセスで測る（ru_maxrss はプロセス内で下がらないため）。
+コマ画像は一時ディレクトリに合成画像を書き出して使う。
+
+使い方:
+    python benchmarks/bench_compositor.py
+    python benchmarks/bench_compositor.py --panel-size 2048x2048 --panels 4 --format jpeg
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+
+from PIL import Image
+
+import compositor
+
+# 以前の combine_panels_vertical のキャンバス
+LEGACY_PAGE_SIZE = (1080, 1350)
+
+
+def peak_rss_mb():
+    """プロセスのピークRSS（MB）。取得できない環境ではNone"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS は bytes
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+def legacy_combine(panel_images):
+    """以前の combine_panels_vertical（scripts/archive/utils.py）"""
+    num_panels = len(panel_images)
+    canvas = Image.new('RGB', LEGACY_PAGE_SIZE, 'white')
+    panel_height = LEGACY_PAGE_SIZE[1] // num_panels
+
+    for i, panel_img in enumerate(panel_images):
+        panel_resized = panel_img.resize((LEGACY_PAGE_SIZE[0], panel_height), Image.Resampling.LANCZOS)
+        canvas.paste(panel_resized, (0, i * panel_height))
+
+    return canvas
+
+
+def make_panels(directory, count, size, image_format):
+    """細かい模様の入ったコマ画像を書き出す（圧縮が効きすぎないようにノイズを混ぜる）"""
+    width, height = size
+    paths = []
+    for i in range(count):
+        noise = Image.effect_noise(size, 40 + i * 10)
+        gradient = Image.linear_gradient('L').resize(size)
+        image = Image.merge('RGB', (noise, gradient, gradient.rotate(90 * (i + 1))))
+        path = Path(directory) / f"panel{i + 1}.{'jpg' if image_format == 'jpeg' else 'png'}"
+        image.save(path, quality=92) if image_format == 'jpeg' else image.save(path)
+        paths.append(str(path))
+    return paths
+
+
+def run_child(implementation, paths, pages, mode):
+    """1つの実装で pages ページ合成し、結果を JSON で標準出力に書く"""
+    baseline = peak_rss_mb()
+    page = None
+
+    start = time.perf_counter()
+    for _ in range(pages):
+        if implementation == 'legacy':
+            # 以前の生成スクリプトは全コマを読み込んだ状態で渡していた
+            images = [Image.open(path) for path in paths]
+            for image in images:
+                image.load()
+            page = legacy_combine(images)
+            del images
+        else:
+            layout = compositor.vertical_layout(len(paths), LEGACY_PAGE_SIZE)
+            page = compositor.compose_page(
+                layout,
+                {number: path for number, path in enumerate(paths, 1)},
+                mode=mode,
+                border_width=0
+            )
+    elapsed = time.perf_counter() - start
+
+    peak = peak_rss_mb()
+    print(json.dumps({
+        'implementation': implementation,
+        'seconds_per_page': elapsed / pages,
+        'peak_rss_mb': peak,
+        'rss_growth_mb': peak - baseline if peak is not None else None,
+        'page_size': list(page.size),
+    }))
+
+
+def measure(implementation, paths, pages, mode):
+    """別プロセスで1つの実装を測る"""
+    command = [
+        sys.executable, __file__, '--child', implementation,
+        '--pages', str(pages), '--mode', mode, '--paths', *paths
+    ]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='コマ合成（combine_panels_vertical / compositor）のベンチマーク')
+    parser.add_argument('--panels', type=int, default=4, help='1ページのコマ数（デフォルト: 4）')
+    parser.add_argument('--panel-size', default='1536x1536', help='コマ画像のサイズ（デフォルト: 1536x1536）')
+    parser.add_argument('--format', choices=['png', 'jpeg'], default='png', help='コマ画像の形式')
+    parser.add_argument('--pages', type=int, default=5, help='合成するページ数（デフォルト: 5）')
+    parser.add_argument('--mode', choices=[compositor.FIT_CROP, compositor.FIT_CONTAIN],
+                        default=compositor.FIT_CROP, help='compositor の縮小方法')
+    parser.add_argument('--json', help='結果をJSONで保存するパス')
+    parser.add_argument('--child', choices=['legacy', 'compositor'], help=argparse.SUPPRESS)
+    parser.add_argument('--paths', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.paths, args.pages, args.mode)
+        return
+
+    size = tuple(int(v) for v in args.panel_size.lower().split('x'))
+
+    with tempfile.TemporaryDirectory(prefix="bench_compositor_") as directory:
+        paths = make_panels(directory, args.panels, size, args.format)
+        results = [measure(name, paths, args.pages, args.mode) for name in ('legacy', 'compositor')]
+
+    print(f"コマ: {args.panels} × {size[0]}x{size[1]} {args.format}、{args.pages}ページ")
+    print(f"{'実装':12} {'秒/ページ':>10} {'ピークRSS(MB)':>14} {'増分(MB)':>10}")
+    for result in results:
+        print(f"{result['implementation']:12} {result['seconds_per_page']:10.3f} "
+              f"{result['peak_rss_mb']:14.1f} {result['rss_growth_mb']:10.1f}")
+
+    legacy, current = results
+    print(f"\n時間: {legacy['seconds_per_page'] / current['seconds_per_page']:.1f}倍速、"
+          f"メモリ増分: {legacy['rss_growth_mb'] - current['rss_growth_mb']:.1f} MB 減")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'args': vars(args), 'results': results}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+展開 → プロンプト → 生成 パイプラインのベンチマーク
+
+stories/ の全ストーリーについて、ローカルのスタブモデル（ネットワークなし）を使って
+各ステージの時間・送受信バイト数・ピークメモリ・ページ/分を計測する。
+並列化・キャッシュ・参照画像縮小などの変更前後で数値を比べるために使う。
+
+使い方:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --latency 5 --count 4 --workers 4
+    python benchmarks/bench_pipeline.py --stories "stories/ai_aruaru_*.yaml" --json bench.json
+"""
+import io
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+import contextlib
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "scripts"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import yaml
+
+import gemini_client
+import generation_cache
+import reference_cache
+import template_registry
+import generate_from_yaml
+from expand_story import expand_simple_story
+from story_bundle import StoryBundle
+from stub_model import StubGenerativeModel
+
+
+def peak_rss_mb():
+    """プロセスのピークRSS（MB）。取得できない環境ではNone"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS は bytes
+    return rss / 1024 / 1024 if sys.platform == 'darwin' else rss / 1024
+
+
+class StageTimer:
+    """ステージごとの所要時間を集計する"""
+
+    def __init__(self):
+        self.totals = {}
+        self.counts = {}
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[stage] = self.totals.get(stage, 0.0) + time.perf_counter() - start
+            self.counts[stage] = self.counts.get(stage, 0) + 1
+
+    def summary(self):
+        return {
+            stage: {
+                'total_s': round(total, 4),
+                'mean_ms': round(total / self.counts[stage] * 1000, 2),
+                'runs': self.counts[stage],
+            }
+            for stage, total in self.totals.items()
+        }
+
+
+def find_stories(pattern):
+    """ベンチマーク対象の簡易ストーリー（scenes 形式のもの）を集める"""
+    stories = []
+    for path in sorted(glob.glob(pattern)):
+        path = Path(path)
+        if path.stem.endswith('_expanded'):
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+        if 'scenes' in data:
+            stories.append(path)
+    return stories
+
+
+def run(stories, latency, count, max_workers, workers, cold):
+    """ベンチマーク本体"""
+    work_dir = Path(tempfile.mkdtemp(prefix='manga-bench-'))
+
+    # 出力・キャッシュを作業ディレクトリに向ける（リポジトリを汚さない）
+    generate_from_yaml.OUTPUT_DIR = work_dir / "output"
+    if cold:
+        reference_cache.REFERENCE_CACHE_DIR = work_dir / "references"
+    reference_cache.clear_memory_cache()
+    template_registry.clear_cache()
+    gemini_client.configure_rate_limit(0)
+
+    model = StubGenerativeModel(latency=latency)
+    timer = StageTimer()
+    quiet = io.StringIO()
+
+    # 1. 展開
+    expanded = []
+    with contextlib.redirect_stdout(quiet):
+        for story in stories:
+            with timer.measure('expand'):
+                expanded.append(expand_simple_story(story, work_dir / f"{story.stem}_expanded.yaml"))
+
+    # 2. 読み込み・プロンプト作成・参照画像
+    with contextlib.redirect_stdout(quiet):
+        for path in expanded:
+            with timer.measure('load'):
+                bundle = StoryBundle.load(path)
+            with timer.measure('yaml_to_prompt'):
+                generate_from_yaml.yaml_to_prompt(bundle.comic_page)
+            with timer.measure('build_prompt'):
+                generate_from_yaml.build_prompt(bundle.prompt_text)
+            with timer.measure('references'):
+                generate_from_yaml.collect_reference_images(bundle)
+
+    # 3. 生成（スタブモデル）
+    def generate(path):
+        with timer.measure('generate_page'):
+            return generate_from_yaml.generate_manga_from_yaml(
+                path, count=count, max_workers=max_workers, model=model,
+                cache_mode=generation_cache.CACHE_OFF
+            )
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(quiet):
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            results = list(executor.map(generate, expanded))
+    generate_wall = time.perf_counter() - start
+
+    pages = sum(1 for result in results if result)
+    return {
+        'stories': len(stories),
+        'pages_generated': pages,
+        'images_generated': sum(len(result) for result in results if result),
+        'latency_s': latency,
+        'count': count,
+        'max_workers': max_workers,
+        'workers': workers,
+        'cold_reference_cache': cold,
+        'stages': timer.summary(),
+        'generate_wall_s': round(generate_wall, 3),
+        'pages_per_minute': round(pages / generate_wall * 60, 2) if generate_wall else None,
+        'api_calls': model.calls,
+        'bytes_sent': model.bytes_sent,
+        'bytes_sent_per_call': model.bytes_sent // model.calls if model.calls else 0,
+        'bytes_received': model.bytes_received,
+        'peak_rss_mb': round(peak_rss_mb(), 1) if peak_rss_mb() is not None else None,
+        'work_dir': str(work_dir),
+    }
+
+
+def print_report(report):
+    """結果を表形式で表示する"""
+    print("=" * 60)
+    print("  パイプライン ベンチマーク")
+    print("=" * 60)
+    print(f"ストーリー数: {report['stories']}  生成ページ: {report['pages_generated']}  "
+          f"生成画像: {report['images_generated']}")
+    print(f"スタブ待ち時間: {report['latency_s']}s  count: {report['count']}  "
+          f"max_workers: {report['max_workers']}  workers: {report['workers']}")
+    print()
+    print(f"{'stage':<16}{'total(s)':>10}{'mean(ms)':>12}{'runs':>8}")
+    for stage, stats in report['stages'].items():
+        print(f"{stage:<16}{stats['total_s']:>10.3f}{stats['mean_ms']:>12.2f}{stats['runs']:>8}")
+    print()
+    print(f"生成の総時間: {report['generate_wall_s']}s  ({report['pages_per_minute']} ページ/分)")
+    print(f"API呼び出し: {report['api_calls']}  送信: {report['bytes_sent']:,} bytes "
+          f"({report['bytes_sent_per_call']:,} bytes/回)  受信: {report['bytes_received']:,} bytes")
+    print(f"ピークRSS: {report['peak_rss_mb']} MB")
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='展開 → プロンプト → 生成 パイプラインのベンチマーク')
+    parser.add_argument('--stories', default=str(PROJECT_ROOT / "stories" / "*.yaml"), help='対象ストーリーのglob')
+    parser.add_argument('--latency', type=float, default=1.0, help='スタブモデルの待ち時間（秒）')
+    parser.add_argument('--count', type=int, default=1, help='ページごとの生成枚数')
+    parser.add_argument('--max-workers', type=int, help='ページごとの同時リクエスト数')
+    parser.add_argument('--workers', type=int, default=1, help='同時に生成するページ数')
+    parser.add_argument('--cold', action='store_true', help='参照画像キャッシュを空の状態から始める')
+    parser.add_argument('--json', help='結果をJSONで保存するパス')
+
+    args = parser.parse_args()
+
+    stories = find_stories(args.stories)
+    if not stories:
+        print("対象のストーリーがありません")
+        sys.exit(1)
+
+    report = run(stories, args.latency, args.count, args.max_workers, args.workers, args.cold)
+    print_report(report)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nJSON: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+CLI の起動時間のベンチマーク
+
+generate_from_yaml.py の import 時間と、--help / --dry-run（YAMLエラー・正常）の所要時間を
+別プロセスで繰り返し測る（中央値）。Python 自体の起動時間（python -c pass）を差し引いた値を
+「起動コスト」とし、検証だけの呼び出しが目標（STARTUP_TARGET_MS）以内かを確認する。
+
+重いモジュール（google.generativeai・PIL）が検証だけの呼び出しで読み込まれていないことも
+-X importtime の出力で確認する（dotenv は本番と同じ設定で検証するために --dry-run でも読む）。
+
+使い方:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --story stories/ai_aruaru_01_expanded.yaml
+"""
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = PROJECT_ROOT / "scripts" / "generate_from_yaml.py"
+
+# 検証だけの呼び出しの起動コストの目標（ms、Python 自体の起動時間を除く）
+STARTUP_TARGET_MS = 100
+
+# 検証だけの呼び出しで読み込まれてはいけないモジュール
+HEAVY_MODULES = ('google.generativeai', 'PIL')
+
+INVALID_YAML = "comic_page:\n  language: Japanese\n  panels: []\n"
+
+
+def wall_ms(command, runs):
+    """コマンドを runs 回実行し、所要時間の中央値（ms）を返す"""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def import_ms(runs):
+    """-X importtime で generate_from_yaml の import 時間（累計、ms）の中央値を返す"""
+    times = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import generate_from_yaml'],
+            cwd=SCRIPT.parent, capture_output=True, text=True
+        )
+        for line in result.stderr.splitlines():
+            fields = line.split('|')
+            if len(fields) == 3 and fields[2].strip() == 'generate_from_yaml':
+                times.append(int(fields[1]) / 1000)
+    return statistics.median(times)
+
+
+def imported_heavy_modules(args):
+    """generate_from_yaml.py を args で実行したときに読み込まれた重いモジュール"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', str(SCRIPT), *args],
+        cwd=PROJECT_ROOT, capture_output=True, text=True
+    )
+    names = {line.split('|')[-1].strip() for line in result.stderr.splitlines() if line.startswith('import time:')}
+    return sorted(module for module in HEAVY_MODULES if module in names)
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='generate_from_yaml.py の起動時間のベンチマーク')
+    parser.add_argument('--runs', type=int, default=10, help='各コマンドの実行回数（デフォルト: 10）')
+    parser.add_argument('--story', default='stories/ai_aruaru_01_expanded.yaml', help='--dry-run に使う展開済みYAML')
+    parser.add_argument('--json', help='結果をJSONで保存するパス')
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml', encoding='utf-8', delete=False) as f:
+        f.write(INVALID_YAML)
+        invalid_path = f.name
+
+    try:
+        baseline = wall_ms([sys.executable, '-c', 'pass'], args.runs)
+        commands = {
+            '--help': ['--help'],
+            '--dry-run (invalid YAML)': [invalid_path, '--dry-run'],
+            '--dry-run --panels (invalid)': [invalid_path, '--dry-run', '--panels'],
+            '--dry-run': [args.story, '--dry-run'],
+            '--dry-run --panels': [args.story, '--dry-run', '--panels'],
+        }
+        results = {
+            name: wall_ms([sys.executable, str(SCRIPT), *command], args.runs) - baseline
+            for name, command in commands.items()
+        }
+        heavy = {name: imported_heavy_modules(command) for name, command in commands.items()}
+        module_ms = import_ms(args.runs)
+    finally:
+        Path(invalid_path).unlink()
+
+    print(f"Python 自体の起動: {baseline:.1f} ms（以下はこれを差し引いた値、{args.runs}回の中央値）\n")
+    print(f"{'import generate_from_yaml':28} {module_ms:8.1f} ms")
+    for name, ms in results.items():
+        loaded = ', '.join(heavy[name]) or 'なし'
+        print(f"{name:28} {ms:8.1f} ms   重いモジュール: {loaded}")
+
+    validation = ('--dry-run (invalid YAML)', '--dry-run --panels (invalid)')
+    validation_ms = max(results[name] for name in validation)
+    ok = validation_ms < STARTUP_TARGET_MS and not any(heavy[name] for name in validation)
+    print(f"\n検証だけの起動コスト: {validation_ms:.1f} ms（目標 {STARTUP_TARGET_MS} ms 未満）→ {'OK' if ok else 'NG'}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'baseline_ms': baseline,
+                'import_ms': module_ms,
+                'startup_ms': results,
+                'heavy_modules': heavy,
+                'ok': ok,
+            }, f, ensure_ascii=False, indent=2)
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+TrendAnalyzer のキーワード検出・文脈分類のベンチマーク
+
+合成タイトルを大量に作り、以前の実装（キーワード × パターンごとに re.search）と
+現在の実装（KeywordMatcher / ContextClassifier による1回走査）、
+ストリーミング集計（TrendAnalyzer.analyze_stream）の結果が一致することを確認したうえで、所要時間を比べる。
+
+使い方:
+    python benchmarks/bench_trend_analyzer.py
+    python benchmarks/bench_trend_analyzer.py --titles 200000
+"""
+import re
+import sys
+import time
+import random
+import argparse
+from pathlib import Path
+from collections import Counter, defaultdict
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "scripts" / "trend_collection"))
+
+from trend_analyzer import TARGET_KEYWORDS, TrendAnalyzer
+
+# 以前の CONTEXT_PATTERNS（前後に (.{0,20}) が付いたもの）
+LEGACY_CONTEXT_PATTERNS = [
+    (r'(.{0,20})(リリース|発表|登場|公開|アップデート)(.{0,20})', 'リリース・アップデート'),
+    (r'(.{0,20})(出る|来た|キタ)(!|！|？|\?)', '速報・噂'),
+    (r'(.{0,20})(使い方|方法|やり方|活用|テクニック)(.{0,20})', '使い方・Tips'),
+    (r'(.{0,20})(便利|すごい|最強|神)(.{0,20})', '評価・レビュー'),
+    (r'(.{0,20})(vs|比較|違い)(.{0,20})', '比較'),
+    (r'(.{0,20})(危険|注意|問題|ヤバい)(.{0,20})', '問題・注意'),
+    (r'(.{0,20})(裏技|秘密|知らない|初心者)(.{0,20})', 'ハウツー'),
+]
+
+# 合成タイトルの部品
+FILLERS = [
+    'の', 'で', 'が', 'を', 'に', '！', '？', '!', '?', ' ', '【速報】', '徹底解説', 'まとめ',
+    '使い方', 'すごい', '比較', 'vs', 'ヤバい', '初心者', 'リリース', '来た', 'キタ', '出る',
+    '神', '活用', '注意', '秘密', 'エンジニア', '仕事', '自動化', '動画', '今日', '新機能',
+]
+
+
+def make_titles(count, seed=0):
+    """キーワードと文脈語を混ぜた合成タイトルを作る"""
+    rnd = random.Random(seed)
+    words = TARGET_KEYWORDS + [k.lower() for k in TARGET_KEYWORDS] + FILLERS * 3
+    return [
+        ''.join(rnd.choice(words) for _ in range(rnd.randint(3, 14)))
+        for _ in range(count)
+    ]
+
+
+def legacy_extract(posts):
+    """以前の extract_keywords + extract_contexts（タイトルを2回走査）"""
+    keyword_counter = Counter()
+    for post in posts:
+        title = post.get('title', '')
+        for keyword in TARGET_KEYWORDS:
+            if re.search(re.escape(keyword), title, re.IGNORECASE):
+                keyword_counter[keyword] += 1
+
+    keyword_contexts = defaultdict(list)
+    for post in posts:
+        title = post.get('title', '')
+        detected_keywords = []
+        for keyword in TARGET_KEYWORDS:
+            if re.search(re.escape(keyword), title, re.IGNORECASE):
+                detected_keywords.append(keyword)
+        for keyword in detected_keywords:
+            context_category = 'その他'
+            for pattern, category in LEGACY_CONTEXT_PATTERNS:
+                if re.search(pattern, title):
+                    context_category = category
+                    break
+            keyword_contexts[keyword].append((title, context_category))
+
+    return keyword_counter, keyword_contexts
+
+
+def current_extract(posts):
+    """現在の TrendAnalyzer"""
+    analyzer = TrendAnalyzer()
+    analyzer.posts = posts
+    return analyzer.extract_keywords(), analyzer.extract_contexts()
+
+
+def legacy_ranking(keyword_counter, keyword_contexts):
+    """以前の analyze() のランキング作成"""
+    ranking = []
+    for keyword, count in keyword_counter.most_common(20):
+        contexts = keyword_contexts.get(keyword, [])
+        ranking.append({
+            'keyword': keyword,
+            'count': count,
+            'contexts': dict(Counter([ctx[1] for ctx in contexts])),
+            'sample_titles': [ctx[0] for ctx in contexts[:5]]
+        })
+    return ranking
+
+
+def stream_analyze(posts):
+    """現在の TrendAnalyzer.analyze_stream（投稿を1件ずつ集計）"""
+    return TrendAnalyzer().analyze_stream(iter(posts))
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='TrendAnalyzer のキーワード検出・文脈分類のベンチマーク')
+    parser.add_argument('--titles', type=int, default=50000, help='合成タイトル数')
+    parser.add_argument('--seed', type=int, default=0, help='乱数シード')
+
+    args = parser.parse_args()
+
+    posts = [{'title': title} for title in make_titles(args.titles, args.seed)]
+    print(f"合成タイトル: {len(posts):,} 件")
+
+    (legacy_counts, legacy_contexts), legacy_time = timed(legacy_extract, posts)
+    (counts, contexts), current_time = timed(current_extract, posts)
+
+    if legacy_counts != counts or dict(legacy_contexts) != dict(contexts):
+        print("✗ 以前の実装と結果が一致しません")
+        sys.exit(1)
+    analysis, stream_time = timed(stream_analyze, posts)
+    if analysis['ranking'] != legacy_ranking(legacy_counts, legacy_contexts):
+        print("✗ analyze_stream のランキングが以前の実装と一致しません")
+        sys.exit(1)
+    print("✓ 以前の実装と結果が一致")
+
+    print(f"\n{'実装':<10}{'時間(s)':>10}{'タイトル/秒':>14}")
+    print(f"{'legacy':<10}{legacy_time:>10.3f}{len(posts) / legacy_time:>14,.0f}")
+    print(f"{'current':<10}{current_time:>10.3f}{len(posts) / current_time:>14,.0f}")
+    print(f"{'stream':<10}{stream_time:>10.3f}{len(posts) / stream_time:>14,.0f}")
+    print(f"\n高速化: {legacy_time / current_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
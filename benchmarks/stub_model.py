@@ -0,0 +1,96 @@
+"""
+ベンチマーク用のローカル GenerativeModel スタブ
+
+ネットワークに出ず、指定した待ち時間のあとに用意済みのPNGを返す。
+送信されたバイト数（参照画像 + プロンプト）も記録する。
+"""
+import time
+import random
+import threading
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+
+from PIL import Image
+
+# 返すPNGのサイズ（実際の生成結果と同じくらい: 1:1.4）
+CANNED_SIZE = (1024, 1434)
+
+
+def make_canned_png(size=CANNED_SIZE) -> bytes:
+    """返却用のPNGを作る（グラデーションで圧縮率を実画像に近づける）"""
+    gradient = Image.linear_gradient('L').resize(size)
+    image = Image.merge('RGB', (gradient, gradient.rotate(90), gradient.transpose(Image.Transpose.FLIP_TOP_BOTTOM)))
+    buffer = BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def part_size(part) -> int:
+    """送信パート1つ分のバイト数を見積もる
+
+    SDKと同じく、ファイル由来の画像はファイルの中身、それ以外はPNGに
+    エンコードしたサイズで数える。
+    """
+    if isinstance(part, str):
+        return len(part.encode('utf-8'))
+    if isinstance(part, (bytes, bytearray)):
+        return len(part)
+    if isinstance(part, dict):
+        return len(part.get('data', b''))
+    if isinstance(part, Image.Image):
+        filename = getattr(part, 'filename', None)
+        if filename and Path(filename).exists():
+            return Path(filename).stat().st_size
+        buffer = BytesIO()
+        part.save(buffer, format='PNG')
+        return buffer.tell()
+    return 0
+
+
+class StubGenerativeModel:
+    """google.generativeai.GenerativeModel の代わりに使うスタブ"""
+
+    def __init__(self, latency: float = 1.0, model_name: str = 'models/stub-image-model',
+                 canned_png: Optional[bytes] = None, failure_rate: float = 0.0):
+        """
+        Args:
+            latency: 1リクエストあたりの待ち時間（秒）
+            model_name: モデル名
+            canned_png: 返すPNG（省略時は make_canned_png）
+            failure_rate: 画像なしレスポンスを返す割合（0-1）
+        """
+        self.latency = latency
+        self.model_name = model_name
+        self.canned_png = canned_png or make_canned_png()
+        self.failure_rate = failure_rate
+        self.random = random.Random(0)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def generate_content(self, contents, request_options=None):
+        sent = sum(part_size(part) for part in contents)
+
+        time.sleep(self.latency)
+
+        with self.lock:
+            self.calls += 1
+            self.bytes_sent += sent
+            failed = self.random.random() < self.failure_rate
+            if not failed:
+                self.bytes_received += len(self.canned_png)
+
+        if failed:
+            parts = [SimpleNamespace(text='No image generated.')]
+        else:
+            parts = [SimpleNamespace(inline_data=SimpleNamespace(mime_type='image/png', data=self.canned_png))]
+        return SimpleNamespace(candidates=[SimpleNamespace(content=SimpleNamespace(parts=parts))])
+
+    def reset_counters(self):
+        with self.lock:
+            self.calls = 0
+            self.bytes_sent = 0
+            self.bytes_received = 0
@@ -8,7 +8,6 @@ import sys
 import yaml
 from pathlib import Path
 from PIL import Image
-import time
 from utils import (
     init_gemini,
     load_character_image,
@@ -19,6 +18,10 @@ from utils import (
     TEMP_DIR
 )
 
+# scripts/ 直下の共有モジュール（gemini_client）を読み込めるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import gemini_client
+
 def load_story(yaml_path):
     """YAMLファイルからストーリーを読み込む"""
     # パスを解決
@@ -68,7 +71,7 @@ def generate_panel(model, panel_data, character_images):
     try:
         # Nano Banana APIでコマ生成
         print(f"  🎨 Nano Banana APIを呼び出し中...")
-        response = model.generate_content([
+        response = gemini_client.generate_content(model, [
             char_img,
             full_prompt
         ])
@@ -141,10 +144,6 @@ def generate_page(model, page_data, character_images, page_num):
         panel_img = generate_panel(model, panel_data, character_images)
         panel_images.append(panel_img)
 
-        # レート制限対策（少し待つ）
-        if i < len(panels):
-            time.sleep(2)
-
     # パネルを縦に結合
     combined = combine_panels_vertical(panel_images)
     return combined
@@ -8,6 +8,10 @@ from PIL import Image, ImageDraw, ImageFont
 from dotenv import load_dotenv
 import google.generativeai as genai
 
+# scripts/ 直下のコンポジターを読み込めるようにする
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from compositor import FIT_CROP, compose_page, vertical_layout
+
 # プロジェクトルートディレクトリ
 PROJECT_ROOT = Path(__file__).parent.parent
 CHARACTERS_DIR = PROJECT_ROOT / "characters"
@@ -53,20 +57,20 @@ def create_instagram_canvas(num_panels=4):
     """Instagram用のキャンバスを作成"""
     return Image.new('RGB', INSTAGRAM_FEED_SIZE, 'white')
 
-def combine_panels_vertical(panel_images):
-    """複数のパネルを縦に結合"""
-    num_panels = len(panel_images)
-    canvas = create_instagram_canvas(num_panels)
-
-    panel_height = INSTAGRAM_FEED_SIZE[1] // num_panels
+def combine_panels_vertical(panel_images, mode=FIT_CROP):
+    """
+    複数のパネルを縦に結合
 
-    for i, panel_img in enumerate(panel_images):
-        # パネルをリサイズ
-        panel_resized = panel_img.resize((INSTAGRAM_FEED_SIZE[0], panel_height), Image.Resampling.LANCZOS)
-        # キャンバスに貼り付け
-        canvas.paste(panel_resized, (0, i * panel_height))
+    scripts/compositor.py で1コマずつ縦横比を保って縮小・貼り付けする。
+    パネルは画像でもファイルパスでもよい（パスなら1枚ずつ開いて閉じる）。
 
-    return canvas
+    Args:
+        panel_images: パネル画像（またはパス）のリスト（上から順）
+        mode: crop（枠いっぱいに中央で切り抜く）/ fit（枠内に収める）
+    """
+    layout = vertical_layout(len(panel_images), INSTAGRAM_FEED_SIZE)
+    panels = {number: image for number, image in enumerate(panel_images, 1)}
+    return compose_page(layout, panels, mode=mode, border_width=0)
 
 def add_text_to_image(image, text, position=(50, 50), font_size=40, color='black'):
     """画像にテキストを追加"""
@@ -0,0 +1,204 @@
+"""
+複数のストーリーYAMLを1つのジョブとして展開・生成
+
+ストーリーごとにプロセスを起動せず、1プロセス内で展開し、
+共有の GenerativeModel とワーカープールでページ生成を並列に行う。
+
+使い方:
+    python batch_generate.py "../stories/ai_aruaru_*.yaml"
+    python batch_generate.py ../stories/episode1.yaml ../stories/episode1_revised.yaml --workers 4
+
+    # 途中で止まったバッチを再開（ジョブ台帳で成功済みの候補は飛ばす）
+    python batch_generate.py "../stories/ai_aruaru_*.yaml" --resume
+"""
+import sys
+import glob
+import uuid
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import generation_cache
+import gemini_client
+import image_writer
+import job_ledger
+from expand_story import expand_simple_story
+from generate_from_yaml import generate_manga_from_yaml, init_model, load_env, resolve_session_folder
+from panel_generator import generate_page_by_panels
+
+def resolve_story_paths(patterns):
+    """パス・globパターンから簡易ストーリーYAMLの一覧を作る
+
+    `_expanded.yaml` は展開済みなので除外する（元のストーリーから再展開する）。
+
+    Args:
+        patterns: ファイルパスまたはglobパターンのリスト
+
+    Returns:
+        list: 重複を除いたストーリーYAMLのパス（指定順）
+    """
+    story_paths = []
+    seen = set()
+
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or [pattern]
+        for match in matches:
+            path = Path(match)
+            if path.stem.endswith('_expanded'):
+                continue
+            if not path.exists():
+                print(f"  ⚠ ストーリーが見つかりません: {path}")
+                continue
+
+            key = path.resolve()
+            if key not in seen:
+                seen.add(key)
+                story_paths.append(path)
+
+    return story_paths
+
+def run_batch(story_paths, session_folder=None, count=1, workers=2, max_workers=1, cache_mode=None,
+              writer=None, show_metrics=False, panels=False, ledger=None, resume=False):
+    """ストーリー群を展開し、共有ワーカープールで生成する
+
+    Args:
+        story_paths: 簡易ストーリーYAMLのパスのリスト
+        session_folder: セッションフォルダ番号（省略時は1つ確保して全ページで共有）
+        count: ページごとの生成枚数（1-4）
+        workers: 同時に生成するページ数
+        max_workers: ページごとの同時リクエスト数
+        cache_mode: 生成キャッシュのモード（off / use / refresh）
+        writer: 全ページで共有する ImageWriter（省略時はページごとにPNGで保存）
+        show_metrics: ページごとの計測結果の表を表示する
+        panels: コマごとに並列生成してローカルで合成する（count は使わない）
+        ledger: ページ・候補ごとの結果を記録する JobLedger（省略可）
+        resume: 台帳で成功済みの候補は生成せずに飛ばす
+
+    Returns:
+        dict: {ストーリーパス: 生成画像パスのリスト or None}
+    """
+    # 1. 展開（ローカル処理なので逐次で十分速い）
+    print(f"\n📚 {len(story_paths)} 件のストーリーを展開中...")
+    expanded = {}
+    results = {}
+    for story_path in story_paths:
+        try:
+            expanded[story_path] = expand_simple_story(story_path)
+        except Exception as e:
+            print(f"  ✗ 展開に失敗しました: {story_path}: {e}")
+            results[story_path] = None
+
+    if not expanded:
+        return results
+
+    # 2. モデルとセッションフォルダは1回だけ用意して全ページで共有
+    model = init_model()
+    session_folder = resolve_session_folder(session_folder)
+    print(f"📁 セッションフォルダ: {session_folder}")
+
+    # 3. ページ単位でワーカープールに投入
+    print(f"\n🎨 {len(expanded)} ページを生成中... (同時ページ数: {workers}, ページ内同時リクエスト数: {max_workers})")
+    if panels:
+        generate, options = generate_page_by_panels, {}
+    else:
+        generate, options = generate_manga_from_yaml, {'count': count}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {
+            executor.submit(
+                generate,
+                expanded_path,
+                session_folder=session_folder,
+                max_workers=max_workers,
+                model=model,
+                cache_mode=cache_mode,
+                writer=writer,
+                show_metrics=show_metrics,
+                ledger=ledger,
+                resume=resume,
+                **options
+            ): story_path
+            for story_path, expanded_path in expanded.items()
+        }
+        for future in as_completed(futures):
+            story_path = futures[future]
+            try:
+                results[story_path] = future.result()
+            except Exception as e:
+                print(f"\n✗ 生成エラー: {story_path}: {type(e).__name__}: {e}")
+                results[story_path] = None
+
+    return results
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='複数のストーリーYAMLを一括で展開・生成')
+    parser.add_argument('stories', nargs='+', help='ストーリーYAMLのパスまたはglobパターン（例: "stories/ai_aruaru_*.yaml"）')
+    parser.add_argument('--session-folder', type=int, help='セッションフォルダ番号（全ページを同じフォルダに保存）')
+    parser.add_argument('--count', type=int, default=1, help='ページごとの生成枚数（1-4、デフォルト1）')
+    parser.add_argument('--workers', type=int, default=2, help='同時に生成するページ数（デフォルト2）')
+    parser.add_argument('--max-workers', type=int, default=1, help='ページごとの同時リクエスト数（デフォルト1）')
+    parser.add_argument('--rpm', type=float, help='1分あたりの最大リクエスト数（全ページ共有、0で無制限）')
+    generation_cache.add_arguments(parser)
+    image_writer.add_arguments(parser)
+    parser.add_argument('--metrics', action='store_true', help='ページごとの計測結果の表を表示する')
+    parser.add_argument('--panels', action='store_true', help='コマごとに並列生成してローカルで合成する（--count は使わない）')
+    job_ledger.add_arguments(parser)
+
+    args = parser.parse_args()
+
+    load_env()
+    if args.rpm is not None:
+        gemini_client.configure_rate_limit(args.rpm)
+
+    print("=" * 60)
+    print("  ストーリー一括生成")
+    print("=" * 60)
+
+    story_paths = resolve_story_paths(args.stories)
+    if not story_paths:
+        print("\n✗ 対象のストーリーがありません")
+        sys.exit(1)
+
+    # 結果は毎回台帳に記録する（--resume を付けた再実行で成功済みの候補を飛ばす）
+    ledger = job_ledger.JobLedger(args.ledger, batch_id=uuid.uuid4().hex[:12])
+    print(f"📒 ジョブ台帳: {ledger.path} (バッチID: {ledger.batch_id})")
+
+    writer = image_writer.from_args(args)
+    try:
+        results = run_batch(
+            story_paths,
+            session_folder=args.session_folder,
+            count=args.count,
+            workers=args.workers,
+            max_workers=args.max_workers,
+            cache_mode=generation_cache.mode_from_args(args),
+            writer=writer,
+            show_metrics=args.metrics,
+            panels=args.panels,
+            ledger=ledger,
+            resume=args.resume
+        )
+    except Exception as e:
+        print(f"\n✗ エラー: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        writer.close()
+
+    # 結果サマリー
+    failed = [path for path, paths in results.items() if not paths]
+    print(f"\n{'=' * 60}")
+    print(f"✓ {len(results) - len(failed)}/{len(results)} ページの生成に成功しました")
+    for path in failed:
+        print(f"  ✗ {path}")
+    if failed:
+        print("\n同じコマンドに --resume を付けて再実行すると、成功済みの候補を飛ばして残りだけ生成します")
+    print(f"{'=' * 60}")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+"""
+コマ画像をページに合成するローカル・コンポジター
+
+templates/layout_patterns.yaml のレイアウトパターンからコマの配置（ページ上の矩形）を求め、
+コマごとに生成した画像を枠に合わせて縮小して1ページに貼り付ける。
+
+- 縦横比は崩さない（crop: 枠いっぱいに中央で切り抜き / fit: 枠内に収めて余白を残す）
+- 縮小は JPEG の draft（デコード時の 1/2・1/4・1/8 縮小）と Image.reduce（整数分の1の縮小）で
+  先に小さくしてから、最後に1回だけ LANCZOS で仕上げる。切り抜きは resize の box で行うのでコピーしない
+- コマはファイルパスでも渡せる。1コマずつ開いて貼り付けて閉じるので、同時にメモリに載るのは
+  ページ1枚 + コマ1枚分だけ
+
+使い方:
+    import template_registry
+    from compositor import layout_from_pattern, compose_page
+
+    layout = layout_from_pattern(template_registry.get_layout_pattern("pattern_3panel"))
+    page = compose_page(layout, {1: "panel1.png", 2: image2, 3: image3})
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+# PIL は読み込みに時間がかかるので、使う関数の中で import する（レイアウト計算や --dry-run だけなら読まない）
+if TYPE_CHECKING:
+    from PIL import Image
+
+# ページ幅（px）。高さは comic_page.aspect_ratio（幅:高さ）から求める
+PAGE_WIDTH = 1080
+DEFAULT_ASPECT_RATIO = '1:1.4'
+
+# ページ外周の余白とコマ間の隙間（px）
+PAGE_MARGIN = 24
+GUTTER = 16
+
+# コマ枠の線
+BORDER_WIDTH = 3
+BORDER_COLOR = (0, 0, 0)
+BACKGROUND_COLOR = (255, 255, 255)
+
+# 縮小方法: crop = 枠いっぱいに中央で切り抜く、fit = 枠内に収めて余白を残す
+FIT_CROP = 'crop'
+FIT_CONTAIN = 'fit'
+
+# Image.reduce で先に縮小する目安（仕上げの LANCZOS 前に、目標サイズのこの倍率まで整数分の1で縮める）。
+# 3.0 なら LANCZOS だけで縮小した場合と見分けがつかない
+REDUCING_GAP = 3.0
+
+PanelSource = Union['Image.Image', str, Path]
+
+
+@dataclass
+class PanelRect:
+    """ページ上のコマ1つ分の矩形"""
+
+    number: int
+    x: int
+    y: int
+    width: int
+    height: int
+
+    @property
+    def box(self):
+        """(左, 上, 右, 下)"""
+        return (self.x, self.y, self.x + self.width, self.y + self.height)
+
+    @property
+    def aspect_ratio(self) -> float:
+        """幅 / 高さ"""
+        return self.width / self.height
+
+
+@dataclass
+class PageLayout:
+    """1ページ分のコマ配置"""
+
+    width: int
+    height: int
+    panels: List[PanelRect] = field(default_factory=list)
+
+    def panel(self, number: int) -> Optional[PanelRect]:
+        """コマ番号から矩形を返す"""
+        for rect in self.panels:
+            if rect.number == number:
+                return rect
+        return None
+
+
+def page_height(width: int, aspect_ratio: str = DEFAULT_ASPECT_RATIO) -> int:
+    """'1:1.4' のようなアスペクト比（幅:高さ）からページの高さを求める"""
+    try:
+        w, h = (float(v) for v in str(aspect_ratio).split(':'))
+    except ValueError:
+        w, h = (float(v) for v in DEFAULT_ASPECT_RATIO.split(':'))
+    return round(width * h / w)
+
+
+def split_length(total: int, weights: List[float], gutter: int) -> List[Tuple[int, int]]:
+    """
+    長さ total を隙間 gutter を挟んで weights の比で分ける
+
+    端数は最後の区間で吸収し、合計がちょうど total になるようにする。
+
+    Returns:
+        list: [(開始位置, 長さ), ...]
+    """
+    available = total - gutter * (len(weights) - 1)
+    weight_sum = sum(weights)
+
+    spans = []
+    position = 0
+    used = 0
+    for i, weight in enumerate(weights):
+        if i == len(weights) - 1:
+            length = available - used
+        else:
+            length = round(available * weight / weight_sum)
+        spans.append((position, length))
+        position += length + gutter
+        used += length
+    return spans
+
+
+def pattern_rows(pattern: Dict) -> List[Dict]:
+    """
+    パターンの行定義を返す
+
+    layout.rows があればそれを使い、無ければ panel_positions（または total_panels）の順に
+    1行1コマの縦積みにする。
+
+    Returns:
+        list: [{'panels': [コマ番号, ...], 'height': 比率, 'widths': [比率, ...]}, ...]
+
+    Raises:
+        ValueError: layout.rows のコマが 1〜total_panels を1回ずつ並べていない、または widths の数が合わない
+    """
+    rows = (pattern.get('layout') or {}).get('rows')
+    if rows:
+        parsed = [
+            {
+                'panels': [int(number) for number in row['panels']],
+                'height': float(row.get('height', 1)),
+                'widths': [float(w) for w in row.get('widths', [1] * len(row['panels']))],
+            }
+            for row in rows
+        ]
+        for row in parsed:
+            if len(row['widths']) != len(row['panels']):
+                raise ValueError(f"layout.rows の widths の数がコマ数と合いません: {row}")
+        numbers = sorted(number for row in parsed for number in row['panels'])
+        expected = list(range(1, int(pattern.get('total_panels', len(numbers))) + 1))
+        if numbers != expected:
+            raise ValueError(f"layout.rows のコマ番号 {numbers} が total_panels と合いません（期待値 {expected}）")
+        return parsed
+
+    positions = pattern.get('panel_positions') or {}
+    numbers = sorted(int(number) for number in positions) or \
+        list(range(1, int(pattern.get('total_panels', 1)) + 1))
+    return [{'panels': [number], 'height': 1.0, 'widths': [1.0]} for number in numbers]
+
+
+def layout_from_pattern(pattern: Dict, width: int = PAGE_WIDTH,
+                        aspect_ratio: str = DEFAULT_ASPECT_RATIO,
+                        margin: Optional[int] = None, gutter: Optional[int] = None) -> PageLayout:
+    """
+    レイアウトパターンからコマの配置を求める
+
+    パターンに layout キーがあれば行・列の構成、余白、隙間、行内の並び順を使う
+    （templates/layout_patterns.yaml 冒頭のコメント参照）。無ければ縦積み。
+
+    Args:
+        pattern: layout_patterns.yaml の1パターン分
+        width: ページ幅（px）
+        aspect_ratio: ページのアスペクト比（幅:高さ）
+        margin: ページ外周の余白（px、省略時はパターンの値か PAGE_MARGIN）
+        gutter: コマ間の隙間（px、省略時はパターンの値か GUTTER）
+
+    Returns:
+        PageLayout: コマ配置
+    """
+    options = pattern.get('layout') or {}
+    if margin is None:
+        margin = int(options.get('margin', PAGE_MARGIN))
+    if gutter is None:
+        gutter = int(options.get('gutter', GUTTER))
+    # 日本の漫画は行の中を右から左へ読む
+    right_to_left = options.get('direction', 'rtl') == 'rtl'
+
+    height = page_height(width, aspect_ratio)
+    rows = pattern_rows(pattern)
+    inner_width = width - 2 * margin
+    inner_height = height - 2 * margin
+
+    panels = []
+    row_spans = split_length(inner_height, [row['height'] for row in rows], gutter)
+    for row, (row_y, row_height) in zip(rows, row_spans):
+        column_spans = split_length(inner_width, row['widths'], gutter)
+        for number, (column_x, column_width) in zip(row['panels'], column_spans):
+            x = inner_width - column_x - column_width if right_to_left else column_x
+            panels.append(PanelRect(number, margin + x, margin + row_y, column_width, row_height))
+
+    return PageLayout(width, height, panels)
+
+
+def placeholder_panel(rect: PanelRect, text: str = '') -> 'Image.Image':
+    """生成に失敗したコマの代わりに置く画像"""
+    from PIL import Image, ImageDraw
+
+    image = Image.new('RGB', (rect.width, rect.height), (220, 220, 220))
+    if text:
+        ImageDraw.Draw(image).text((20, 20), text, fill=(80, 80, 80))
+    return image
+
+
+def _fit_geometry(source_size, target_size, mode):
+    """
+    縮小後のサイズと、元画像から使う範囲を求める
+
+    Returns:
+        tuple: (縮小後の (幅, 高さ), 元画像の切り抜き範囲 (左, 上, 右, 下))
+    """
+    source_width, source_height = source_size
+    target_width, target_height = target_size
+
+    if mode == FIT_CONTAIN:
+        scale = min(target_width / source_width, target_height / source_height)
+        size = (max(1, round(source_width * scale)), max(1, round(source_height * scale)))
+        return size, (0, 0, source_width, source_height)
+
+    # crop: 目標と同じ縦横比の最大の範囲を中央から切り出す
+    scale = max(target_width / source_width, target_height / source_height)
+    crop_width = target_width / scale
+    crop_height = target_height / scale
+    left = (source_width - crop_width) / 2
+    top = (source_height - crop_height) / 2
+    return target_size, (left, top, left + crop_width, top + crop_height)
+
+
+def resize_panel(image: 'Image.Image', size, mode: str = FIT_CROP) -> 'Image.Image':
+    """
+    コマ画像を縦横比を保って size に縮小する
+
+    JPEG は draft でデコード時に縮小し、そのほかは Image.reduce（reducing_gap）で
+    整数分の1まで縮めてから LANCZOS で仕上げる。
+
+    Args:
+        image: コマ画像（まだ load していなければ draft が効く）
+        size: 枠のサイズ (幅, 高さ)
+        mode: crop / fit
+
+    Returns:
+        Image: 縮小した画像（RGB または RGBA）。fit の場合は size より小さいことがある
+    """
+    from PIL import Image
+
+    target_size, _ = _fit_geometry(image.size, size, mode)
+
+    # draft は要求したサイズ以上を保つ範囲で縮小する（JPEG 以外では何もしない）
+    scale = max(target_size[0] / image.size[0], target_size[1] / image.size[1]) if mode == FIT_CONTAIN \
+        else max(size[0] / image.size[0], size[1] / image.size[1])
+    if scale < 1:
+        image.draft('RGB', (round(image.size[0] * scale), round(image.size[1] * scale)))
+
+    if image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+
+    target_size, crop_box = _fit_geometry(image.size, size, mode)
+    if target_size == image.size and crop_box == (0, 0) + image.size:
+        return image
+
+    return image.resize(target_size, Image.Resampling.LANCZOS, box=crop_box, reducing_gap=REDUCING_GAP)
+
+
+def _paste(page: 'Image.Image', image: 'Image.Image', rect: PanelRect, mode: str):
+    resized = resize_panel(image, (rect.width, rect.height), mode)
+    x = rect.x + (rect.width - resized.width) // 2
+    y = rect.y + (rect.height - resized.height) // 2
+    if resized.mode == 'RGBA':
+        page.paste(resized, (x, y), resized)
+    else:
+        page.paste(resized, (x, y))
+
+
+def compose_page(layout: PageLayout, panel_images: Dict[int, PanelSource],
+                 mode: str = FIT_CROP, border_width: int = BORDER_WIDTH,
+                 background=BACKGROUND_COLOR) -> 'Image.Image':
+    """
+    コマ画像をページに合成する
+
+    コマは1つずつ縮小して貼り付ける。ファイルパスで渡したコマはその場で開いて、
+    貼り付けたらすぐ閉じる。
+
+    Args:
+        layout: コマ配置
+        panel_images: {コマ番号: 画像またはファイルパス}（無いコマは空白のまま枠線だけ描く）
+        mode: crop（枠いっぱいに中央で切り抜く）/ fit（枠内に収める）
+        border_width: コマ枠の線の太さ（0で描かない）
+        background: ページの背景色
+
+    Returns:
+        Image: 合成したページ（RGB）
+    """
+    from PIL import Image, ImageDraw
+
+    if mode not in (FIT_CROP, FIT_CONTAIN):
+        raise ValueError(f"未対応の縮小方法です: {mode}")
+
+    page = Image.new('RGB', (layout.width, layout.height), background)
+    draw = ImageDraw.Draw(page)
+
+    for rect in layout.panels:
+        source = panel_images.get(rect.number)
+        if isinstance(source, (str, Path)):
+            with Image.open(source) as image:
+                _paste(page, image, rect, mode)
+        elif source is not None:
+            _paste(page, source, rect, mode)
+
+        if border_width:
+            x0, y0, x1, y1 = rect.box
+            draw.rectangle((x0, y0, x1 - 1, y1 - 1), outline=BORDER_COLOR, width=border_width)
+
+    return page
+
+
+def vertical_layout(count: int, size, margin: int = 0, gutter: int = 0) -> PageLayout:
+    """count コマを縦に均等に並べる配置（size = ページの (幅, 高さ)）"""
+    width, height = size
+    return layout_from_pattern(
+        {'total_panels': count},
+        width=width,
+        aspect_ratio=f"{width}:{height}",
+        margin=margin,
+        gutter=gutter
+    )
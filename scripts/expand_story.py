@@ -8,6 +8,9 @@ import sys
 import yaml
 from pathlib import Path
 
+import template_registry
+from story_bundle import STORY_META_KEY, build_story_meta
+
 PROJECT_ROOT = Path(__file__).parent.parent
 TEMPLATES_DIR = PROJECT_ROOT / "templates"
 
@@ -17,15 +20,12 @@ def load_yaml(filepath):
         return yaml.safe_load(f)
 
 def load_character_templates():
-    """キャラクター情報テンプレートを読み込む"""
-    template_path = TEMPLATES_DIR / "character_templates.yaml"
-    data = load_yaml(template_path)
-    return data['character_infos']
+    """キャラクター情報テンプレートを読み込む（プロセス内でキャッシュ）"""
+    return template_registry.get_character_infos()
 
 def load_layout_patterns():
-    """コマ割りパターンを読み込む"""
-    pattern_path = TEMPLATES_DIR / "layout_patterns.yaml"
-    return load_yaml(pattern_path)
+    """コマ割りパターンを読み込む（プロセス内でキャッシュ）"""
+    return template_registry.get_layout_patterns()
 
 def get_emotion_description(character, emotion):
     """感情表現を英語のプロンプトに変換"""
@@ -154,6 +154,10 @@ def expand_simple_story(simple_story_path, output_path=None):
 
         full_yaml['comic_page']['panels'].append(panel)
 
+    # 生成側が元のストーリーを読み直さなくて済むよう、レイアウトとキャラクターを埋め込む
+    # （story_meta はプロンプトには含めない）
+    full_yaml[STORY_META_KEY] = build_story_meta(simple_story_path, simple_data)
+
     # 出力
     if output_path is None:
         # 入力ファイル名から出力ファイル名を生成
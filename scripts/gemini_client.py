@@ -0,0 +1,155 @@
+"""
+Gemini API 呼び出しラッパー（レート制限・リトライ・タイムアウト）
+
+- トークンバケット方式のクライアント側レート制限（リクエスト/分）
+- 429 / 5xx / タイムアウト時の指数バックオフ（ジッター付き）リトライ
+- 1回の呼び出しのタイムアウトと、リトライ全体の締め切り
+
+generate_from_yaml.py（ページ生成）と archive/generate_manga.py（コマ生成）の両方から使う。
+レート制限はプロセス内で共有されるので、並列実行やバッチ実行でもクォータを超えて連打しない。
+
+使い方:
+    import gemini_client
+
+    gemini_client.configure_rate_limit(20)  # 20リクエスト/分
+    response = gemini_client.generate_content(model, content_parts)
+
+設定（環境変数・.env、使う時点で読む）:
+    MANGA_REQUESTS_PER_MINUTE  レート制限（リクエスト/分、0で無制限）
+    MANGA_REQUEST_BURST        連続で送ってよいリクエスト数
+    MANGA_CALL_TIMEOUT         1回の呼び出しのタイムアウト（秒）
+    MANGA_CALL_DEADLINE        リトライを含めた全体の締め切り（秒）
+    MANGA_MAX_RETRIES          最大リトライ回数
+"""
+import time
+import random
+import threading
+from typing import Optional
+
+from rate_limiter import RateLimiter
+from settings import setting
+
+# デフォルトのレート制限（リクエスト/分、0で無制限）
+DEFAULT_REQUESTS_PER_MINUTE = 30.0
+# 同時に連続で送ってよいリクエスト数（バケット容量）
+DEFAULT_BURST = 4
+
+# 1回の呼び出しのタイムアウト（秒）
+CALL_TIMEOUT = 180.0
+# リトライを含めた全体の締め切り（秒）
+CALL_DEADLINE = 600.0
+# 最大リトライ回数
+MAX_RETRIES = 4
+
+# バックオフ（秒）
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 60.0
+
+# リトライ対象のHTTPステータス
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+# リトライ対象の例外クラス名（google.api_core.exceptions を import せずに判定する）
+RETRYABLE_ERROR_NAMES = {
+    'ResourceExhausted',
+    'TooManyRequests',
+    'InternalServerError',
+    'BadGateway',
+    'ServiceUnavailable',
+    'GatewayTimeout',
+    'DeadlineExceeded',
+    'RetryError',
+}
+
+
+# プロセス共有のレート制限（最初に使うときに MANGA_REQUESTS_PER_MINUTE から作る）
+_rate_limiter: Optional[RateLimiter] = None
+_rate_limiter_lock = threading.Lock()
+
+
+def _burst(burst: Optional[int]) -> int:
+    return burst if burst is not None else setting('MANGA_REQUEST_BURST', DEFAULT_BURST)
+
+
+def configure_rate_limit(requests_per_minute: float, burst: Optional[int] = None):
+    """プロセス共有のレート制限を設定し直す"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = RateLimiter(requests_per_minute, _burst(burst))
+
+
+def get_rate_limiter() -> RateLimiter:
+    """プロセス共有のレート制限を返す"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(
+                setting('MANGA_REQUESTS_PER_MINUTE', DEFAULT_REQUESTS_PER_MINUTE), _burst(None)
+            )
+        return _rate_limiter
+
+
+def is_retryable(error: Exception) -> bool:
+    """リトライすべきエラーかどうか（429 / 5xx / タイムアウト / 接続エラー）"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+
+    code = getattr(error, 'code', None)
+    if isinstance(code, int) and code in RETRYABLE_STATUS_CODES:
+        return True
+
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES
+
+
+def backoff_delay(attempt: int) -> float:
+    """attempt 回目のリトライ前の待ち時間（フルジッター付き指数バックオフ）"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def generate_content(model, contents, max_retries: Optional[int] = None,
+                     call_timeout: Optional[float] = None, deadline: Optional[float] = None,
+                     rate_limiter: Optional[RateLimiter] = None, label: str = ''):
+    """レート制限・リトライ付きで model.generate_content を呼ぶ
+
+    Args:
+        model: GenerativeModel
+        contents: 参照画像 + プロンプト
+        max_retries: 最大リトライ回数（省略時は MANGA_MAX_RETRIES）
+        call_timeout: 1回の呼び出しのタイムアウト（秒、省略時は MANGA_CALL_TIMEOUT）
+        deadline: リトライを含めた全体の締め切り（秒、省略時は MANGA_CALL_DEADLINE）
+        rate_limiter: レート制限（省略時はプロセス共有のもの）
+        label: ログ表示用のラベル
+
+    Returns:
+        generate_content のレスポンス
+
+    Raises:
+        TimeoutError: 締め切りまでに成功しなかった場合
+        Exception: リトライ対象外のエラー、またはリトライ回数を使い切った場合の最後のエラー
+    """
+    if max_retries is None:
+        max_retries = setting('MANGA_MAX_RETRIES', MAX_RETRIES)
+    if call_timeout is None:
+        call_timeout = setting('MANGA_CALL_TIMEOUT', CALL_TIMEOUT)
+    if deadline is None:
+        deadline = setting('MANGA_CALL_DEADLINE', CALL_DEADLINE)
+    limiter = rate_limiter or get_rate_limiter()
+    end = time.monotonic() + deadline
+    prefix = f"  [{label}] " if label else "  "
+
+    attempt = 0
+    while True:
+        remaining = end - time.monotonic()
+        if remaining <= 0 or not limiter.acquire(timeout=remaining):
+            raise TimeoutError(f"締め切り（{deadline:.0f}秒）までに応答がありませんでした")
+
+        timeout = min(call_timeout, max(1.0, end - time.monotonic()))
+        try:
+            return model.generate_content(contents, request_options={'timeout': timeout})
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+
+            delay = min(backoff_delay(attempt), max(0.0, end - time.monotonic()))
+            attempt += 1
+            print(f"{prefix}⟳ {type(e).__name__}: {delay:.1f}秒後にリトライします ({attempt}/{max_retries})")
+            time.sleep(delay)
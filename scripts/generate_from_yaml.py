@@ -3,6 +3,12 @@
 
 使い方:
     python generate_from_yaml.py ../stories/simple_story_example_expanded.yaml
+
+    # ネットワークに出ずに、YAMLの検証・参照画像の解決・送信サイズの確認だけ行う
+    python generate_from_yaml.py ../stories/simple_story_example_expanded.yaml --dry-run
+
+google.generativeai（読み込みに約1秒）と python-dotenv は使う時点で import する。
+--help・--dry-run・YAMLのエラーでは読み込まない。
 """
 import sys
 import io
@@ -17,72 +23,137 @@ import base64
 import os
 import argparse
 from pathlib import Path
-from PIL import Image
-from io import BytesIO
-import google.generativeai as genai
-from dotenv import load_dotenv
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import threading
+import time
+from io import BytesIO
+
+import template_registry
+import generation_cache
+import gemini_client
+import image_writer
+from image_writer import ImageWriter
+from reference_cache import load_reference_image, reference_file
+from story_bundle import StoryBundle
+from metrics import PageMetrics
+from job_ledger import LedgerRun
+from settings import load_env
 
 PROJECT_ROOT = Path(__file__).parent.parent
 CHARACTERS_DIR = PROJECT_ROOT / "characters"
 OUTPUT_DIR = PROJECT_ROOT / "output"
 TEMPLATES_DIR = PROJECT_ROOT / "templates"
 
-# .env読み込み
-load_dotenv(PROJECT_ROOT / ".env")
-
-def get_next_output_path(base_filename, session_folder=None):
-    """年月/日付/ナンバリング形式で次の出力パスを生成
+# モデル設定（Nano Banana = Gemini 2.5 Flash Image Preview）
+MODEL_NAME = "gemini-2.5-flash-image-preview"
 
-    優先順位:
-    1. session_folder引数（コマンドラインから指定）
-    2. 環境変数 MANGA_SESSION_ID
-    3. 自動採番（既存フォルダの次の番号）
+# 自動採番の次の番号を記録するファイル（output/YYYY-MM/DD/ 直下）
+SESSION_INDEX_FILE = ".next_session"
 
-    例: output/2025-11/12/1/story_name_generated.png
-        output/2025-11/12/2/another_story_generated.png
-    """
+def get_date_dir():
+    """今日の出力フォルダ（output/YYYY-MM/DD）を返す"""
     now = datetime.now()
     year_month = now.strftime("%Y-%m")  # 例: 2025-11
     day = now.strftime("%d")  # 例: 12
+    return OUTPUT_DIR / year_month / day
+
+def allocate_session_folder(date_dir=None):
+    """新しいセッションフォルダを確保して番号を返す
+
+    番号の候補は .next_session の値から取り、排他的な mkdir で確保する。
+    mkdir はプロセス間でも原子的なので、並列実行で同じフォルダを取り合うことはない。
+    .next_session が無い・壊れている場合だけ既存フォルダを走査する。
+
+    Args:
+        date_dir: 日付フォルダ（省略時は今日）
 
-    # 年月/日付フォルダを作成
-    date_dir = OUTPUT_DIR / year_month / day
+    Returns:
+        int: 確保したセッション番号
+    """
+    if date_dir is None:
+        date_dir = get_date_dir()
+    date_dir.mkdir(parents=True, exist_ok=True)
+
+    index_path = date_dir / SESSION_INDEX_FILE
+    try:
+        number = int(index_path.read_text(encoding='utf-8').strip())
+    except (FileNotFoundError, ValueError):
+        # 既存のナンバリングフォルダを取得（数字のみ）
+        existing_numbers = [
+            int(item.name) for item in date_dir.iterdir()
+            if item.is_dir() and item.name.isdigit()
+        ]
+        number = max(existing_numbers) + 1 if existing_numbers else 1
+
+    # 他のプロセスに先に取られていたら次の番号を試す
+    while True:
+        try:
+            (date_dir / str(number)).mkdir()
+            break
+        except FileExistsError:
+            number += 1
 
-    # セッションフォルダを決定（優先順位順）
+    # 次回の候補を記録（一時ファイル経由で置き換える）
+    tmp_path = date_dir / f"{SESSION_INDEX_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp_path.write_text(str(number + 1), encoding='utf-8')
+    os.replace(tmp_path, index_path)
+
+    return number
+
+def resolve_session_folder(session_folder=None):
+    """ジョブ全体で使うセッションフォルダ番号を決める
+
+    優先順位:
+    1. session_folder引数（コマンドラインから指定）
+    2. 環境変数 MANGA_SESSION_ID
+    3. 自動採番（allocate_session_folder で新規確保）
+    """
     if session_folder is not None:
-        # 1. コマンドライン引数
-        folder_id = str(session_folder)
-        output_folder = date_dir / folder_id
-        if not output_folder.exists():
-            output_folder.mkdir(parents=True, exist_ok=True)
-    elif os.getenv('MANGA_SESSION_ID'):
-        # 2. 環境変数
-        folder_id = os.getenv('MANGA_SESSION_ID')
-        output_folder = date_dir / folder_id
-        if not output_folder.exists():
-            output_folder.mkdir(parents=True, exist_ok=True)
-    else:
-        # 3. 自動採番
-        if date_dir.exists():
-            # 既存のナンバリングフォルダを取得（数字のみ）
-            existing_numbers = []
-            for item in date_dir.iterdir():
-                if item.is_dir() and item.name.isdigit():
-                    existing_numbers.append(int(item.name))
-
-            # 次のナンバーを決定
-            next_number = max(existing_numbers) + 1 if existing_numbers else 1
-        else:
-            next_number = 1
+        return session_folder
+    load_env()
+    if os.getenv('MANGA_SESSION_ID'):
+        return os.getenv('MANGA_SESSION_ID')
+    return allocate_session_folder()
+
+def get_next_output_path(base_filename, session_folder=None):
+    """年月/日付/ナンバリング形式で次の出力パスを生成
+
+    セッションフォルダの決め方は resolve_session_folder を参照。
+    複数候補を同じフォルダに保存するには、先に resolve_session_folder で
+    番号を決めて session_folder に渡すこと。
 
-        output_folder = date_dir / str(next_number)
-        output_folder.mkdir(parents=True, exist_ok=True)
+    例: output/2025-11/12/1/story_name_generated.png
+        output/2025-11/12/2/another_story_generated.png
+    """
+    folder_id = str(resolve_session_folder(session_folder))
+    output_folder = get_date_dir() / folder_id
+    output_folder.mkdir(parents=True, exist_ok=True)
 
     # 最終的なパス
     output_path = output_folder / base_filename
     return output_path
 
+def init_model(model_name=MODEL_NAME):
+    """Gemini APIを初期化してモデルを返す
+
+    Args:
+        model_name: 使用するモデル名
+
+    Returns:
+        GenerativeModel: 設定済みのモデル
+    """
+    load_env()
+    api_key = os.getenv('GOOGLE_API_KEY')
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY が .env に設定されていません")
+
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+
+    print(f"🤖 モデル: {model_name}")
+    return genai.GenerativeModel(model_name)
+
 def load_yaml(filepath):
     """YAMLファイルを読み込む"""
     with open(filepath, 'r', encoding='utf-8') as f:
@@ -93,25 +164,22 @@ def image_to_base64(image_path):
     with open(image_path, 'rb') as f:
         return base64.b64encode(f.read()).decode('utf-8')
 
-def load_layout_reference_image(layout_pattern):
-    """レイアウトパターンの参照画像を読み込む
+def layout_reference_path(layout_pattern):
+    """レイアウトパターンの参照画像のパスを返す
 
     Args:
         layout_pattern: レイアウトパターン名（例: "pattern_4panel_equal"）
 
     Returns:
-        Image or None: レイアウト参照画像（見つからない場合はNone）
+        Path or None: レイアウト参照画像のパス（見つからない場合はNone）
     """
-    # layout_patterns.yamlを読み込んで参照画像パスを取得
-    layout_patterns_path = TEMPLATES_DIR / "layout_patterns.yaml"
-    if not layout_patterns_path.exists():
+    # layout_patterns.yaml（キャッシュ済み）から参照画像パスを取得
+    try:
+        pattern_data = template_registry.get_layout_pattern(layout_pattern)
+    except FileNotFoundError:
         print(f"  ⚠ layout_patterns.yaml が見つかりません")
         return None
 
-    with open(layout_patterns_path, 'r', encoding='utf-8') as f:
-        layout_patterns = yaml.safe_load(f)
-
-    pattern_data = layout_patterns.get(layout_pattern)
     if not pattern_data:
         print(f"  ⚠ レイアウトパターン '{layout_pattern}' が見つかりません")
         return None
@@ -127,7 +195,16 @@ def load_layout_reference_image(layout_pattern):
         print(f"  ⚠ レイアウト参照画像が見つかりません: {ref_image_path}")
         return None
 
-    return Image.open(ref_image_path)
+    return ref_image_path
+
+def load_layout_reference_image(layout_pattern):
+    """レイアウトパターンの参照画像を読み込む
+
+    Returns:
+        Image or None: レイアウト参照画像（見つからない場合はNone）
+    """
+    ref_image_path = layout_reference_path(layout_pattern)
+    return load_reference_image(ref_image_path) if ref_image_path else None
 
 def load_character_emotion_image(character_name, emotion):
     """キャラクターの感情別参照画像を読み込む
@@ -139,23 +216,18 @@ def load_character_emotion_image(character_name, emotion):
     Returns:
         Image or None: キャラクター参照画像（見つからない場合はNone）
     """
-    # character_templates.yamlを読み込んで参照画像パスを取得
-    char_templates_path = TEMPLATES_DIR / "character_templates.yaml"
-    if not char_templates_path.exists():
+    # character_templates.yaml（キャッシュ済み）から参照画像パスを取得
+    try:
+        char_data = template_registry.get_character(character_name)
+    except FileNotFoundError:
         print(f"  ⚠ character_templates.yaml が見つかりません")
         return None
 
-    with open(char_templates_path, 'r', encoding='utf-8') as f:
-        char_templates = yaml.safe_load(f)
-
-    characters = char_templates.get('characters', {})
-    char_data = characters.get(character_name)
     if not char_data:
         print(f"  ⚠ キャラクター '{character_name}' が見つかりません")
         return None
 
-    emotions_data = char_data.get('emotions', {})
-    emotion_data = emotions_data.get(emotion)
+    emotion_data = template_registry.get_emotion(character_name, emotion)
     if not emotion_data:
         print(f"  ⚠ キャラクター '{character_name}' の感情 '{emotion}' が見つかりません")
         return None
@@ -171,7 +243,7 @@ def load_character_emotion_image(character_name, emotion):
         print(f"  ⚠ キャラクター参照画像が見つかりません: {ref_image_path}")
         return None
 
-    return Image.open(ref_image_path)
+    return load_reference_image(ref_image_path)
 
 def load_tool_image(tool_name):
     """小物の参照画像を読み込む
@@ -185,17 +257,13 @@ def load_tool_image(tool_name):
     if not tool_name or tool_name.strip() == "":
         return None
 
-    # character_templates.yamlから小物情報を取得
-    char_templates_path = TEMPLATES_DIR / "character_templates.yaml"
-    if not char_templates_path.exists():
+    # character_templates.yaml（キャッシュ済み）から小物情報を取得
+    try:
+        tool_data = template_registry.get_tool(tool_name)
+    except FileNotFoundError:
         print(f"  ⚠ character_templates.yaml が見つかりません")
         return None
 
-    with open(char_templates_path, 'r', encoding='utf-8') as f:
-        char_templates = yaml.safe_load(f)
-
-    tools = char_templates.get('tools', {})
-    tool_data = tools.get(tool_name)
     if not tool_data:
         print(f"  ⚠ 小物 '{tool_name}' が見つかりません")
         return None
@@ -211,7 +279,7 @@ def load_tool_image(tool_name):
         print(f"  ⚠ 小物参照画像が見つかりません: {ref_image_path}")
         return None
 
-    return Image.open(ref_image_path)
+    return load_reference_image(ref_image_path)
 
 def yaml_to_prompt(comic_page_data):
     """構造化YAMLを詳細なプロンプトに変換"""
@@ -309,177 +377,466 @@ IMPORTANT:
 
     return full_prompt
 
-def generate_manga_from_yaml(yaml_path, output_filename=None, session_folder=None, count=1):
-    """YAMLからマンガを生成
+# Easy Banana風のシンプルなシステムプロンプト
+SYSTEM_PROMPT = ' '.join([
+    'You are an expert image generation assistant.',
+    'Generate one or more high-quality images that match the user\'s prompt.',
+    'Return images inline using inlineData with an appropriate MIME type (prefer image/png).',
+    'If you include text output, keep it to a single concise English caption.',
+    'Do not add disclaimers unless required by safety policies.'
+])
+
+def build_prompt(yaml_content):
+    """展開済みYAMLの本文からAPIに送るプロンプトを作る"""
+    return f"{SYSTEM_PROMPT}\n\nUser prompt:\n{yaml_content}"
+
+def collect_reference_paths(bundle):
+    """ストーリーが使う参照画像（元画像）のパスを集める
 
     Args:
-        yaml_path: YAMLファイルのパス
-        output_filename: 出力ファイル名（省略可）
-        session_folder: セッションフォルダ番号（省略可）
-        count: 生成枚数（1-4、デフォルト1）
+        bundle: StoryBundle
+
+    Returns:
+        list: 参照画像のパス（レイアウト → キャラクター基本画像 の順）
     """
+    print("🖼️ 参照画像読み込み中...")
+    reference_paths = []
 
-    # 生成枚数を1-4の範囲に制限
-    count = max(1, min(count, 4))
+    # 1. レイアウトパターンの参照画像
+    if bundle.layout_pattern:
+        print(f"  📐 レイアウトパターン: {bundle.layout_pattern}")
+        layout_path = layout_reference_path(bundle.layout_pattern)
+        if layout_path:
+            reference_paths.append(layout_path)
+            print(f"    ✓ レイアウト参照画像")
 
-    # YAML読み込み
-    print(f"📖 YAML読み込み: {yaml_path}")
-    data = load_yaml(yaml_path)
-    comic_page = data.get('comic_page')
+    # 2. 使用されるキャラクターの基本画像を収集（重複なし、感情は使わない）
+    if bundle.characters:
+        print(f"  👤 キャラクター基本画像:")
+
+    for char_name in bundle.characters:
+        # _ORIGIN.png を読み込む（感情別ではない）
+        char_name_clean = char_name.upper().replace(" ", "")
+        char_path = CHARACTERS_DIR / f"{char_name_clean}_ORIGIN.png"
+
+        if char_path.exists():
+            reference_paths.append(char_path)
+            print(f"    ✓ {char_name}")
+        else:
+            print(f"    ⚠ {char_name}の基本画像が見つかりません: {char_path}")
+
+    # 3. 小物は参照画像として送らない（YAMLの文章で指定）
+    # Easy Banana方式では小物画像は読み込まず、YAMLの記述に任せる
 
-    if not comic_page:
+    return reference_paths
+
+def collect_reference_images(bundle):
+    """ストーリーが使う参照画像を読み込む（順番は collect_reference_paths と同じ）"""
+    return [load_reference_image(path) for path in collect_reference_paths(bundle)]
+
+def encode_content_parts(reference_images, prompt):
+    """参照画像をバイト列（Blob）にエンコードし、プロンプトと合わせて送信パートにする
+
+    ページ内の全候補で同じパートを使い回すので、エンコードは1ページ1回で済む。
+    キャッシュ済みの参照画像はファイルの中身をそのまま使う。
+
+    Args:
+        reference_images: 参照画像のリスト
+        prompt: プロンプト
+
+    Returns:
+        tuple: (送信パートのリスト, 送信バイト数)
+    """
+    parts = []
+    total_bytes = 0
+
+    for image in reference_images:
+        filename = getattr(image, 'filename', None)
+        if filename and image.format:
+            with open(filename, 'rb') as f:
+                data = f.read()
+            mime_type = image.get_format_mimetype()
+        else:
+            buffer = BytesIO()
+            image.save(buffer, format='PNG')
+            data = buffer.getvalue()
+            mime_type = 'image/png'
+
+        parts.append({'mime_type': mime_type, 'data': data})
+        total_bytes += len(data)
+
+    parts.append(prompt)
+    total_bytes += len(prompt.encode('utf-8'))
+
+    return parts, total_bytes
+
+def encode_reference_files(reference_paths, prompt):
+    """encode_content_parts と同じ送信パートを、参照画像をデコードせずに作る（--dry-run 用）
+
+    Args:
+        reference_paths: 参照画像（元画像）のパス
+        prompt: プロンプト
+
+    Returns:
+        tuple: (送信パートのリスト, 送信バイト数)
+    """
+    parts = [
+        {'mime_type': 'image/jpeg', 'data': reference_file(path).read_bytes()}
+        for path in reference_paths
+    ]
+    parts.append(prompt)
+    total_bytes = sum(len(part['data']) for part in parts[:-1]) + len(prompt.encode('utf-8'))
+    return parts, total_bytes
+
+def validate_story(bundle):
+    """展開済みYAMLの構造を検証する
+
+    Args:
+        bundle: StoryBundle
+
+    Raises:
+        ValueError: 問題がある場合（見つかった問題をすべて含める）
+    """
+    problems = []
+    comic_page = bundle.comic_page
+    if not isinstance(comic_page, dict):
         raise ValueError("YAMLに 'comic_page' キーが見つかりません")
 
-    # API初期化
-    api_key = os.getenv('GOOGLE_API_KEY')
-    if not api_key:
-        raise ValueError("GOOGLE_API_KEY が .env に設定されていません")
+    panels = comic_page.get('panels')
+    if not isinstance(panels, list) or not panels:
+        problems.append("panels が定義されていません")
+    else:
+        numbers = []
+        for i, panel in enumerate(panels):
+            if not isinstance(panel, dict):
+                problems.append(f"panels[{i}] がマッピングではありません")
+                continue
+            numbers.append(panel.get('number', i + 1))
+            for char in panel.get('characters') or []:
+                if not isinstance(char, dict) or not char.get('name'):
+                    problems.append(f"panels[{i}] に name の無いキャラクターがあります")
+        duplicates = sorted({n for n in numbers if numbers.count(n) > 1}, key=str)
+        if duplicates:
+            problems.append(f"panel.number が重複しています: {', '.join(map(str, duplicates))}")
+
+    if bundle.layout_pattern and not template_registry.get_layout_pattern(bundle.layout_pattern):
+        problems.append(f"レイアウトパターン '{bundle.layout_pattern}' が見つかりません")
+
+    if problems:
+        raise ValueError("YAMLの検証に失敗しました:\n" + '\n'.join(f"  - {p}" for p in problems))
+
+def print_request_summary(label, content_parts, request_bytes):
+    """送信パートの内訳（参照画像・プロンプトのバイト数）を表示する"""
+    print(f"\n📦 {label}")
+    for part in content_parts:
+        if isinstance(part, dict):
+            print(f"  - {part['mime_type']:12} {len(part['data']):>10,} bytes")
+        else:
+            print(f"  - {'prompt':12} {len(part.encode('utf-8')):>10,} bytes ({len(part):,} 文字)")
+    print(f"  合計: {request_bytes:,} bytes/リクエスト")
 
-    genai.configure(api_key=api_key)
+def dry_run(yaml_path, count=1):
+    """ネットワークに出ずに、生成の直前までを実行して送信内容を表示する
 
-    # モデル設定（Nano Banana = Gemini 2.5 Flash Image Preview）
-    model_name = "gemini-2.5-flash-image-preview"
-    print(f"🤖 モデル: {model_name}")
+    YAMLの検証・参照画像の解決（縮小キャッシュの作成を含む）・送信パートのエンコードまで行い、
+    モデルの初期化とAPI呼び出しはしない。設定は本番と同じく .env も読んでから使う。
 
-    model = genai.GenerativeModel(model_name)
+    Args:
+        yaml_path: 展開済みYAMLのパス
+        count: 生成枚数（送信の合計バイト数の計算に使う）
 
-    # YAMLをそのまま文字列として準備（Easy Banana方式）
-    print("📝 YAML指示文準備中...")
-    with open(yaml_path, 'r', encoding='utf-8') as f:
-        yaml_content = f.read()
-
-    # Easy Banana風のシンプルなシステムプロンプト
-    SYSTEM_PROMPT = ' '.join([
-        'You are an expert image generation assistant.',
-        'Generate one or more high-quality images that match the user\'s prompt.',
-        'Return images inline using inlineData with an appropriate MIME type (prefer image/png).',
-        'If you include text output, keep it to a single concise English caption.',
-        'Do not add disclaimers unless required by safety policies.'
-    ])
+    Returns:
+        dict: {'requests': リクエスト数, 'request_bytes': 1リクエストの送信バイト数, 'total_bytes': 合計}
 
-    prompt = f"{SYSTEM_PROMPT}\n\nUser prompt:\n{yaml_content}"
-    print(f"指示文長: {len(prompt)} 文字")
+    Raises:
+        ValueError: YAMLの検証に失敗した場合
+    """
+    load_env()
+    count = max(1, min(count, 4))
+    print(f"📖 YAML読み込み: {yaml_path}")
+    bundle = StoryBundle.load(yaml_path)
+    validate_story(bundle)
+    print(f"✓ YAMLの検証OK ({len(bundle.comic_page['panels'])}コマ)")
 
-    # 参照画像を収集
-    print("🖼️ 参照画像読み込み中...")
-    reference_images = []
+    prompt = build_prompt(bundle.prompt_text)
+    content_parts, request_bytes = encode_reference_files(collect_reference_paths(bundle), prompt)
 
-    # 1. レイアウトパターンの参照画像
-    # 元のYAMLファイルから layout_pattern を取得
-    yaml_file = Path(yaml_path)
-    original_yaml_path = yaml_file.parent / yaml_file.name.replace('_expanded', '')
-
-    if original_yaml_path.exists():
-        original_data = load_yaml(original_yaml_path)
-        layout_pattern = original_data.get('layout_pattern')
-        if layout_pattern:
-            print(f"  📐 レイアウトパターン: {layout_pattern}")
-            layout_img = load_layout_reference_image(layout_pattern)
-            if layout_img:
-                reference_images.append(layout_img)
-                print(f"    ✓ レイアウト参照画像")
+    print_request_summary(f"送信内容（モデル: {MODEL_NAME}）", content_parts, request_bytes)
+    print(f"  生成枚数 {count} → {count} リクエスト、合計 {request_bytes * count:,} bytes")
+    return {'requests': count, 'request_bytes': request_bytes, 'total_bytes': request_bytes * count}
 
-    # 2. 使用されるキャラクターの基本画像を収集（重複なし、感情は使わない）
-    if original_yaml_path.exists():
-        original_data = load_yaml(original_yaml_path)
-        scenes = original_data.get('scenes', [])
+def extract_image_data(response):
+    """レスポンスから最初の画像データを取り出す
 
-        print(f"  👤 キャラクター基本画像:")
-        char_images_added = set()  # 重複チェック用
-
-        for scene in scenes:
-            char_name = scene.get('character')
-
-            # まだ追加していないキャラクターなら追加
-            if char_name not in char_images_added:
-                # _ORIGIN.png を読み込む（感情別ではない）
-                char_name_clean = char_name.upper().replace(" ", "")
-                char_path = CHARACTERS_DIR / f"{char_name_clean}_ORIGIN.png"
-
-                if char_path.exists():
-                    char_img = Image.open(char_path)
-                    reference_images.append(char_img)
-                    print(f"    ✓ {char_name}")
-                    char_images_added.add(char_name)
-                else:
-                    print(f"    ⚠ {char_name}の基本画像が見つかりません: {char_path}")
+    Args:
+        response: generate_content のレスポンス
 
-    # 3. 小物は参照画像として送らない（YAMLの文章で指定）
-    # Easy Banana方式では小物画像は読み込まず、YAMLの記述に任せる
+    Returns:
+        tuple: (画像バイト列, MIMEタイプ)。画像が含まれない場合は (None, None)
+    """
+    if not (hasattr(response, 'candidates') and response.candidates):
+        return None, None
 
-    # Gemini API呼び出し（複数回生成）
-    print(f"\n🎨 Nanobanana API呼び出し中... (生成枚数: {count})")
-    print("  （これには数十秒かかる場合があります）")
+    candidate = response.candidates[0]
+    if not (hasattr(candidate, 'content') and hasattr(candidate.content, 'parts')):
+        return None, None
 
-    generated_paths = []
-    errors = []
+    for part in candidate.content.parts:
+        if hasattr(part, 'inline_data'):
+            mime_type = part.inline_data.mime_type if hasattr(part.inline_data, 'mime_type') else 'unknown'
 
-    for i in range(count):
-        print(f"\n生成中... ({i + 1}/{count})")
-        try:
-            # 参照画像 + プロンプトを送信
-            content_parts = reference_images + [prompt]
+            # データがすでにバイト列かbase64文字列かを判定
+            if isinstance(part.inline_data.data, bytes):
+                # バイト列の場合はそのまま使用
+                image_data = part.inline_data.data
+            else:
+                # 文字列の場合はbase64デコード
+                image_data = base64.b64decode(part.inline_data.data)
+
+            return image_data, mime_type
+
+        elif hasattr(part, 'text'):
+            print(f"  テキストレスポンス: {part.text[:200]}")
+
+    return None, None
 
-            response = model.generate_content(content_parts)
+def generate_candidate(model, content_parts, index, count, base_name, writer, session_folder=None,
+                       cache_key=None, cache_mode=generation_cache.CACHE_OFF, metrics=None,
+                       request_bytes=0):
+    """1枚分の生成リクエストを送り、画像の保存をキューに入れる
 
-            # レスポンスから画像を抽出
-            print("📡 レスポンス受信")
+    スレッドプールから並列に呼ばれる。保存（再エンコードを含む）は writer の
+    バックグラウンドスレッドで行うので、ここでは待たない。
 
-            if hasattr(response, 'candidates') and response.candidates:
-                candidate = response.candidates[0]
+    Args:
+        model: GenerativeModel
+        content_parts: 参照画像 + プロンプト
+        index: 候補番号（0始まり）
+        count: 生成枚数
+        base_name: 保存ファイル名のベース（拡張子なし）
+        writer: ImageWriter
+        session_folder: セッションフォルダ番号（省略可）
+        cache_key: 生成キャッシュのキー（省略可）
+        cache_mode: 生成キャッシュのモード（off / use / refresh）
+        metrics: 計測結果を記録する PageMetrics（省略可）
+        request_bytes: 1リクエストあたりの送信バイト数（計測用）
 
-                if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                    for part in candidate.content.parts:
-                        if hasattr(part, 'inline_data'):
-                            print("  ✓ 画像データ発見！")
+    Returns:
+        Future or None: 保存先パスを返すFuture（画像が生成されなかった場合はNone）
+    """
+    if metrics is None:
+        metrics = PageMetrics(base_name)
+
+    image_data = None
+    mime_type = None
+    if cache_key and cache_mode == generation_cache.CACHE_USE:
+        image_data = generation_cache.get(cache_key)
+        if image_data is not None:
+            print(f"\n♻ キャッシュから取得 ({index + 1}/{count})")
+            metrics.update_candidate(index, cached=True, bytes_received=len(image_data))
+
+    if image_data is None:
+        print(f"\n生成中... ({index + 1}/{count})")
+        start = time.perf_counter()
+        try:
+            response = gemini_client.generate_content(model, content_parts, label=f"{index + 1}/{count}")
+        finally:
+            metrics.update_candidate(
+                index,
+                api_ms=round((time.perf_counter() - start) * 1000, 2),
+                bytes_sent=request_bytes
+            )
+
+        # レスポンスから画像を抽出
+        print(f"📡 レスポンス受信 ({index + 1}/{count})")
+        start = time.perf_counter()
+        image_data, mime_type = extract_image_data(response)
+        metrics.update_candidate(index, decode_ms=round((time.perf_counter() - start) * 1000, 2))
+        if image_data is None:
+            return None
+
+        metrics.update_candidate(index, bytes_received=len(image_data))
+
+        print(f"  ✓ 画像データ発見！ ({index + 1}/{count})")
+        print(f"  データ形式: {mime_type}, 画像データサイズ: {len(image_data)} bytes")
+
+        if cache_key and cache_mode != generation_cache.CACHE_OFF:
+            generation_cache.put(cache_key, image_data)
+
+    # 保存（複数生成の場合は番号を付ける）
+    if count > 1:
+        filename = f"{base_name}_{index + 1}.{writer.extension}"
+    else:
+        filename = f"{base_name}.{writer.extension}"
 
-                            # デバッグ情報
-                            mime_type = part.inline_data.mime_type if hasattr(part.inline_data, 'mime_type') else 'unknown'
-                            data_type = type(part.inline_data.data).__name__
-                            print(f"  データ形式: {mime_type}, タイプ: {data_type}")
+    output_path = get_next_output_path(filename, session_folder=session_folder)
 
-                            # データがすでにバイト列かbase64文字列かを判定
-                            if isinstance(part.inline_data.data, bytes):
-                                # バイト列の場合はそのまま使用
-                                image_data = part.inline_data.data
-                            else:
-                                # 文字列の場合はbase64デコード
-                                image_data = base64.b64decode(part.inline_data.data)
+    def on_saved(path, seconds):
+        metrics.update_candidate(index, save_ms=round(seconds * 1000, 2), output_path=str(path))
 
-                            print(f"  画像データサイズ: {len(image_data)} bytes")
-                            image = Image.open(BytesIO(image_data))
+    return writer.submit(image_data, mime_type, output_path, on_saved=on_saved)
+
+def generate_manga_from_yaml(yaml_path, output_filename=None, session_folder=None, count=1,
+                             max_workers=None, model=None, cache_mode=None, writer=None,
+                             show_metrics=False, on_progress=None, ledger=None, resume=False):
+    """YAMLからマンガを生成
+
+    Args:
+        yaml_path: YAMLファイルのパス
+        output_filename: 出力ファイル名（省略可）
+        session_folder: セッションフォルダ番号（省略可）
+        count: 生成枚数（1-4、デフォルト1）
+        max_workers: 同時に投げるリクエスト数の上限（省略時は count と同じ＝全候補を並列）
+        model: 設定済みの GenerativeModel（省略時はここで初期化）
+        cache_mode: 生成キャッシュのモード（off / use / refresh、省略時は環境変数 MANGA_GENERATION_CACHE）
+        writer: 保存に使う ImageWriter（省略時はPNGで保存する writer をここで作る）
+        show_metrics: 計測結果の表を表示する（metrics.jsonl への記録は常に行う）
+        on_progress: 進捗を (イベント名, **内容) で受け取るコールバック（生成サーバーが使う）
+        ledger: 候補ごとの結果を記録する JobLedger（省略可）
+        resume: 台帳で成功済みの候補は生成せずに飛ばす
+    """
+    load_env()
+    if cache_mode is None:
+        cache_mode = generation_cache.default_mode()
+    progress = on_progress or (lambda event, **data: None)
 
-                            # 保存（複数生成の場合は番号を付ける）
-                            if output_filename is None:
-                                yaml_file = Path(yaml_path)
-                                base_name = f"{yaml_file.stem}_generated"
-                            else:
-                                base_name = output_filename.replace('.png', '')
+    # 生成枚数を1-4の範囲に制限
+    count = max(1, min(count, 4))
 
-                            if count > 1:
-                                filename = f"{base_name}_{i + 1}.png"
-                            else:
-                                filename = f"{base_name}.png"
+    # YAML読み込み（展開済みYAMLを1回だけ読み、生テキストとパース結果を両方持つ）
+    print(f"📖 YAML読み込み: {yaml_path}")
+    metrics = PageMetrics(Path(yaml_path).stem)
+    with metrics.stage('yaml_load'):
+        bundle = StoryBundle.load(yaml_path)
 
-                            output_path = get_next_output_path(filename, session_folder=session_folder)
+    if not bundle.comic_page:
+        raise ValueError("YAMLに 'comic_page' キーが見つかりません")
 
-                            image.save(output_path)
-                            print(f"✓ マンガを保存しました: {output_path}")
-                            print(f"  サイズ: {image.size}")
+    # 参照画像を収集（内容ハッシュは台帳・生成キャッシュのキーに使う）
+    with metrics.stage('reference_load'):
+        reference_images = collect_reference_images(bundle)
+    reference_digests = [img.info.get('source_digest', '') for img in reference_images]
+    progress('references', count=len(reference_images))
+
+    # 台帳で成功済みの候補（全部済んでいればモデルの初期化もしない）
+    ledger_run = LedgerRun(ledger, yaml_path, bundle.prompt_text, getattr(model, 'model_name', MODEL_NAME),
+                           reference_digests=reference_digests)
+    completed = ledger_run.completed() if resume else {}
+    completed = {i: path for i, path in completed.items() if i < count}
+    if len(completed) == count:
+        print(f"♻ 台帳で生成済みのため飛ばします ({count}/{count})")
+        return [Path(completed[i]) for i in range(count)]
+
+    # API初期化（バッチ実行時は共有モデルを受け取る）
+    if model is None:
+        model = init_model()
+    metrics.model_name = getattr(model, 'model_name', MODEL_NAME)
 
-                            generated_paths.append(output_path)
-                            break
+    # YAMLをそのまま文字列として準備（Easy Banana方式）
+    print("📝 YAML指示文準備中...")
+    prompt = build_prompt(bundle.prompt_text)
+    print(f"指示文長: {len(prompt)} 文字")
 
-                        elif hasattr(part, 'text'):
-                            print(f"  テキストレスポンス: {part.text[:200]}")
+    # Gemini API呼び出し（複数回生成）
+    if max_workers is None:
+        max_workers = count
+    max_workers = max(1, min(max_workers, count))
+    print(f"\n🎨 Nanobanana API呼び出し中... (生成枚数: {count}, 同時実行数: {max_workers})")
+    print("  （これには数十秒かかる場合があります）")
 
-                if not generated_paths or len(generated_paths) <= i:
-                    print("⚠ この回の生成に失敗しました")
-                    errors.append(f"生成 {i + 1}: 画像が生成されませんでした")
+    # 保存ファイル名のベース
+    if output_filename is None:
+        base_name = f"{Path(yaml_path).stem}_generated"
+    else:
+        base_name = output_filename.replace('.png', '')
+
+    # 参照画像 + プロンプトを送信（エンコードはページで1回）
+    with metrics.stage('request_encode'):
+        content_parts, request_bytes = encode_content_parts(reference_images, prompt)
+    print(f"  送信サイズ: {request_bytes:,} bytes/リクエスト")
+
+    # 生成キャッシュのキー（プロンプト・参照画像・モデル・候補番号）
+    cache_keys = [None] * count
+    if cache_mode != generation_cache.CACHE_OFF:
+        model_name = getattr(model, 'model_name', MODEL_NAME)
+        cache_keys = [
+            generation_cache.make_key(prompt, reference_digests, model_name, i)
+            for i in range(count)
+        ]
+
+    # 全候補で同じセッションフォルダを使う
+    session_folder = resolve_session_folder(session_folder)
+    print(f"📁 セッションフォルダ: {session_folder}")
+
+    own_writer = writer is None
+    if own_writer:
+        writer = ImageWriter()
+
+    write_futures = {}
+    results = {i: Path(path) for i, path in completed.items()}
+    errors = []
+    if completed:
+        print(f"♻ 台帳で生成済みの候補を飛ばします: {', '.join(str(i + 1) for i in sorted(completed))}")
 
-        except Exception as e:
-            print(f"\n✗ API エラー ({i + 1}/{count}): {type(e).__name__}: {e}")
-            errors.append(f"生成 {i + 1}: {str(e)}")
+    # 全候補を並列にリクエストし、届いた順に保存キューへ入れる
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for i in range(count):
+                if i in completed:
+                    continue
+                ledger_run.start(i)
+                futures[executor.submit(
+                    generate_candidate, model, content_parts, i, count, base_name, writer,
+                    session_folder, cache_keys[i], cache_mode, metrics, request_bytes
+                )] = i
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    write_future = future.result()
+                except Exception as e:
+                    print(f"\n✗ API エラー ({i + 1}/{count}): {type(e).__name__}: {e}")
+                    errors.append((i, f"生成 {i + 1}: {str(e)}"))
+                    metrics.update_candidate(i, status='error', error=f"{type(e).__name__}: {e}")
+                    progress('candidate', index=i, status='error', error=f"{type(e).__name__}: {e}")
+                    ledger_run.fail(i, f"{type(e).__name__}: {e}")
+                    continue
+
+                if write_future is None:
+                    print(f"⚠ この回の生成に失敗しました ({i + 1}/{count})")
+                    errors.append((i, f"生成 {i + 1}: 画像が生成されませんでした"))
+                    metrics.update_candidate(i, status='failed', error='no image in response')
+                    progress('candidate', index=i, status='failed', error='no image in response')
+                    ledger_run.fail(i, 'no image in response')
+                else:
+                    write_futures[i] = write_future
+
+        # 保存の完了を待つ
+        for i, write_future in write_futures.items():
+            try:
+                results[i] = write_future.result()
+                metrics.update_candidate(i, status='ok')
+                progress('candidate', index=i, status='ok', path=str(results[i]))
+                ledger_run.finish(i, results[i])
+            except Exception as e:
+                print(f"\n✗ 保存エラー ({i + 1}/{count}): {type(e).__name__}: {e}")
+                errors.append((i, f"生成 {i + 1}: 保存に失敗しました: {str(e)}"))
+                metrics.update_candidate(i, status='error', error=f"{type(e).__name__}: {e}")
+                progress('candidate', index=i, status='error', error=f"{type(e).__name__}: {e}")
+                ledger_run.fail(i, f"保存に失敗しました: {type(e).__name__}: {e}")
+    finally:
+        if own_writer:
+            writer.close()
+
+        # 計測結果をセッションフォルダの metrics.jsonl に追記
+        metrics_path = metrics.write(get_date_dir() / str(session_folder))
+        print(f"\n📊 計測結果: {metrics_path}")
+        if show_metrics:
+            metrics.print_summary()
+
+    # 番号順に並べ直す
+    generated_paths = [results[i] for i in sorted(results)]
+    errors = [err for _, err in sorted(errors)]
 
     # 結果サマリー
     if generated_paths:
@@ -506,19 +863,59 @@ def main():
     parser.add_argument('yaml_path', help='展開済みYAMLファイルのパス')
     parser.add_argument('--session-folder', type=int, help='セッションフォルダ番号（複数ページを同じフォルダに保存）')
     parser.add_argument('--count', type=int, default=1, help='生成枚数（1-4、デフォルト1）')
+    parser.add_argument('--max-workers', type=int, help='同時リクエスト数の上限（デフォルト: 生成枚数と同じ、1で逐次実行）')
+    parser.add_argument('--rpm', type=float, help='1分あたりの最大リクエスト数（デフォルト: 環境変数 MANGA_REQUESTS_PER_MINUTE または30、0で無制限）')
+    generation_cache.add_arguments(parser)
+    image_writer.add_arguments(parser)
+    parser.add_argument('--metrics', action='store_true', help='ステージごとの時間・送受信バイト数の表を表示する')
+    parser.add_argument('--panels', action='store_true', help='コマごとに並列生成してローカルで合成する（--count は使わない）')
+    parser.add_argument('--dry-run', action='store_true', help='YAMLの検証・参照画像の解決・送信サイズの表示だけ行う（APIは呼ばない）')
 
     args = parser.parse_args()
 
+    if args.dry_run:
+        try:
+            if args.panels:
+                from panel_generator import dry_run_panels
+                dry_run_panels(args.yaml_path)
+            else:
+                dry_run(args.yaml_path, count=args.count)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f"\n✗ {e}")
+            sys.exit(1)
+        return
+
+    load_env()
+    if args.rpm is not None:
+        gemini_client.configure_rate_limit(args.rpm)
+
     print("=" * 60)
     print("  構造化YAML → マンガ生成")
     print("=" * 60)
 
+    writer = image_writer.from_args(args)
     try:
-        result = generate_manga_from_yaml(
-            args.yaml_path,
-            session_folder=args.session_folder,
-            count=args.count
-        )
+        if args.panels:
+            # panel_generator はこのモジュールを import するので、ここで読み込む
+            from panel_generator import generate_page_by_panels
+            result = generate_page_by_panels(
+                args.yaml_path,
+                session_folder=args.session_folder,
+                max_workers=args.max_workers,
+                cache_mode=generation_cache.mode_from_args(args),
+                writer=writer,
+                show_metrics=args.metrics
+            )
+        else:
+            result = generate_manga_from_yaml(
+                args.yaml_path,
+                session_folder=args.session_folder,
+                count=args.count,
+                max_workers=args.max_workers,
+                cache_mode=generation_cache.mode_from_args(args),
+                writer=writer,
+                show_metrics=args.metrics
+            )
         if result:
             # 成功時は何もしない（関数内で既に表示済み）
             pass
@@ -530,6 +927,8 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        writer.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,150 @@
+"""
+生成結果のコンテンツアドレス型キャッシュ（オプトイン）
+
+プロンプト本文・参照画像のハッシュ・モデル名・候補番号からキーを作り、
+生成された画像バイト列を cache/generations/ に保存する。
+同じ入力で再実行したときはAPIを呼ばずに保存済みの画像を返す。
+
+容量が上限（環境変数 MANGA_GENERATION_CACHE_MAX_MB、デフォルト500MB）を超えたら、最後に使われた時刻が古い順に削除する（LRU）。
+
+有効化:
+    - generate_from_yaml.py --cache      キャッシュを使う
+    - generate_from_yaml.py --refresh    キャッシュを無視して再生成し、結果で上書き
+    - generate_from_yaml.py --no-cache   環境変数で有効化されていても使わない
+    - 環境変数 MANGA_GENERATION_CACHE=1  デフォルトで有効化
+"""
+import os
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Iterable, Optional
+
+from settings import setting
+
+PROJECT_ROOT = Path(__file__).parent.parent
+GENERATION_CACHE_DIR = PROJECT_ROOT / "cache" / "generations"
+
+# キャッシュ容量の上限（MB、環境変数 MANGA_GENERATION_CACHE_MAX_MB で変更可）
+GENERATION_CACHE_MAX_MB = 500
+
+# キャッシュモード
+CACHE_OFF = 'off'
+CACHE_USE = 'use'
+CACHE_REFRESH = 'refresh'
+
+_lock = threading.Lock()
+
+
+def default_mode() -> str:
+    """環境変数からデフォルトのキャッシュモードを決める"""
+    return CACHE_USE if setting('MANGA_GENERATION_CACHE', '') == '1' else CACHE_OFF
+
+
+def add_arguments(parser):
+    """--cache / --refresh / --no-cache をパーサーに追加する"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--cache', action='store_true', help='生成キャッシュを使う（同じ入力ならAPIを呼ばない）')
+    group.add_argument('--refresh', action='store_true', help='生成キャッシュを無視して再生成し、結果で上書きする')
+    group.add_argument('--no-cache', action='store_true', help='生成キャッシュを使わない（環境変数より優先）')
+
+
+def mode_from_args(args) -> str:
+    """add_arguments で追加した引数からキャッシュモードを決める"""
+    if args.no_cache:
+        return CACHE_OFF
+    if args.refresh:
+        return CACHE_REFRESH
+    if args.cache:
+        return CACHE_USE
+    return default_mode()
+
+
+def make_key(prompt: str, reference_digests: Iterable[str], model_name: str, candidate_index: int) -> str:
+    """キャッシュキーを作る
+
+    Args:
+        prompt: 送信するプロンプト全文
+        reference_digests: 参照画像の内容ハッシュ（送信順）
+        model_name: モデル名
+        candidate_index: 候補番号（0始まり）
+
+    Returns:
+        str: SHA-256の16進文字列
+    """
+    h = hashlib.sha256()
+    for field in (model_name, str(candidate_index), *reference_digests, prompt):
+        data = field.encode('utf-8')
+        # 区切りの曖昧さをなくすため長さを前置する
+        h.update(len(data).to_bytes(8, 'big'))
+        h.update(data)
+    return h.hexdigest()
+
+
+def _entry_path(key: str) -> Path:
+    return GENERATION_CACHE_DIR / f"{key}.img"
+
+
+def get(key: str) -> Optional[bytes]:
+    """キャッシュ済みの画像バイト列を返す（無ければNone）
+
+    ヒットしたエントリは最終使用時刻を更新する。
+    """
+    path = _entry_path(key)
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return None
+
+    try:
+        now = time.time()
+        os.utime(path, (now, now))
+    except OSError:
+        pass
+    return data
+
+
+def put(key: str, image_data: bytes):
+    """画像バイト列をキャッシュに保存し、容量超過分を削除する"""
+    GENERATION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    path = _entry_path(key)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(image_data)
+    os.replace(tmp_path, path)
+
+    evict()
+
+
+def max_cache_bytes() -> int:
+    """キャッシュ容量の上限（バイト）"""
+    return setting('MANGA_GENERATION_CACHE_MAX_MB', GENERATION_CACHE_MAX_MB) * 1024 * 1024
+
+
+def evict(max_bytes: Optional[int] = None):
+    """容量が上限を超えていれば、最終使用時刻が古いエントリから削除する"""
+    if max_bytes is None:
+        max_bytes = max_cache_bytes()
+    with _lock:
+        entries = []
+        total = 0
+        for path in GENERATION_CACHE_DIR.glob('*.img'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= max_bytes:
+            return
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except FileNotFoundError:
+                pass
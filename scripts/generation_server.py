@@ -0,0 +1,660 @@
+"""
+ローカル生成サーバー（Web UI 用）
+
+モデルの初期化・テンプレート・参照画像の読み込みを起動時に1回だけ行い、
+生成ジョブを小さな REST API で受け付けて、上限付きのワーカープールで順に処理する。
+APIキーはサーバー側の .env（GOOGLE_API_KEY）だけが持ち、ブラウザには渡さない。
+
+ui/ の静的ファイルも同じオリジンで配信するので、起動して http://127.0.0.1:8765/ を開けば UI から使える。
+
+API:
+    GET    /api/health                    サーバーの状態（モデル名・ワーカー数・待ち件数）
+    POST   /api/jobs                      ジョブ投入 {"yaml": 展開済みYAML} または {"story_path": ストーリーYAMLのパス}
+                                          （任意: "name", "count", "panels", "resume"）→ 202 {"id": ...}
+    GET    /api/jobs                      ジョブ一覧
+    GET    /api/jobs/<id>?since=N&wait=S  ジョブの状態と N 番目以降のイベント（S 秒まで新しいイベントを待つ = ロングポーリング）
+    GET    /api/jobs/<id>/events          進捗イベント（Server-Sent Events）
+    GET    /api/jobs/<id>/outputs/<n>     生成画像
+    DELETE /api/jobs/<id>                 待ち状態のジョブを取り消す
+
+API はこのサーバー自身のループバックアドレス宛て（Host・Origin で確認）のリクエストだけを受け付け、
+POST は Content-Type: application/json に限る。ほかのサイトのページから
+（プリフライト無しの text/plain の POST などで）勝手にジョブを投入されないようにするため。
+
+使い方:
+    python scripts/generation_server.py
+    python scripts/generation_server.py --port 8765 --workers 2 --max-workers 2 --cache
+"""
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import mimetypes
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+import yaml
+
+import template_registry
+import generation_cache
+import gemini_client
+import image_writer
+import job_ledger
+from reference_cache import load_reference_image
+from expand_story import expand_simple_story
+from generate_from_yaml import (
+    CHARACTERS_DIR,
+    PROJECT_ROOT,
+    generate_manga_from_yaml,
+    init_model,
+    load_env,
+    load_layout_reference_image,
+)
+from panel_generator import generate_page_by_panels
+from settings import setting
+
+UI_DIR = PROJECT_ROOT / "ui"
+
+# UI から受け取った展開済みYAMLを置くディレクトリ（内容のハッシュごとにサブフォルダ。
+# 同じYAMLは同じパスになるので、ジョブ台帳で成功済みかどうかを引ける）
+SERVER_JOBS_DIR = PROJECT_ROOT / "cache" / "server_jobs"
+
+# 待ち受けるアドレスとポート（環境変数 MANGA_SERVER_HOST・MANGA_SERVER_PORT で変更可）
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# 同時に生成するジョブ（ページ）の数（環境変数 MANGA_SERVER_WORKERS で変更可）
+DEFAULT_WORKERS = 2
+
+# 待ち + 実行中のジョブの上限。超えたら 429 を返す（環境変数 MANGA_SERVER_MAX_PENDING で変更可）
+MAX_PENDING_JOBS = 20
+
+# リクエスト本文の上限（展開済みYAMLは数十KB程度）
+MAX_BODY_BYTES = 1024 * 1024
+
+# 終わったジョブを一覧に残す件数（古いものから消す）
+MAX_FINISHED_JOBS = 100
+
+# API を受け付ける Host 名（待ち受けアドレスがループバック以外ならそれも加える）
+LOOPBACK_HOSTS = ('127.0.0.1', 'localhost', '::1')
+WILDCARD_HOSTS = ('', '0.0.0.0', '::')
+
+# ロングポーリングの最大待ち時間と、SSE のキープアライブ間隔（秒）
+MAX_WAIT_SECONDS = 60
+SSE_KEEPALIVE_SECONDS = 15
+
+# ジョブの状態
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+JOB_CANCELLED = 'cancelled'
+FINISHED_STATUSES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+
+class QueueFullError(Exception):
+    """待ちジョブが上限に達している"""
+
+
+@dataclass
+class Job:
+    """生成ジョブ1件（1ページ分）"""
+
+    id: str
+    name: str
+    yaml_path: Path
+    count: int = 1
+    panels: bool = False
+    resume: bool = False
+    status: str = JOB_QUEUED
+    created_at: str = field(default_factory=lambda: datetime.now().isoformat())
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    outputs: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    events: List[Dict] = field(default_factory=list)
+    future: Optional[Future] = field(default=None, repr=False)
+    condition: threading.Condition = field(default_factory=threading.Condition, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    def emit(self, event: str, **data):
+        """進捗イベントを追加して、待っているクライアントを起こす"""
+        with self.condition:
+            self.events.append({'seq': len(self.events), 'event': event, 'time': time.time(), **data})
+            self.condition.notify_all()
+
+    def set_status(self, status: str, **data):
+        """状態を変えて、同名のイベントを追加する"""
+        with self.condition:
+            self.status = status
+            now = datetime.now().isoformat()
+            if status == JOB_RUNNING:
+                self.started_at = now
+            elif status in FINISHED_STATUSES:
+                self.finished_at = now
+            self.emit(status, **data)
+
+    def wait_events(self, since: int, timeout: float) -> List[Dict]:
+        """since 番目以降のイベントを返す（無ければ timeout 秒まで待つ）"""
+        with self.condition:
+            if len(self.events) <= since and not self.finished:
+                self.condition.wait(timeout)
+            return self.events[since:]
+
+    def to_dict(self, since: Optional[int] = None) -> Dict:
+        """API のレスポンス用（since を渡すとそれ以降のイベントも含める）"""
+        data = {
+            'id': self.id,
+            'name': self.name,
+            'status': self.status,
+            'count': self.count,
+            'panels': self.panels,
+            'resume': self.resume,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'outputs': [f"/api/jobs/{self.id}/outputs/{i}" for i in range(len(self.outputs))],
+            'error': self.error,
+        }
+        if since is not None:
+            with self.condition:
+                data['events'] = self.events[since:]
+                data['next'] = len(self.events)
+        return data
+
+
+def safe_name(name: str) -> str:
+    """ファイル名に使える文字だけ残す（空なら 'ui'）"""
+    cleaned = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name).strip('_')
+    return cleaned[:60] or 'ui'
+
+
+class GenerationService:
+    """モデル・参照画像を温めたまま、生成ジョブをワーカープールで処理する"""
+
+    def __init__(self, workers: Optional[int] = None, max_workers: Optional[int] = None,
+                 cache_mode: Optional[str] = None, writer=None, model=None,
+                 max_pending: Optional[int] = None, ledger=None,
+                 max_finished: int = MAX_FINISHED_JOBS):
+        """
+        Args:
+            workers: 同時に生成するジョブ（ページ）の数（省略時は MANGA_SERVER_WORKERS）
+            max_workers: ページ内の同時リクエスト数（省略時は候補数・コマ数と同じ）
+            cache_mode: 生成キャッシュのモード（off / use / refresh）
+            writer: 全ジョブで共有する ImageWriter（省略時はPNGで保存する writer を作る）
+            model: 設定済みの GenerativeModel（省略時は init_model で初期化）
+            max_pending: 待ち + 実行中のジョブの上限（省略時は MANGA_SERVER_MAX_PENDING）
+            ledger: 候補ごとの結果を記録する JobLedger（一括生成と共有できる）
+            max_finished: 終わったジョブを一覧に残す件数
+        """
+        if workers is None:
+            workers = setting('MANGA_SERVER_WORKERS', DEFAULT_WORKERS)
+        if max_pending is None:
+            max_pending = setting('MANGA_SERVER_MAX_PENDING', MAX_PENDING_JOBS)
+        self.workers = max(1, workers)
+        self.max_workers = max_workers
+        self.cache_mode = cache_mode if cache_mode is not None else generation_cache.default_mode()
+        self.writer = writer or image_writer.ImageWriter()
+        self.model = model or init_model()
+        self.max_pending = max_pending
+        self.ledger = ledger
+        self.max_finished = max(0, max_finished)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='generation')
+        self.jobs: Dict[str, Job] = {}
+        self.lock = threading.Lock()
+
+    def warm_up(self):
+        """テンプレートと参照画像（レイアウト・キャラクター基本画像）を先に読み込んでおく"""
+        patterns = template_registry.get_layout_patterns()
+        template_registry.get_character_templates()
+
+        loaded = 0
+        for name in patterns:
+            if load_layout_reference_image(name) is not None:
+                loaded += 1
+        for path in sorted(CHARACTERS_DIR.glob('*_ORIGIN.png')):
+            load_reference_image(path)
+            loaded += 1
+        print(f"🔥 参照画像 {loaded} 枚を読み込みました")
+
+    def pending_count(self) -> int:
+        """待ち + 実行中のジョブ数"""
+        with self.lock:
+            return self._pending_count()
+
+    def _pending_count(self) -> int:
+        """pending_count の本体（self.lock を持って呼ぶ）"""
+        return sum(1 for job in self.jobs.values() if not job.finished)
+
+    def _prune_finished(self):
+        """終わったジョブを新しい順に max_finished 件だけ残す（self.lock を持って呼ぶ）"""
+        finished = sorted(
+            (job for job in self.jobs.values() if job.finished),
+            key=lambda job: job.finished_at or job.created_at,
+            reverse=True
+        )
+        for job in finished[self.max_finished:]:
+            del self.jobs[job.id]
+
+    def submit(self, yaml_text: Optional[str] = None, story_path: Optional[str] = None,
+               name: Optional[str] = None, count: int = 1, panels: bool = False,
+               resume: bool = False) -> Job:
+        """
+        ジョブを投入する
+
+        Args:
+            yaml_text: 展開済みYAML（UI から貼り付けたもの）
+            story_path: ストーリーYAMLのパス（簡易ストーリーなら展開してから生成）
+            name: 出力ファイル名のベース（省略時はストーリー名か 'ui'）
+            count: 生成枚数（1-4、パネルモードでは使わない）
+            panels: コマごとに生成して合成する
+            resume: ジョブ台帳で成功済みの候補は生成しない
+
+        Returns:
+            Job: 投入したジョブ
+
+        Raises:
+            ValueError: YAML・引数が不正
+            QueueFullError: 待ちジョブが上限に達している
+        """
+        for key, value in (('yaml', yaml_text), ('story_path', story_path), ('name', name)):
+            if value is not None and not isinstance(value, str):
+                raise ValueError(f"'{key}' は文字列で指定してください")
+        if isinstance(count, bool) or not isinstance(count, (int, str)):
+            raise ValueError(f"'count' は整数で指定してください: {count!r}")
+        try:
+            count = int(count)
+        except ValueError:
+            raise ValueError(f"'count' は整数で指定してください: {count!r}") from None
+
+        job_id = uuid.uuid4().hex[:12]
+        if yaml_text is not None:
+            data = yaml.safe_load(yaml_text) or {}
+            if not isinstance(data, dict) or not data.get('comic_page'):
+                raise ValueError("YAMLに 'comic_page' キーが見つかりません")
+            if not isinstance(data['comic_page'], dict):
+                raise ValueError("'comic_page' はマッピングで指定してください")
+            if not data['comic_page'].get('panels'):
+                raise ValueError("YAMLに panels が定義されていません")
+            if not isinstance(data['comic_page']['panels'], list):
+                raise ValueError("'panels' はリストで指定してください")
+            job_dir = SERVER_JOBS_DIR / hashlib.sha256(yaml_text.encode('utf-8')).hexdigest()[:16]
+            job_dir.mkdir(parents=True, exist_ok=True)
+            yaml_path = job_dir / f"{safe_name(name or 'ui')}.yaml"
+            yaml_path.write_text(yaml_text, encoding='utf-8')
+        elif story_path is not None:
+            path = (PROJECT_ROOT / story_path).resolve()
+            if PROJECT_ROOT.resolve() not in path.parents or not path.is_file():
+                raise ValueError(f"ストーリーが見つかりません: {story_path}")
+            with open(path, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            if not isinstance(data, dict):
+                raise ValueError(f"ストーリーはマッピングで書いてください: {story_path}")
+            if data.get('comic_page'):
+                if not isinstance(data['comic_page'], dict):
+                    raise ValueError("'comic_page' はマッピングで指定してください")
+                yaml_path = path
+            else:
+                yaml_path = Path(self._expand_story(path, data))
+        else:
+            raise ValueError("'yaml' か 'story_path' を指定してください")
+
+        job = Job(
+            id=job_id,
+            name=name or yaml_path.stem,
+            yaml_path=yaml_path,
+            count=max(1, min(count, 4)),
+            panels=bool(panels),
+            resume=bool(resume)
+        )
+        # 上限の確認と登録を同じロックの中で行う（同時の POST が両方とも上限をすり抜けないように）
+        with self.lock:
+            if self._pending_count() >= self.max_pending:
+                raise QueueFullError(f"待ちジョブが上限（{self.max_pending}件）に達しています")
+            self._prune_finished()
+            self.jobs[job.id] = job
+        job.emit(JOB_QUEUED)
+        job.future = self.executor.submit(self._run, job)
+        return job
+
+    @staticmethod
+    def _expand_story(path: Path, data: Dict) -> str:
+        """
+        簡易ストーリーを展開する
+
+        Returns:
+            str: 展開済みYAMLのパス
+
+        Raises:
+            ValueError: scenes の形が不正などで展開できない
+        """
+        scenes = data.get('scenes', [])
+        if not isinstance(scenes, list) or not all(isinstance(scene, dict) for scene in scenes):
+            raise ValueError("'scenes' はマッピングのリストで指定してください")
+        try:
+            return expand_simple_story(str(path))
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"ストーリーを展開できません: {type(e).__name__}: {e}") from None
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> List[Job]:
+        with self.lock:
+            return sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """待ち状態のジョブを取り消す（実行中のものは止められない）"""
+        job = self.get(job_id)
+        if job is None or job.future is None or not job.future.cancel():
+            return False
+        job.set_status(JOB_CANCELLED)
+        return True
+
+    def _run(self, job: Job):
+        """ワーカースレッドでジョブを1件実行し、古い終了済みジョブを一覧から消す"""
+        try:
+            self._execute(job)
+        finally:
+            with self.lock:
+                self._prune_finished()
+
+    def _execute(self, job: Job):
+        job.set_status(JOB_RUNNING)
+        options = dict(
+            max_workers=self.max_workers,
+            model=self.model,
+            cache_mode=self.cache_mode,
+            writer=self.writer,
+            on_progress=job.emit,
+            ledger=self.ledger,
+            resume=job.resume
+        )
+        try:
+            if job.panels:
+                result = generate_page_by_panels(str(job.yaml_path), **options)
+            else:
+                result = generate_manga_from_yaml(str(job.yaml_path), count=job.count, **options)
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.set_status(JOB_FAILED, error=job.error)
+            return
+
+        if not result:
+            job.error = '画像が生成されませんでした'
+            job.set_status(JOB_FAILED, error=job.error)
+            return
+
+        job.outputs = [str(path) for path in result]
+        job.set_status(JOB_DONE, outputs=job.to_dict()['outputs'])
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.writer.close()
+
+
+class GenerationRequestHandler(SimpleHTTPRequestHandler):
+    """/api/ を生成サーバーとして、それ以外を ui/ の静的ファイルとして返す"""
+
+    def __init__(self, *args, service: GenerationService, **kwargs):
+        # 親クラスの __init__ の中でリクエストを処理するので、先に設定する
+        self.service = service
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        # SSE・ロングポーリングのアクセスログは多いので API 以外だけ出す
+        if not self.path.startswith('/api/'):
+            super().log_message(format, *args)
+
+    def send_json(self, data, status=HTTPStatus.OK):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status, message):
+        self.send_json({'error': message}, status)
+
+    def route(self):
+        """(パスの要素, クエリ) を返す。/api/jobs/abc → ['jobs', 'abc']"""
+        parsed = urlparse(self.path)
+        parts = [part for part in parsed.path.split('/') if part]
+        return parts[1:], parse_qs(parsed.query)
+
+    def allowed_netlocs(self) -> set:
+        """API を受け付ける Host ヘッダーの値（ループバック名・待ち受けアドレス + ポート）"""
+        host, port = self.server.server_address[:2]
+        names = set(LOOPBACK_HOSTS)
+        if host not in WILDCARD_HOSTS:
+            names.add(host)
+        netlocs = set()
+        for name in names:
+            netloc = f"[{name}]" if ':' in name else name
+            netlocs.add(f"{netloc}:{port}")
+            if port == 80:
+                netlocs.add(netloc)
+        return netlocs
+
+    def check_source(self) -> bool:
+        """
+        Host・Origin がこのサーバー自身か確かめる（DNS リバインディング・他サイトからの投入対策）
+
+        Returns:
+            bool: 受け付けてよければ True（違えば 403 を返して False）
+        """
+        netlocs = self.allowed_netlocs()
+        if self.headers.get('Host', '').lower() not in netlocs:
+            self.send_error_json(HTTPStatus.FORBIDDEN, 'このホスト名では受け付けていません')
+            return False
+        origin = self.headers.get('Origin')
+        if origin is not None and origin.lower() not in {f"http://{netloc}" for netloc in netlocs}:
+            self.send_error_json(HTTPStatus.FORBIDDEN, f"このオリジンからは受け付けていません: {origin}")
+            return False
+        return True
+
+    def find_job(self, job_id):
+        job = self.service.get(job_id)
+        if job is None:
+            self.send_error_json(HTTPStatus.NOT_FOUND, f"ジョブが見つかりません: {job_id}")
+        return job
+
+    def do_GET(self):
+        if not self.path.startswith('/api/'):
+            return super().do_GET()
+        if not self.check_source():
+            return
+
+        parts, query = self.route()
+        if parts == ['health']:
+            return self.send_json({
+                'status': 'ok',
+                'model': getattr(self.service.model, 'model_name', None),
+                'workers': self.service.workers,
+                'pending': self.service.pending_count(),
+                'max_pending': self.service.max_pending,
+            })
+        if parts == ['jobs']:
+            return self.send_json({'jobs': [job.to_dict() for job in self.service.list_jobs()]})
+        if len(parts) < 2 or parts[0] != 'jobs':
+            return self.send_error_json(HTTPStatus.NOT_FOUND, 'Not found')
+
+        job = self.find_job(parts[1])
+        if job is None:
+            return
+        if len(parts) == 2:
+            return self.send_job(job, query)
+        if parts[2:] == ['events']:
+            return self.stream_events(job)
+        if len(parts) == 4 and parts[2] == 'outputs' and parts[3].isdigit():
+            return self.send_output(job, int(parts[3]))
+        return self.send_error_json(HTTPStatus.NOT_FOUND, 'Not found')
+
+    def send_job(self, job: Job, query):
+        """ジョブの状態（wait を付けると新しいイベントが来るまで待つロングポーリング）"""
+        try:
+            since = max(0, int(query.get('since', ['0'])[0]))
+            wait = min(float(query.get('wait', ['0'])[0]), MAX_WAIT_SECONDS)
+        except ValueError:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, "'since'・'wait' は数値で指定してください")
+        if wait > 0:
+            job.wait_events(since, wait)
+        self.send_json(job.to_dict(since=since))
+
+    def stream_events(self, job: Job):
+        """進捗を Server-Sent Events で送る（Last-Event-ID があればその続きから）"""
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-store')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+
+        last_id = self.headers.get('Last-Event-ID')
+        cursor = int(last_id) + 1 if last_id and last_id.isdigit() else 0
+        try:
+            while True:
+                events = job.wait_events(cursor, SSE_KEEPALIVE_SECONDS)
+                if not events:
+                    self.wfile.write(b': keepalive\n\n')
+                for event in events:
+                    payload = json.dumps(event, ensure_ascii=False)
+                    self.wfile.write(f"id: {event['seq']}\nevent: {event['event']}\ndata: {payload}\n\n".encode('utf-8'))
+                    cursor = event['seq'] + 1
+                self.wfile.flush()
+                if job.finished and cursor >= len(job.events):
+                    break
+        except (BrokenPipeError, ConnectionResetError):
+            # ブラウザがタブを閉じたなど
+            pass
+        self.close_connection = True
+
+    def send_output(self, job: Job, index: int):
+        if index >= len(job.outputs):
+            return self.send_error_json(HTTPStatus.NOT_FOUND, 'Not found')
+        path = Path(job.outputs[index])
+        data = path.read_bytes()
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', mimetypes.guess_type(path.name)[0] or 'application/octet-stream')
+        self.send_header('Content-Length', str(len(data)))
+        self.send_header('Content-Disposition', f'inline; filename="{path.name}"')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        parts, _ = self.route()
+        if not self.path.startswith('/api/') or parts != ['jobs']:
+            return self.send_error_json(HTTPStatus.NOT_FOUND, 'Not found')
+        if not self.check_source():
+            return
+        if self.headers.get_content_type() != 'application/json':
+            return self.send_error_json(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, 'Content-Type は application/json にしてください')
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, 'Content-Length が不正です')
+        if length < 0:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, 'Content-Length が不正です')
+        if length > MAX_BODY_BYTES:
+            return self.send_error_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'リクエストが大きすぎます')
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(body, dict):
+                raise ValueError('リクエスト本文は JSON オブジェクトにしてください')
+            job = self.service.submit(
+                yaml_text=body.get('yaml'),
+                story_path=body.get('story_path'),
+                name=body.get('name'),
+                count=body.get('count', 1),
+                panels=body.get('panels', False),
+                resume=body.get('resume', False)
+            )
+        except QueueFullError as e:
+            return self.send_error_json(HTTPStatus.TOO_MANY_REQUESTS, str(e))
+        except (ValueError, yaml.YAMLError) as e:
+            return self.send_error_json(HTTPStatus.BAD_REQUEST, str(e))
+
+        self.send_json(job.to_dict(since=0), HTTPStatus.ACCEPTED)
+
+    def do_DELETE(self):
+        parts, _ = self.route()
+        if not self.path.startswith('/api/') or len(parts) != 2 or parts[0] != 'jobs':
+            return self.send_error_json(HTTPStatus.NOT_FOUND, 'Not found')
+        if not self.check_source():
+            return
+        job = self.find_job(parts[1])
+        if job is None:
+            return
+        if not self.service.cancel(job.id):
+            return self.send_error_json(HTTPStatus.CONFLICT, f"取り消せません（状態: {job.status}）")
+        self.send_json(job.to_dict())
+
+
+def create_server(service: GenerationService, host: Optional[str] = None, port: Optional[int] = None):
+    """生成サーバー（ThreadingHTTPServer）を作る（host・port の省略時は MANGA_SERVER_HOST・MANGA_SERVER_PORT）"""
+    if host is None:
+        host = setting('MANGA_SERVER_HOST', DEFAULT_HOST)
+    if port is None:
+        port = setting('MANGA_SERVER_PORT', DEFAULT_PORT)
+    handler = partial(GenerationRequestHandler, service=service, directory=str(UI_DIR))
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='ローカル生成サーバー（Web UI 用）')
+    parser.add_argument('--host', help=f'待ち受けるアドレス（デフォルト: 環境変数 MANGA_SERVER_HOST または {DEFAULT_HOST}）')
+    parser.add_argument('--port', type=int, help=f'ポート番号（デフォルト: 環境変数 MANGA_SERVER_PORT または {DEFAULT_PORT}）')
+    parser.add_argument('--workers', type=int, help=f'同時に生成するページ数（デフォルト: 環境変数 MANGA_SERVER_WORKERS または {DEFAULT_WORKERS}）')
+    parser.add_argument('--max-workers', type=int, help='ページ内の同時リクエスト数（デフォルト: 候補数・コマ数と同じ）')
+    parser.add_argument('--rpm', type=float, help='1分あたりの最大リクエスト数（デフォルト: 環境変数 MANGA_REQUESTS_PER_MINUTE または30、0で無制限）')
+    generation_cache.add_arguments(parser)
+    image_writer.add_arguments(parser)
+    parser.add_argument('--ledger',
+                        help=f'ジョブ台帳（SQLite）のパス（デフォルト: 環境変数 MANGA_JOB_LEDGER または {job_ledger.LEDGER_PATH}）')
+    args = parser.parse_args()
+
+    load_env()
+    if args.rpm is not None:
+        gemini_client.configure_rate_limit(args.rpm)
+
+    service = GenerationService(
+        workers=args.workers,
+        max_workers=args.max_workers,
+        cache_mode=generation_cache.mode_from_args(args),
+        writer=image_writer.from_args(args),
+        ledger=job_ledger.JobLedger(args.ledger, batch_id=f"server-{uuid.uuid4().hex[:8]}")
+    )
+    service.warm_up()
+
+    server = create_server(service, args.host, args.port)
+    host, port = server.server_address[:2]
+    print(f"🚀 生成サーバー起動: http://{host}:{port}/ (同時ページ数: {service.workers})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n停止します...")
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
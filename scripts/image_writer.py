@@ -0,0 +1,219 @@
+"""
+生成画像の保存ステージ（バックグラウンド書き込み）
+
+API から返ってきた画像バイト列を、生成スレッドを止めずに保存する。
+
+- 返ってきたMIMEタイプが保存形式と同じなら、デコード・再エンコードせずにそのまま書き込む
+- 形式が違う場合や PNG の圧縮レベル指定がある場合だけ、バックグラウンドで再エンコードする
+- プレビュー（WebP / JPEG の縮小版）もバックグラウンドで作る
+
+使い方:
+    writer = ImageWriter(output_format='png', preview_format='webp')
+    future = writer.submit(image_data, 'image/png', output_path)
+    ...
+    writer.close()  # 書き込み完了を待つ
+"""
+import os
+import time
+import threading
+from io import BytesIO
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Callable, Optional
+
+# PIL は読み込みに時間がかかるので、再エンコードするときに import する
+# （形式が一致していればバイト列をそのまま書くだけで PIL は使わない）
+if TYPE_CHECKING:
+    from PIL import Image
+
+# 保存形式 → (MIMEタイプ, 拡張子, PILのフォーマット名)
+FORMATS = {
+    'png': ('image/png', 'png', 'PNG'),
+    'webp': ('image/webp', 'webp', 'WEBP'),
+    'jpeg': ('image/jpeg', 'jpg', 'JPEG'),
+}
+
+# プレビューの長辺（px）と品質
+PREVIEW_MAX_SIZE = 720
+PREVIEW_QUALITY = 80
+
+
+def sniff_mime_type(image_data: bytes) -> str:
+    """先頭バイトから画像のMIMEタイプを判定する（不明な場合は application/octet-stream）"""
+    if image_data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if image_data.startswith(b'\xff\xd8'):
+        return 'image/jpeg'
+    if image_data[:4] == b'RIFF' and image_data[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+
+def _atomic_write(path: Path, data: bytes):
+    """一時ファイル経由でバイト列を書き込む（書きかけのファイルを残さない）"""
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+
+class ImageWriter:
+    """生成画像をバックグラウンドで保存するクラス"""
+
+    def __init__(self, output_format: str = 'png', png_compress_level: Optional[int] = None,
+                 preview_format: Optional[str] = None, max_workers: int = 2):
+        """
+        Args:
+            output_format: 保存形式（png / webp / jpeg）
+            png_compress_level: PNGの圧縮レベル（0-9、指定時は再エンコードする）
+            preview_format: プレビューの形式（webp / jpeg、Noneで作らない）
+            max_workers: 書き込みスレッド数
+        """
+        if output_format not in FORMATS:
+            raise ValueError(f"未対応の保存形式です: {output_format}")
+        if preview_format is not None and preview_format not in FORMATS:
+            raise ValueError(f"未対応のプレビュー形式です: {preview_format}")
+
+        self.output_format = output_format
+        self.png_compress_level = png_compress_level
+        self.preview_format = preview_format
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-writer')
+
+    @property
+    def extension(self) -> str:
+        """保存ファイルの拡張子（ドットなし）"""
+        return FORMATS[self.output_format][1]
+
+    def submit(self, image_data: bytes, mime_type: str, output_path,
+               on_saved: Optional[Callable[[Path, float], None]] = None) -> Future:
+        """保存をキューに入れる
+
+        Args:
+            image_data: APIから返ってきた画像バイト列
+            mime_type: 画像のMIMEタイプ
+            output_path: 保存先パス
+            on_saved: 保存後に (保存先パス, 所要秒数) で呼ばれるコールバック（書き込みスレッドで実行）
+
+        Returns:
+            Future: 保存先パスを返すFuture
+        """
+        return self.executor.submit(self._write_timed, image_data, mime_type, Path(output_path), on_saved)
+
+    def submit_image(self, image: 'Image.Image', output_path,
+                     on_saved: Optional[Callable[[Path, float], None]] = None) -> Future:
+        """PIL画像（合成したページなど）の保存をキューに入れる
+
+        エンコードは書き込みスレッドで行う。キューに入れたあとは image を変更しないこと。
+
+        Args:
+            image: 保存する画像
+            output_path: 保存先パス
+            on_saved: 保存後に (保存先パス, 所要秒数) で呼ばれるコールバック（書き込みスレッドで実行）
+
+        Returns:
+            Future: 保存先パスを返すFuture
+        """
+        return self.executor.submit(self._write_timed, image, None, Path(output_path), on_saved)
+
+    def _write_timed(self, image_data, mime_type, output_path, on_saved):
+        start = time.perf_counter()
+        if isinstance(image_data, (bytes, bytearray)):
+            path = self._write(image_data, mime_type, output_path)
+        else:
+            path = self._write_image(image_data, output_path)
+        if on_saved is not None:
+            on_saved(path, time.perf_counter() - start)
+        return path
+
+    def _needs_reencode(self, mime_type: str) -> bool:
+        target_mime = FORMATS[self.output_format][0]
+        if mime_type != target_mime:
+            return True
+        return self.output_format == 'png' and self.png_compress_level is not None
+
+    def _write(self, image_data: bytes, mime_type: Optional[str], output_path: Path) -> Path:
+        from PIL import Image
+
+        image = None
+        if not mime_type or not mime_type.startswith('image/'):
+            mime_type = sniff_mime_type(image_data)
+
+        if self._needs_reencode(mime_type):
+            image = Image.open(BytesIO(image_data))
+            _atomic_write(output_path, self._encode(image))
+        else:
+            # 形式が一致していればそのまま書き込む
+            _atomic_write(output_path, image_data)
+
+        print(f"✓ マンガを保存しました: {output_path} ({output_path.stat().st_size} bytes)")
+
+        if self.preview_format:
+            if image is None:
+                image = Image.open(BytesIO(image_data))
+            self._write_preview(image, output_path)
+
+        return output_path
+
+    def _write_image(self, image: 'Image.Image', output_path: Path) -> Path:
+        _atomic_write(output_path, self._encode(image))
+        print(f"✓ マンガを保存しました: {output_path} ({output_path.stat().st_size} bytes)")
+
+        if self.preview_format:
+            self._write_preview(image, output_path)
+
+        return output_path
+
+    def _encode(self, image: 'Image.Image') -> bytes:
+        """保存形式でエンコードする"""
+        buffer = BytesIO()
+        pil_format = FORMATS[self.output_format][2]
+        if pil_format == 'PNG':
+            level = self.png_compress_level if self.png_compress_level is not None else 6
+            image.save(buffer, format='PNG', compress_level=level)
+        else:
+            if pil_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            image.save(buffer, format=pil_format, quality=95)
+        return buffer.getvalue()
+
+    def _write_preview(self, image: 'Image.Image', output_path: Path):
+        """縮小プレビューを書き込む（例: story_generated_1_preview.webp）"""
+        from PIL import Image
+
+        _, ext, pil_format = FORMATS[self.preview_format]
+        preview = image.copy()
+        preview.thumbnail((PREVIEW_MAX_SIZE, PREVIEW_MAX_SIZE), Image.Resampling.LANCZOS)
+        if pil_format == 'JPEG' and preview.mode not in ('RGB', 'L'):
+            preview = preview.convert('RGB')
+
+        buffer = BytesIO()
+        preview.save(buffer, format=pil_format, quality=PREVIEW_QUALITY)
+        preview_path = output_path.with_name(f"{output_path.stem}_preview.{ext}")
+        _atomic_write(preview_path, buffer.getvalue())
+        print(f"  プレビュー: {preview_path}")
+
+    def close(self):
+        """キュー内の書き込みが終わるまで待って終了する"""
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_arguments(parser):
+    """保存形式のオプションをパーサーに追加する"""
+    parser.add_argument('--format', choices=sorted(FORMATS), default='png', help='保存形式（デフォルト png）')
+    parser.add_argument('--png-compress-level', type=int, choices=range(10), metavar='0-9',
+                        help='PNGの圧縮レベル（指定時は再エンコードする）')
+    parser.add_argument('--preview', choices=['webp', 'jpeg'], help='縮小プレビューも保存する')
+
+
+def from_args(args) -> ImageWriter:
+    """add_arguments で追加した引数から ImageWriter を作る"""
+    return ImageWriter(
+        output_format=args.format,
+        png_compress_level=args.png_compress_level,
+        preview_format=args.preview
+    )
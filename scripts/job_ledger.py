@@ -0,0 +1,298 @@
+"""
+生成ジョブの台帳（SQLite）
+
+ストーリー × 候補番号ごとに、入力ハッシュ・状態・試行回数・出力パス・所要時間を記録する。
+一括生成（batch_generate.py）と生成サーバー（generation_server.py）が同じ台帳に書くので、
+途中で止まったバッチを --resume で再実行すると、成功済みの候補は API を呼ばずに飛ばして
+残りだけを生成する。
+
+- 入力ハッシュ = 展開済みYAMLの本文・モデル名・生成方法（ページ / コマ合成）・参照画像の内容ハッシュ
+  YAMLや参照画像（キャラクター画像など）を書き換えたストーリーは別の入力として扱い、作り直す
+- モデル名は 'models/' を外して比べる（CLI の 'gemini-…' と初期化済みモデルの 'models/gemini-…' を同じにする）
+- 出力ファイルが消えている候補は成功済みとみなさない
+- 実行中にプロセスが止まった候補は running のまま残り、再実行の対象になる
+
+台帳の場所は cache/job_ledger.sqlite3（環境変数 MANGA_JOB_LEDGER・.env で変更可）。
+
+使い方:
+    python scripts/job_ledger.py                 # ストーリーごとの状態
+    python scripts/job_ledger.py --failed        # 失敗した候補とエラー
+"""
+import sys
+import time
+import sqlite3
+import hashlib
+import argparse
+import contextlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from settings import setting
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# 台帳のデフォルトの場所（環境変数 MANGA_JOB_LEDGER で変更可）
+LEDGER_PATH = PROJECT_ROOT / "cache" / "job_ledger.sqlite3"
+
+# 候補の状態
+STATUS_RUNNING = 'running'
+STATUS_OK = 'ok'
+STATUS_FAILED = 'failed'
+
+# 生成方法（入力ハッシュに含める）
+MODE_PAGE = 'page'
+MODE_PANELS = 'panels'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    story       TEXT NOT NULL,
+    candidate   INTEGER NOT NULL,
+    input_hash  TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    output_path TEXT,
+    error       TEXT,
+    batch_id    TEXT,
+    started_at  TEXT,
+    finished_at TEXT,
+    duration_ms REAL,
+    PRIMARY KEY (story, candidate, input_hash)
+);
+CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id);
+"""
+
+
+def normalize_model_name(model_name: str) -> str:
+    """モデル名から 'models/' を外す（GenerativeModel.model_name には付き、MODEL_NAME には付かない）"""
+    return model_name[len('models/'):] if model_name.startswith('models/') else model_name
+
+
+def input_hash(prompt_text: str, model_name: str, mode: str = MODE_PAGE,
+               reference_digests: Iterable[str] = ()) -> str:
+    """
+    入力ハッシュを作る
+
+    Args:
+        prompt_text: 展開済みYAMLの本文（StoryBundle.prompt_text）
+        model_name: モデル名（'models/' の有無は区別しない）
+        mode: 生成方法（page / panels）
+        reference_digests: 参照画像の内容ハッシュ（送信順）
+
+    Returns:
+        str: SHA-256の16進文字列
+    """
+    h = hashlib.sha256()
+    for field in (mode, normalize_model_name(model_name), *reference_digests, prompt_text):
+        data = field.encode('utf-8')
+        # 区切りの曖昧さをなくすため長さを前置する
+        h.update(len(data).to_bytes(8, 'big'))
+        h.update(data)
+    return h.hexdigest()
+
+
+def ledger_path() -> Path:
+    """台帳の場所（環境変数 MANGA_JOB_LEDGER、無ければ LEDGER_PATH）"""
+    return setting('MANGA_JOB_LEDGER', LEDGER_PATH)
+
+
+def story_key(path) -> str:
+    """台帳に記録するストーリー名（プロジェクトからの相対パス）"""
+    path = Path(path).resolve()
+    try:
+        return path.relative_to(PROJECT_ROOT.resolve()).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+class JobLedger:
+    """生成ジョブの台帳
+
+    操作ごとに接続を開いて閉じるので、スレッド・プロセスをまたいで共有してよい
+    （書き込みの競合は SQLite のロックで待つ）。
+    """
+
+    def __init__(self, path=None, batch_id: Optional[str] = None):
+        """
+        Args:
+            path: SQLite ファイルのパス（省略時は ledger_path()）
+            batch_id: この実行で記録する行に付けるID（一覧の絞り込み用）
+        """
+        self.path = Path(path) if path is not None else ledger_path()
+        self.batch_id = batch_id
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def completed(self, story: str, input_hash: str) -> Dict[int, str]:
+        """
+        成功済みの候補を返す（出力ファイルが残っているものだけ）
+
+        Returns:
+            dict: {候補番号: 出力パス}
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT candidate, output_path FROM jobs WHERE story = ? AND input_hash = ? AND status = ?',
+                (story, input_hash, STATUS_OK)
+            ).fetchall()
+        return {
+            row['candidate']: row['output_path']
+            for row in rows
+            if row['output_path'] and Path(row['output_path']).exists()
+        }
+
+    def start(self, story: str, candidate: int, input_hash: str):
+        """候補の生成開始を記録する（試行回数を1増やす）"""
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO jobs (story, candidate, input_hash, status, attempts, batch_id, started_at)
+                VALUES (?, ?, ?, ?, 1, ?, ?)
+                ON CONFLICT (story, candidate, input_hash) DO UPDATE SET
+                    status = excluded.status,
+                    attempts = attempts + 1,
+                    batch_id = excluded.batch_id,
+                    started_at = excluded.started_at,
+                    finished_at = NULL,
+                    duration_ms = NULL,
+                    error = NULL
+                """,
+                (story, candidate, input_hash, STATUS_RUNNING, self.batch_id, datetime.now().isoformat())
+            )
+
+    def finish(self, story: str, candidate: int, input_hash: str, output_path,
+               duration_ms: Optional[float] = None):
+        """候補の成功を記録する"""
+        self._finish(story, candidate, input_hash, STATUS_OK, str(output_path), None, duration_ms)
+
+    def fail(self, story: str, candidate: int, input_hash: str, error: str,
+             duration_ms: Optional[float] = None):
+        """候補の失敗を記録する"""
+        self._finish(story, candidate, input_hash, STATUS_FAILED, None, error, duration_ms)
+
+    def _finish(self, story, candidate, input_hash, status, output_path, error, duration_ms):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                UPDATE jobs SET status = ?, output_path = ?, error = ?, finished_at = ?, duration_ms = ?
+                WHERE story = ? AND candidate = ? AND input_hash = ?
+                """,
+                (status, output_path, error, datetime.now().isoformat(), duration_ms,
+                 story, candidate, input_hash)
+            )
+
+    def rows(self, story: Optional[str] = None, status: Optional[str] = None,
+             batch_id: Optional[str] = None) -> List[Dict]:
+        """記録を新しい順に返す"""
+        conditions, params = [], []
+        for column, value in (('story', story), ('status', status), ('batch_id', batch_id)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM jobs {where} ORDER BY started_at DESC, story, candidate", params
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+class LedgerRun:
+    """1ページ分の生成で台帳に記録するためのヘルパー（generate_* 関数の中で使う）"""
+
+    def __init__(self, ledger: Optional[JobLedger], story_path, prompt_text: str, model_name: str,
+                 mode: str = MODE_PAGE, reference_digests: Iterable[str] = ()):
+        """
+        Args:
+            ledger: 台帳（None なら何も記録しない）
+            story_path: 展開済みYAMLのパス
+            prompt_text: 展開済みYAMLの本文
+            model_name: モデル名
+            mode: 生成方法（page / panels）
+            reference_digests: 参照画像の内容ハッシュ（送信順）
+        """
+        self.ledger = ledger
+        self.story = story_key(story_path)
+        self.input_hash = input_hash(prompt_text, model_name, mode, reference_digests)
+        self.started: Dict[int, float] = {}
+
+    def completed(self) -> Dict[int, str]:
+        """成功済みの候補 {候補番号: 出力パス}"""
+        return self.ledger.completed(self.story, self.input_hash) if self.ledger else {}
+
+    def start(self, candidate: int):
+        self.started[candidate] = time.perf_counter()
+        if self.ledger:
+            self.ledger.start(self.story, candidate, self.input_hash)
+
+    def _elapsed_ms(self, candidate: int) -> Optional[float]:
+        start = self.started.get(candidate)
+        return round((time.perf_counter() - start) * 1000, 2) if start is not None else None
+
+    def finish(self, candidate: int, output_path):
+        if self.ledger:
+            self.ledger.finish(self.story, candidate, self.input_hash, output_path, self._elapsed_ms(candidate))
+
+    def fail(self, candidate: int, error: str):
+        if self.ledger:
+            self.ledger.fail(self.story, candidate, self.input_hash, error, self._elapsed_ms(candidate))
+
+
+def add_arguments(parser):
+    """--resume / --ledger オプションを追加する"""
+    parser.add_argument('--resume', action='store_true',
+                        help='台帳で成功済みの候補は生成せずに飛ばす（途中で止まったバッチの再開）')
+    parser.add_argument('--ledger',
+                        help=f'ジョブ台帳（SQLite）のパス（デフォルト: 環境変数 MANGA_JOB_LEDGER または {LEDGER_PATH}）')
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='生成ジョブの台帳を表示')
+    parser.add_argument('--ledger', help='ジョブ台帳（SQLite）のパス（デフォルト: 環境変数 MANGA_JOB_LEDGER）')
+    parser.add_argument('--story', help='ストーリー（プロジェクトからの相対パス）で絞り込む')
+    parser.add_argument('--batch', help='バッチIDで絞り込む')
+    parser.add_argument('--failed', action='store_true', help='失敗した候補だけを表示')
+    args = parser.parse_args()
+
+    path = Path(args.ledger) if args.ledger else ledger_path()
+    if not path.exists():
+        print(f"台帳がありません: {path}")
+        sys.exit(1)
+
+    ledger = JobLedger(path)
+    rows = ledger.rows(
+        story=args.story,
+        status=STATUS_FAILED if args.failed else None,
+        batch_id=args.batch
+    )
+    if not rows:
+        print("記録がありません")
+        return
+
+    print(f"{'状態':8} {'試行':>4} {'秒':>7}  {'ストーリー':40} 候補  出力 / エラー")
+    for row in rows:
+        seconds = f"{row['duration_ms'] / 1000:.1f}" if row['duration_ms'] is not None else '-'
+        detail = row['output_path'] or row['error'] or ''
+        print(f"{row['status']:8} {row['attempts']:4} {seconds:>7}  {row['story']:40} {row['candidate']:4}  {detail}")
+
+    counts = {}
+    for row in rows:
+        counts[row['status']] = counts.get(row['status'], 0) + 1
+    print(f"\n合計 {len(rows)} 件: " + ', '.join(f"{status} {n}" for status, n in sorted(counts.items())))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""
+ページ生成の計測（ステージ時間・送受信バイト数・候補ごとの成否）
+
+generate_manga_from_yaml の各ステージ（YAML読み込み、参照画像読み込み、リクエストエンコード、
+API待ち、デコード、保存）の時間と、候補ごとの結果を記録し、
+セッションフォルダの metrics.jsonl に1行1イベントのJSON Linesで追記する。
+
+イベントの例:
+    {"event": "stage", "story": "ai_aruaru_01_expanded", "stage": "yaml_load", "duration_ms": 3.1, ...}
+    {"event": "candidate", "story": "ai_aruaru_01_expanded", "candidate": 1, "status": "ok",
+     "api_ms": 23110.4, "decode_ms": 4.2, "save_ms": 11.0, "bytes_sent": 612345, "bytes_received": 1834567, ...}
+"""
+import json
+import time
+import threading
+import contextlib
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+METRICS_FILENAME = "metrics.jsonl"
+
+# 複数ページが同じセッションフォルダへ追記するときのロック
+_write_lock = threading.Lock()
+
+
+class PageMetrics:
+    """1ページ分の計測結果を集めるクラス（スレッドセーフ）"""
+
+    def __init__(self, story: str, model_name: str = ''):
+        """
+        Args:
+            story: ストーリー名（展開済みYAMLのファイル名など）
+            model_name: モデル名
+        """
+        self.story = story
+        self.model_name = model_name
+        self.started_at = datetime.now().isoformat()
+        self.events: List[Dict] = []
+        self.candidates: Dict[int, Dict] = {}
+        self.lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        """ページ全体のステージ時間を計測する"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add({
+                'event': 'stage',
+                'stage': name,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 2),
+            })
+
+    def _add(self, event: Dict):
+        event = {'ts': datetime.now().isoformat(), 'story': self.story, **event}
+        with self.lock:
+            self.events.append(event)
+
+    def candidate(self, index: int) -> Dict:
+        """候補ごとの記録用辞書を返す（無ければ作る）"""
+        with self.lock:
+            return self.candidates.setdefault(index, {
+                'candidate': index + 1,
+                'status': 'pending',
+                'cached': False,
+                'api_ms': None,
+                'decode_ms': None,
+                'save_ms': None,
+                'bytes_sent': 0,
+                'bytes_received': 0,
+                'output_path': None,
+                'error': None,
+            })
+
+    def update_candidate(self, index: int, **fields):
+        """候補の記録を更新する"""
+        record = self.candidate(index)
+        with self.lock:
+            record.update(fields)
+
+    def all_events(self) -> List[Dict]:
+        """ステージイベント + 候補イベント（番号順）"""
+        with self.lock:
+            candidate_events = [
+                {'ts': datetime.now().isoformat(), 'story': self.story, 'event': 'candidate',
+                 'model': self.model_name, **record}
+                for _, record in sorted(self.candidates.items())
+            ]
+            return list(self.events) + candidate_events
+
+    def write(self, session_dir) -> Optional[Path]:
+        """セッションフォルダの metrics.jsonl に追記する"""
+        session_dir = Path(session_dir)
+        session_dir.mkdir(parents=True, exist_ok=True)
+        path = session_dir / METRICS_FILENAME
+
+        lines = ''.join(
+            json.dumps(event, ensure_ascii=False, default=str) + '\n'
+            for event in self.all_events()
+        )
+        with _write_lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+        return path
+
+    def print_summary(self):
+        """ステージ時間と候補ごとの結果を表で表示する"""
+        print(f"\n📊 計測結果: {self.story}")
+        print(f"  {'stage':<18}{'ms':>12}")
+        with self.lock:
+            for event in self.events:
+                print(f"  {event['stage']:<18}{event['duration_ms']:>12.1f}")
+            records = [record for _, record in sorted(self.candidates.items())]
+
+        print(f"\n  {'#':>3} {'status':<8}{'api ms':>10}{'decode ms':>11}{'save ms':>9}{'sent':>12}{'recv':>12}")
+        for record in records:
+            print(
+                f"  {record['candidate']:>3} {record['status']:<8}"
+                f"{_fmt_ms(record['api_ms']):>10}{_fmt_ms(record['decode_ms']):>11}{_fmt_ms(record['save_ms']):>9}"
+                f"{record['bytes_sent']:>12,}{record['bytes_received']:>12,}"
+            )
+
+
+def _fmt_ms(value) -> str:
+    return '-' if value is None else f"{value:.1f}"
@@ -0,0 +1,529 @@
+"""
+コマ単位の並列生成（パネルモード）
+
+展開済みYAMLの panels[] を1コマずつ別リクエストで並列に生成し、
+templates/layout_patterns.yaml から求めたコマ配置でローカルに1ページへ合成する。
+ページ全体を1リクエストで生成する generate_manga_from_yaml と比べて:
+
+- ページの待ち時間が「全コマの合計」ではなく「一番遅いコマ」になる
+- 画像が返らなかったコマだけをその場で再試行する（ページ全体は作り直さない）
+- --cache を付ければ、再実行時も成功済みのコマはキャッシュから使い、失敗したコマだけ生成する
+
+使い方:
+    python panel_generator.py ../stories/simple_story_example_expanded.yaml
+    python generate_from_yaml.py ../stories/simple_story_example_expanded.yaml --panels
+"""
+import sys
+import time
+import argparse
+import tempfile
+from io import BytesIO
+from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+
+import yaml
+
+import template_registry
+import generation_cache
+import gemini_client
+import image_writer
+from image_writer import ImageWriter
+from reference_cache import load_reference_image
+from story_bundle import StoryBundle, unique_characters
+from metrics import PageMetrics
+from job_ledger import MODE_PANELS, LedgerRun
+from settings import setting
+from compositor import layout_from_pattern, compose_page, placeholder_panel, DEFAULT_ASPECT_RATIO
+from generate_from_yaml import (
+    CHARACTERS_DIR,
+    MODEL_NAME,
+    build_prompt,
+    encode_content_parts,
+    encode_reference_files,
+    extract_image_data,
+    get_date_dir,
+    get_next_output_path,
+    init_model,
+    load_env,
+    print_request_summary,
+    resolve_session_folder,
+    validate_story,
+)
+
+# 画像が返らなかったコマを再試行する回数（環境変数 MANGA_PANEL_RETRIES で変更可。
+# API エラーのリトライは gemini_client が別に行う）
+PANEL_RETRIES = 1
+
+# 1コマ分のYAMLに入れる指示
+PANEL_INSTRUCTIONS = (
+    'このYAMLは漫画ページのうち1コマ分の仕様です。ページ全体やコマ割りは描かず、'
+    'このコマ1つだけを枠線なしで画像いっぱいに描いてください。'
+    '添付のキャラクター画像は外見の基準として忠実に反映してください。'
+    '画像のアスペクト比は aspect_ratio（幅:高さ）に合わせ、吹き出し・文字はすべて画像の内側に収めてください。'
+)
+
+# 1コマ分のYAMLに含めない comic_page のキー（ページ全体向けの指示）
+PAGE_ONLY_KEYS = ('panels', 'layout_constraints', 'character_infos', 'aspect_ratio', 'instructions')
+
+
+def panel_characters(panel):
+    """コマに登場するキャラクター名（出現順、重複なし）"""
+    return unique_characters(char.get('name') for char in panel.get('characters', []))
+
+
+def build_panel_yaml(comic_page, panel, rect):
+    """
+    1コマ分の生成用YAMLを作る
+
+    Args:
+        comic_page: 展開済みYAMLの comic_page
+        panel: panels[] の1要素
+        rect: そのコマの PanelRect
+
+    Returns:
+        str: YAML文字列
+    """
+    names = panel_characters(panel)
+    panel_page = {key: value for key, value in comic_page.items() if key not in PAGE_ONLY_KEYS}
+    panel_page['aspect_ratio'] = f"{rect.aspect_ratio:.2f}:1"
+    panel_page['instructions'] = PANEL_INSTRUCTIONS
+    panel_page['character_infos'] = [
+        info for info in comic_page.get('character_infos', []) if info.get('name') in names
+    ]
+    panel_page['panels'] = [panel]
+
+    return yaml.safe_dump({'comic_page': panel_page}, allow_unicode=True, sort_keys=False)
+
+
+def panel_reference_paths(names):
+    """コマに登場するキャラクターの基本画像（_ORIGIN.png）のパスを集める"""
+    paths = []
+    for name in names:
+        char_path = CHARACTERS_DIR / f"{name.upper().replace(' ', '')}_ORIGIN.png"
+        if char_path.exists():
+            paths.append(char_path)
+        else:
+            print(f"    ⚠ {name}の基本画像が見つかりません: {char_path}")
+    return paths
+
+
+def panel_reference_images(names):
+    """コマに登場するキャラクターの基本画像（_ORIGIN.png）を読み込む"""
+    return [load_reference_image(path) for path in panel_reference_paths(names)]
+
+
+def panel_numbers(panels):
+    """
+    panels[] のコマ番号を返す（number が無いコマは並び順の番号）
+
+    パネルモードでは番号でページ上の枠を引くので、1〜コマ数をちょうど1回ずつ使っている必要がある。
+
+    Args:
+        panels: 展開済みYAMLの panels
+
+    Returns:
+        list: panels と同じ順のコマ番号
+
+    Raises:
+        ValueError: 番号が重複・欠番・範囲外・整数以外
+    """
+    numbers = [panel.get('number', i + 1) for i, panel in enumerate(panels)]
+    expected = list(range(1, len(panels) + 1))
+    if any(isinstance(n, bool) or not isinstance(n, int) for n in numbers) or sorted(numbers) != expected:
+        raise ValueError(
+            f"パネルモードでは panel.number を 1〜{len(panels)} の整数で1回ずつ振ってください: {numbers}"
+        )
+    return numbers
+
+
+def resolve_layout(bundle):
+    """ストーリーのレイアウトパターンからコマ配置を求める
+
+    パターンが無い、またはコマ数が合わない場合は panels[] の番号で縦に均等分割する。
+    """
+    panels = bundle.comic_page.get('panels', [])
+    aspect_ratio = bundle.comic_page.get('aspect_ratio', DEFAULT_ASPECT_RATIO)
+
+    pattern = template_registry.get_layout_pattern(bundle.layout_pattern) if bundle.layout_pattern else None
+    if not pattern or int(pattern.get('total_panels', 0)) != len(panels):
+        if pattern:
+            print(f"  ⚠ レイアウト {bundle.layout_pattern} のコマ数（{pattern.get('total_panels')}）と"
+                  f"panels の数（{len(panels)}）が違うため、縦に均等分割します")
+        pattern = {
+            'total_panels': len(panels),
+            'panel_positions': {panel.get('number', i + 1): panel.get('page_position')
+                                for i, panel in enumerate(panels)},
+        }
+
+    return layout_from_pattern(pattern, aspect_ratio=aspect_ratio)
+
+
+def generate_panel(model, content_parts, index, total, cache_key=None,
+                   cache_mode=generation_cache.CACHE_OFF, metrics=None, request_bytes=0,
+                   retries=None):
+    """1コマ分を生成する（スレッドプールから並列に呼ばれる）
+
+    画像が返らなかった場合・エラーになった場合は、このコマだけを retries 回まで再試行する。
+
+    Args:
+        model: GenerativeModel
+        content_parts: 参照画像 + プロンプト
+        index: コマの位置（0始まり）
+        total: コマ数
+        cache_key: 生成キャッシュのキー（省略可）
+        cache_mode: 生成キャッシュのモード（off / use / refresh）
+        metrics: 計測結果を記録する PageMetrics（省略可）
+        request_bytes: 1リクエストあたりの送信バイト数（計測用）
+        retries: 再試行回数（省略時は MANGA_PANEL_RETRIES）
+
+    Returns:
+        tuple: (画像バイト列, MIMEタイプ)
+
+    Raises:
+        RuntimeError: 再試行しても画像が得られなかった場合
+    """
+    label = f"コマ {index + 1}/{total}"
+    if metrics is None:
+        metrics = PageMetrics(label)
+
+    if cache_key and cache_mode == generation_cache.CACHE_USE:
+        image_data = generation_cache.get(cache_key)
+        if image_data is not None:
+            print(f"  ♻ キャッシュから取得 ({label})")
+            metrics.update_candidate(index, cached=True, bytes_received=len(image_data))
+            return image_data, None
+
+    if retries is None:
+        retries = setting('MANGA_PANEL_RETRIES', PANEL_RETRIES)
+    last_error = None
+    for attempt in range(retries + 1):
+        if attempt:
+            print(f"  ⟳ 再試行 ({label}, {attempt}/{retries})")
+
+        start = time.perf_counter()
+        try:
+            response = gemini_client.generate_content(model, content_parts, label=label)
+        except Exception as e:
+            last_error = e
+            print(f"  ✗ API エラー ({label}): {type(e).__name__}: {e}")
+            continue
+        finally:
+            metrics.update_candidate(
+                index,
+                api_ms=round((time.perf_counter() - start) * 1000, 2),
+                bytes_sent=request_bytes,
+                attempts=attempt + 1
+            )
+
+        image_data, mime_type = extract_image_data(response)
+        if image_data is None:
+            last_error = RuntimeError('画像が生成されませんでした')
+            print(f"  ⚠ 画像が返りませんでした ({label})")
+            continue
+
+        print(f"  ✓ 画像データ受信 ({label}, {len(image_data):,} bytes)")
+        metrics.update_candidate(index, bytes_received=len(image_data))
+        if cache_key and cache_mode != generation_cache.CACHE_OFF:
+            generation_cache.put(cache_key, image_data)
+        return image_data, mime_type
+
+    raise RuntimeError(f"{label}: {last_error}")
+
+
+def generate_page_by_panels(yaml_path, output_filename=None, session_folder=None, max_workers=None,
+                            model=None, cache_mode=None, writer=None, show_metrics=False,
+                            retries=None, save_panels=True, on_progress=None,
+                            ledger=None, resume=False):
+    """展開済みYAMLの各コマを並列に生成し、ローカルで1ページに合成する
+
+    Args:
+        yaml_path: 展開済みYAMLのパス
+        output_filename: 出力ファイル名（省略可）
+        session_folder: セッションフォルダ番号（省略可）
+        max_workers: 同時に投げるリクエスト数の上限（省略時はコマ数と同じ＝全コマを並列）
+        model: 設定済みの GenerativeModel（省略時はここで初期化）
+        cache_mode: 生成キャッシュのモード（off / use / refresh、省略時は環境変数 MANGA_GENERATION_CACHE）
+        writer: 保存に使う ImageWriter（省略時はPNGで保存する writer をここで作る）
+        show_metrics: 計測結果の表を表示する（metrics.jsonl への記録は常に行う）
+        retries: 画像が返らなかったコマの再試行回数（省略時は MANGA_PANEL_RETRIES）
+        save_panels: 合成前のコマ画像も保存する（False でも合成用に一時ファイルへ書き出し、合成後に消す）
+        on_progress: 進捗を (イベント名, **内容) で受け取るコールバック（生成サーバーが使う）
+        ledger: 結果を記録する JobLedger（省略可、合成したページを候補 0 として記録）
+        resume: 台帳で成功済みなら生成せずに飛ばす
+
+    Returns:
+        list or None: [合成したページのパス]（全コマが失敗した場合は None）
+
+    Raises:
+        ValueError: YAMLの検証に失敗した場合（コマ番号が 1〜コマ数 になっていない場合を含む）
+    """
+    load_env()
+    if cache_mode is None:
+        cache_mode = generation_cache.default_mode()
+    if retries is None:
+        retries = setting('MANGA_PANEL_RETRIES', PANEL_RETRIES)
+    progress = on_progress or (lambda event, **data: None)
+
+    print(f"📖 YAML読み込み: {yaml_path}")
+    metrics = PageMetrics(Path(yaml_path).stem)
+    with metrics.stage('yaml_load'):
+        bundle = StoryBundle.load(yaml_path)
+
+    # API を呼ぶ前に、コマ番号で枠を引けることまで確かめる
+    validate_story(bundle)
+    panels = bundle.comic_page['panels']
+    numbers = panel_numbers(panels)
+    layout = resolve_layout(bundle)
+
+    # コマごとのプロンプト・参照画像・送信パート
+    requests = []
+    with metrics.stage('reference_load'):
+        for i, panel in enumerate(panels):
+            rect = layout.panel(numbers[i])
+            prompt = build_prompt(build_panel_yaml(bundle.comic_page, panel, rect))
+            reference_images = panel_reference_images(panel_characters(panel))
+            requests.append((prompt, reference_images))
+    progress('references', count=sum(len(images) for _, images in requests))
+
+    # 台帳のキーには全コマの参照画像の内容ハッシュを含める
+    ledger_run = LedgerRun(
+        ledger, yaml_path, bundle.prompt_text, getattr(model, 'model_name', MODEL_NAME), mode=MODE_PANELS,
+        reference_digests=[img.info.get('source_digest', '') for _, images in requests for img in images]
+    )
+    completed = ledger_run.completed() if resume else {}
+    if 0 in completed:
+        print(f"♻ 台帳で生成済みのため飛ばします: {completed[0]}")
+        return [Path(completed[0])]
+
+    if model is None:
+        model = init_model()
+    model_name = getattr(model, 'model_name', MODEL_NAME)
+    metrics.model_name = model_name
+
+    with metrics.stage('request_encode'):
+        encoded = [encode_content_parts(images, prompt) for prompt, images in requests]
+
+    cache_keys = [None] * len(panels)
+    if cache_mode != generation_cache.CACHE_OFF:
+        cache_keys = [
+            generation_cache.make_key(
+                prompt, [img.info.get('source_digest', '') for img in images], model_name, 0
+            )
+            for prompt, images in requests
+        ]
+
+    if max_workers is None:
+        max_workers = len(panels)
+    max_workers = max(1, min(max_workers, len(panels)))
+    print(f"\n🎨 コマごとに生成中... (コマ数: {len(panels)}, 同時実行数: {max_workers})")
+
+    if output_filename is None:
+        base_name = f"{Path(yaml_path).stem}_panels"
+    else:
+        base_name = output_filename.replace('.png', '')
+
+    session_folder = resolve_session_folder(session_folder)
+    print(f"📁 セッションフォルダ: {session_folder}")
+
+    own_writer = writer is None
+    if own_writer:
+        writer = ImageWriter()
+
+    # {コマ番号: 保存先パスの Future}。デコードした画像は持たず、合成時に compose_page が
+    # 1コマずつ開いて閉じるので、メモリに載るのはページ1枚 + コマ1枚分で済む
+    panel_files = {}
+    errors = []
+    page_path = None
+    # コマ画像を残さない場合も、合成のために一時ディレクトリへ書き出す
+    scratch = None if save_panels else tempfile.TemporaryDirectory(prefix='panels_')
+
+    ledger_run.start(0)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    generate_panel, model, encoded[i][0], i, len(panels), cache_keys[i],
+                    cache_mode, metrics, encoded[i][1], retries
+                ): i
+                for i in range(len(panels))
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                number = numbers[i]
+                metrics.update_candidate(i, panel=number)
+                try:
+                    image_data, mime_type = future.result()
+                    # 壊れた画像はこのコマの失敗にする（verify はピクセルをメモリに展開しない）
+                    start = time.perf_counter()
+                    from PIL import Image
+                    with Image.open(BytesIO(image_data)) as image:
+                        image.verify()
+                    metrics.update_candidate(i, decode_ms=round((time.perf_counter() - start) * 1000, 2))
+                except Exception as e:
+                    print(f"\n✗ コマ {number} の生成に失敗しました: {e}")
+                    errors.append((i, f"コマ {number}: {e}"))
+                    metrics.update_candidate(i, status='failed', error=str(e))
+                    progress('panel', number=number, status='failed', error=str(e))
+                    continue
+
+                metrics.update_candidate(i, status='ok')
+                progress('panel', number=number, status='ok')
+                if save_panels:
+                    panel_path = get_next_output_path(
+                        f"{base_name}_panel{number}.{writer.extension}", session_folder=session_folder
+                    )
+                    panel_files[number] = writer.submit(
+                        image_data, mime_type, panel_path,
+                        on_saved=lambda path, seconds, i=i: metrics.update_candidate(
+                            i, save_ms=round(seconds * 1000, 2), output_path=str(path)
+                        )
+                    )
+                else:
+                    panel_path = Path(scratch.name) / f"panel{number}"
+                    panel_path.write_bytes(image_data)
+                    panel_files[number] = Future()
+                    panel_files[number].set_result(panel_path)
+
+        if panel_files:
+            panel_sources = {number: future.result() for number, future in panel_files.items()}
+            # 失敗したコマは灰色の仮画像で埋めてページを作る（--cache で再実行すればそのコマだけ生成）
+            for i, number in enumerate(numbers):
+                if number not in panel_sources:
+                    panel_sources[number] = placeholder_panel(layout.panel(number), f"panel {number} failed")
+
+            with metrics.stage('compose'):
+                page = compose_page(layout, panel_sources)
+
+            page_path = get_next_output_path(f"{base_name}.{writer.extension}", session_folder=session_folder)
+            page_path = writer.submit_image(page, page_path).result()
+            progress('page', path=str(page_path), failed_panels=len(errors))
+
+        for panel_future in panel_files.values():
+            panel_future.result()
+    finally:
+        if own_writer:
+            writer.close()
+        if scratch is not None:
+            scratch.cleanup()
+
+        metrics_path = metrics.write(get_date_dir() / str(session_folder))
+        print(f"\n📊 計測結果: {metrics_path}")
+        if show_metrics:
+            metrics.print_summary()
+
+    errors = [err for _, err in sorted(errors)]
+    if page_path is not None and not errors:
+        ledger_run.finish(0, page_path)
+    else:
+        # 一部のコマが仮画像のページは成功扱いにしない（再開時は作り直す）
+        ledger_run.fail(0, '; '.join(errors) or '画像が生成されませんでした')
+
+    if page_path is None:
+        print("\n✗ すべてのコマの生成に失敗しました")
+        for err in errors:
+            print(f"  - {err}")
+        return None
+
+    print(f"\n{'=' * 60}")
+    print(f"✓ {len(panels) - len(errors)}/{len(panels)} コマを生成して合成しました: {page_path}")
+    if errors:
+        print(f"\n失敗: {len(errors)} コマ（--cache を付けて再実行すると失敗したコマだけ生成します）")
+        for err in errors:
+            print(f"  - {err}")
+    print(f"{'=' * 60}")
+    return [page_path]
+
+
+def dry_run_panels(yaml_path):
+    """ネットワークに出ずに、コマごとの送信内容（参照画像・プロンプトのバイト数）を表示する
+
+    Args:
+        yaml_path: 展開済みYAMLのパス
+
+    Returns:
+        dict: {'requests': リクエスト数（コマ数）, 'total_bytes': 全コマの送信バイト数}
+
+    Raises:
+        ValueError: YAMLの検証に失敗した場合
+    """
+    load_env()
+    print(f"📖 YAML読み込み: {yaml_path}")
+    bundle = StoryBundle.load(yaml_path)
+    validate_story(bundle)
+
+    panels = bundle.comic_page['panels']
+    numbers = panel_numbers(panels)
+    layout = resolve_layout(bundle)
+    print(f"✓ YAMLの検証OK ({len(panels)}コマ、ページ {layout.width}x{layout.height})")
+
+    total_bytes = 0
+    for panel, number in zip(panels, numbers):
+        rect = layout.panel(number)
+        prompt = build_prompt(build_panel_yaml(bundle.comic_page, panel, rect))
+        content_parts, request_bytes = encode_reference_files(
+            panel_reference_paths(panel_characters(panel)), prompt
+        )
+        print_request_summary(f"コマ {number}（枠 {rect.width}x{rect.height}）", content_parts, request_bytes)
+        total_bytes += request_bytes
+
+    print(f"\n{len(panels)} リクエスト、合計 {total_bytes:,} bytes（モデル: {MODEL_NAME}）")
+    return {'requests': len(panels), 'total_bytes': total_bytes}
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='展開済みYAMLをコマごとに並列生成して1ページに合成')
+    parser.add_argument('yaml_path', help='展開済みYAMLファイルのパス')
+    parser.add_argument('--session-folder', type=int, help='セッションフォルダ番号（複数ページを同じフォルダに保存）')
+    parser.add_argument('--max-workers', type=int, help='同時リクエスト数の上限（デフォルト: コマ数と同じ）')
+    parser.add_argument('--retries', type=int, help=f'画像が返らなかったコマの再試行回数（デフォルト: 環境変数 MANGA_PANEL_RETRIES または{PANEL_RETRIES}）')
+    parser.add_argument('--no-panel-files', action='store_true', help='合成前のコマ画像を保存しない')
+    parser.add_argument('--rpm', type=float, help='1分あたりの最大リクエスト数（0で無制限）')
+    generation_cache.add_arguments(parser)
+    image_writer.add_arguments(parser)
+    parser.add_argument('--metrics', action='store_true', help='ステージごとの時間・送受信バイト数の表を表示する')
+    parser.add_argument('--dry-run', action='store_true', help='YAMLの検証・参照画像の解決・コマごとの送信サイズの表示だけ行う（APIは呼ばない）')
+
+    args = parser.parse_args()
+
+    if args.dry_run:
+        try:
+            dry_run_panels(args.yaml_path)
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            print(f"\n✗ {e}")
+            sys.exit(1)
+        return
+
+    load_env()
+    if args.rpm is not None:
+        gemini_client.configure_rate_limit(args.rpm)
+
+    print("=" * 60)
+    print("  構造化YAML → コマごとに生成して合成")
+    print("=" * 60)
+
+    writer = image_writer.from_args(args)
+    try:
+        result = generate_page_by_panels(
+            args.yaml_path,
+            session_folder=args.session_folder,
+            max_workers=args.max_workers,
+            cache_mode=generation_cache.mode_from_args(args),
+            writer=writer,
+            show_metrics=args.metrics,
+            retries=args.retries,
+            save_panels=not args.no_panel_files
+        )
+        if not result:
+            sys.exit(1)
+    except Exception as e:
+        print(f"\n✗ エラー: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        writer.close()
+
+
+if __name__ == "__main__":
+    main()
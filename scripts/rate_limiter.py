@@ -0,0 +1,66 @@
+"""
+トークンバケット方式のレート制限（スレッドセーフ）
+
+Gemini API の呼び出し（gemini_client.py）とトレンド収集のスクレイパー（trend_collection/）で共有する。
+標準ライブラリだけに依存するので、どちらからでも軽く import できる。
+
+使い方:
+    from rate_limiter import RateLimiter
+
+    limiter = RateLimiter(60)  # 60リクエスト/分
+    limiter.acquire()
+"""
+import time
+import threading
+from typing import Optional
+
+# 同時に連続で送ってよいリクエスト数（バケット容量）のデフォルト
+DEFAULT_BURST = 4
+
+
+class RateLimiter:
+    """トークンバケット方式のレート制限（スレッドセーフ）"""
+
+    def __init__(self, requests_per_minute: float, burst: int = DEFAULT_BURST):
+        """
+        Args:
+            requests_per_minute: 1分あたりのリクエスト数（0以下で無制限）
+            burst: バケット容量（連続して送れるリクエスト数）
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """トークンを1つ取得する（取れるまで待つ）
+
+        Args:
+            timeout: 最大待ち時間（秒、Noneで無制限）
+
+        Returns:
+            bool: 取得できたかどうか
+        """
+        if self.rate <= 0:
+            return True
+
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+
+                wait = (1 - self.tokens) / self.rate
+
+            if timeout is not None:
+                remaining = timeout - (time.monotonic() - start)
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
@@ -0,0 +1,166 @@
+"""
+参照画像（characters/*.png など）の縮小・再エンコード済みキャッシュ
+
+元画像は1枚2MB前後あり、そのままでは毎リクエストでフル解像度を送ることになる。
+長辺を上限（環境変数 MANGA_REFERENCE_MAX_SIZE、デフォルト768px）に収めて再エンコードした版を1回だけ作り、
+ディスク（cache/references/）とメモリの両方に保持する。
+キャッシュキーは元画像の内容ハッシュ + 目標サイズなので、画像を差し替えれば自動で作り直される。
+
+使い方:
+    from reference_cache import load_reference_image
+
+    image = load_reference_image(CHARACTERS_DIR / "TEN_ORIGIN.png")
+"""
+import os
+import hashlib
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from settings import setting
+
+# PIL は読み込みに時間がかかるので、使う関数の中で import する（--help や YAML 検証だけなら読まない）
+if TYPE_CHECKING:
+    from PIL import Image
+
+PROJECT_ROOT = Path(__file__).parent.parent
+REFERENCE_CACHE_DIR = PROJECT_ROOT / "cache" / "references"
+
+# 参照画像の長辺の上限（px、環境変数 MANGA_REFERENCE_MAX_SIZE で変更可）
+REFERENCE_MAX_SIZE = 768
+
+# 再エンコード時のJPEG品質
+JPEG_QUALITY = 90
+
+# {(パス, mtime_ns, サイズ): 内容ハッシュ}
+_digest_cache: Dict[Tuple[str, int, int], str] = {}
+# {(内容ハッシュ, 目標サイズ): 読み込み済み画像}
+_image_cache: Dict[Tuple[str, int], 'Image.Image'] = {}
+_lock = threading.Lock()
+
+
+def file_digest(path) -> str:
+    """ファイル内容のSHA-256を返す（mtime・サイズが変わらなければ再計算しない）"""
+    path = Path(path)
+    stat = path.stat()
+    key = (str(path.resolve()), stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        digest = _digest_cache.get(key)
+    if digest:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    digest = h.hexdigest()
+
+    with _lock:
+        _digest_cache[key] = digest
+    return digest
+
+
+def _build_cached_file(source_path: Path, digest: str, max_size: int) -> Path:
+    """縮小・再エンコードした画像をディスクキャッシュに書き出す
+
+    参照画像は見た目の基準として使うだけなので、透過部分は白で塗りつぶしてJPEGにする
+    （characters/ の画像はRGBAだが実際には不透明で、PNGのままではほとんど小さくならない）。
+    書き込みは一時ファイル経由で行い、並列実行でも壊れたファイルを残さない。
+    """
+    from PIL import Image
+
+    REFERENCE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    cached_path = _cached_file_path(digest, max_size)
+
+    with Image.open(source_path) as image:
+        image.draft('RGB', (max_size, max_size))
+        image = image.convert('RGBA')
+
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+    flattened = Image.new('RGB', image.size, (255, 255, 255))
+    flattened.paste(image, mask=image.getchannel('A'))
+
+    tmp_path = cached_path.with_name(f"{cached_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    flattened.save(tmp_path, format='JPEG', quality=JPEG_QUALITY, optimize=True)
+    os.replace(tmp_path, cached_path)
+
+    return cached_path
+
+
+def _cached_file_path(digest: str, max_size: int) -> Path:
+    """ディスクキャッシュのファイルパス"""
+    return REFERENCE_CACHE_DIR / f"{digest[:32]}_{max_size}.jpg"
+
+
+def reference_file(source_path, max_size: Optional[int] = None) -> Path:
+    """縮小済みの参照画像のファイル（ディスクキャッシュ）を返す
+
+    画像はデコードしないので、キャッシュ済みなら PIL も読み込まない（--dry-run で送信サイズを出す用）。
+    中身は load_reference_image が返す画像の送信バイト列と同じ。
+
+    Args:
+        source_path: 元画像のパス
+        max_size: 長辺の上限（px、省略時は MANGA_REFERENCE_MAX_SIZE）
+
+    Returns:
+        Path: キャッシュファイル（JPEG）のパス
+    """
+    if max_size is None:
+        max_size = setting('MANGA_REFERENCE_MAX_SIZE', REFERENCE_MAX_SIZE)
+    source_path = Path(source_path)
+    digest = file_digest(source_path)
+    cached_path = _cached_file_path(digest, max_size)
+    if not cached_path.exists():
+        cached_path = _build_cached_file(source_path, digest, max_size)
+    return cached_path
+
+
+def load_reference_image(source_path, max_size: Optional[int] = None) -> 'Image.Image':
+    """縮小済みの参照画像を返す
+
+    メモリ → ディスク → 元画像から作成 の順に探す。
+    返す画像の info['source_digest'] には元画像の内容ハッシュが入る。
+
+    Args:
+        source_path: 元画像のパス
+        max_size: 長辺の上限（px、省略時は MANGA_REFERENCE_MAX_SIZE）
+
+    Returns:
+        Image: 縮小・再エンコード済みの画像（呼び出し側で変更しないこと）
+
+    Raises:
+        FileNotFoundError: 元画像が存在しない場合
+    """
+    if max_size is None:
+        max_size = setting('MANGA_REFERENCE_MAX_SIZE', REFERENCE_MAX_SIZE)
+    source_path = Path(source_path)
+    digest = file_digest(source_path)
+    key = (digest, max_size)
+
+    with _lock:
+        image = _image_cache.get(key)
+    if image is not None:
+        return image
+
+    cached_path = _cached_file_path(digest, max_size)
+    if not cached_path.exists():
+        cached_path = _build_cached_file(source_path, digest, max_size)
+
+    from PIL import Image
+
+    image = Image.open(cached_path)
+    image.load()
+    image.info['source_digest'] = digest
+
+    with _lock:
+        # 並列で同じ画像を読んだ場合は先に入った方を使う
+        image = _image_cache.setdefault(key, image)
+    return image
+
+
+def clear_memory_cache():
+    """メモリキャッシュを破棄する（ディスクキャッシュは残す）"""
+    with _lock:
+        _digest_cache.clear()
+        _image_cache.clear()
@@ -0,0 +1,56 @@
+"""
+環境変数による設定（.env を含む）
+
+MANGA_* などの調整用の設定は、モジュールの import 時ではなく使う時点で setting() で読む。
+setting() は最初に .env を読み込むので、.env に書いた値も環境変数と同じように効く
+（既に設定されている環境変数のほうが優先）。
+
+使い方:
+    from settings import setting
+
+    timeout = setting('MANGA_CALL_TIMEOUT', 180.0)   # 型はデフォルト値に合わせる
+"""
+import os
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+_env_loaded = False
+
+
+def load_env():
+    """.env を読み込む（2回目以降は何もしない）
+
+    GOOGLE_API_KEY・MANGA_SESSION_ID・MANGA_GENERATION_CACHE などを使う直前に呼ぶ。
+    既に設定されている環境変数は上書きしない。
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv(PROJECT_ROOT / ".env")
+    _env_loaded = True
+
+
+def setting(name: str, default):
+    """
+    環境変数（.env を含む）の設定値を読む
+
+    Args:
+        name: 環境変数名
+        default: 未設定・空のときの値（値はこの型に変換する: int / float / str / Path）
+
+    Returns:
+        設定値
+
+    Raises:
+        ValueError: 値を default の型に変換できない
+    """
+    load_env()
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return default
+    try:
+        return type(default)(value.strip())
+    except ValueError:
+        raise ValueError(f"環境変数 {name} の値が不正です: {value!r}") from None
@@ -0,0 +1,156 @@
+"""
+展開済みストーリーYAMLの1回読み込みローダー
+
+展開済みYAML（*_expanded.yaml）を1回だけ読み、生テキストとパース結果の両方を保持する。
+レイアウトパターンと登場キャラクターは expand_story.py が埋め込む story_meta から取り、
+story_meta が無い古いファイルの場合だけ元のストーリーYAMLを（1回だけ）読む。
+
+使い方:
+    bundle = StoryBundle.load("stories/simple_story_example_expanded.yaml")
+    bundle.prompt_text     # APIに送るYAML本文（story_meta を除く）
+    bundle.layout_pattern  # 例: "pattern_3panel"
+    bundle.characters      # 例: ["TEN", "CLAUDECODE"]
+"""
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+# 展開済みYAMLに埋め込むメタデータのキー
+STORY_META_KEY = 'story_meta'
+
+
+def strip_top_level_key(text: str, key: str) -> str:
+    """YAMLテキストからトップレベルのキー1つ分のブロックを取り除く
+
+    プロンプトとして送る本文にメタデータを混ぜないために使う。
+    """
+    lines = text.splitlines(keepends=True)
+    result = []
+    skipping = False
+
+    for line in lines:
+        is_top_level = line[:1] not in ('', ' ', '\t', '\n', '\r', '#')
+        if is_top_level:
+            skipping = line.startswith(f"{key}:")
+        if not skipping:
+            result.append(line)
+
+    return ''.join(result)
+
+
+def unique_characters(names) -> List[str]:
+    """キャラクター名の重複を除く（出現順を保つ、空は無視）"""
+    characters = []
+    for name in names:
+        if name and name not in characters:
+            characters.append(name)
+    return characters
+
+
+class StoryBundle:
+    """展開済みストーリー1ページ分の読み込み結果"""
+
+    def __init__(self, expanded_path: Path, expanded_text: str, expanded_data: Dict,
+                 layout_pattern: Optional[str], characters: List[str],
+                 source_path: Optional[Path] = None):
+        """
+        Args:
+            expanded_path: 展開済みYAMLのパス
+            expanded_text: 展開済みYAMLの生テキスト
+            expanded_data: 展開済みYAMLのパース結果
+            layout_pattern: レイアウトパターン名（不明な場合はNone）
+            characters: 登場キャラクター名（出現順、重複なし）
+            source_path: 元のストーリーYAMLのパス（分かる場合）
+        """
+        self.expanded_path = expanded_path
+        self.expanded_text = expanded_text
+        self.expanded_data = expanded_data
+        self.layout_pattern = layout_pattern
+        self.characters = characters
+        self.source_path = source_path
+
+    @property
+    def comic_page(self) -> Optional[Dict]:
+        """comic_page セクション"""
+        return self.expanded_data.get('comic_page')
+
+    @property
+    def prompt_text(self) -> str:
+        """APIに送るYAML本文（story_meta を除いた生テキスト）"""
+        if STORY_META_KEY not in self.expanded_data:
+            return self.expanded_text
+        return strip_top_level_key(self.expanded_text, STORY_META_KEY)
+
+    @classmethod
+    def load(cls, expanded_path) -> 'StoryBundle':
+        """展開済みYAMLを読み込む
+
+        Args:
+            expanded_path: 展開済みYAMLのパス
+
+        Returns:
+            StoryBundle: 読み込み結果
+        """
+        expanded_path = Path(expanded_path)
+        expanded_text = expanded_path.read_text(encoding='utf-8')
+        expanded_data = yaml.safe_load(expanded_text) or {}
+
+        meta = expanded_data.get(STORY_META_KEY)
+        if meta:
+            source = meta.get('source')
+            return cls(
+                expanded_path,
+                expanded_text,
+                expanded_data,
+                layout_pattern=meta.get('layout_pattern'),
+                characters=unique_characters(meta.get('characters', [])),
+                source_path=expanded_path.parent / source if source else None
+            )
+
+        # story_meta が無い古い展開済みYAML: 元のストーリーYAMLを1回だけ読む
+        source_path = expanded_path.parent / expanded_path.name.replace('_expanded', '')
+        if source_path != expanded_path and source_path.exists():
+            with open(source_path, 'r', encoding='utf-8') as f:
+                source_data = yaml.safe_load(f) or {}
+            return cls(
+                expanded_path,
+                expanded_text,
+                expanded_data,
+                layout_pattern=source_data.get('layout_pattern'),
+                characters=unique_characters(
+                    scene.get('character') for scene in source_data.get('scenes', [])
+                ),
+                source_path=source_path
+            )
+
+        # 元のストーリーも無い場合はパネル定義からキャラクターだけ拾う
+        panels = (expanded_data.get('comic_page') or {}).get('panels', [])
+        return cls(
+            expanded_path,
+            expanded_text,
+            expanded_data,
+            layout_pattern=None,
+            characters=unique_characters(
+                char.get('name') for panel in panels for char in panel.get('characters', [])
+            )
+        )
+
+
+def build_story_meta(source_path, simple_data: Dict) -> Dict:
+    """expand_story.py が展開済みYAMLに埋め込むメタデータを作る
+
+    Args:
+        source_path: 元のストーリーYAMLのパス
+        simple_data: 元のストーリーYAMLのパース結果
+
+    Returns:
+        Dict: story_meta の内容
+    """
+    return {
+        'source': Path(source_path).name,
+        'layout_pattern': simple_data.get('layout_pattern', 'pattern_3panel'),
+        'characters': unique_characters(
+            scene.get('character', 'TEN') for scene in simple_data.get('scenes', [])
+        ),
+    }
@@ -0,0 +1,106 @@
+"""
+テンプレートYAMLのプロセス内キャッシュ
+
+character_templates.yaml / layout_patterns.yaml を1回だけパースして保持し、
+ファイルの更新（mtime・サイズの変化）を検知したときだけ読み直す。
+バッチ実行やサーバー実行で同じYAMLを何度もパースしないためのモジュール。
+
+使い方:
+    from template_registry import get_layout_pattern, get_emotion
+
+    pattern = get_layout_pattern("pattern_3panel")
+    emotion = get_emotion("TEN", "悩み")
+
+返り値の辞書はキャッシュと共有されるので、呼び出し側で変更しないこと。
+"""
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import yaml
+
+PROJECT_ROOT = Path(__file__).parent.parent
+TEMPLATES_DIR = PROJECT_ROOT / "templates"
+
+CHARACTER_TEMPLATES_FILE = "character_templates.yaml"
+LAYOUT_PATTERNS_FILE = "layout_patterns.yaml"
+
+# {パス: (mtime_ns, size, パース結果)}
+_cache = {}
+_lock = threading.Lock()
+
+
+def load_template(filename: str) -> Dict:
+    """テンプレートYAMLを読み込む（更新がなければキャッシュを返す）
+
+    Args:
+        filename: templates/ 配下のファイル名
+
+    Returns:
+        Dict: パース済みのテンプレート
+
+    Raises:
+        FileNotFoundError: テンプレートが存在しない場合
+    """
+    path = TEMPLATES_DIR / filename
+    stat = path.stat()
+    signature = (stat.st_mtime_ns, stat.st_size)
+
+    with _lock:
+        cached = _cache.get(path)
+        if cached and cached[:2] == signature:
+            return cached[2]
+
+        with open(path, 'r', encoding='utf-8') as f:
+            data = yaml.safe_load(f) or {}
+
+        _cache[path] = (*signature, data)
+        return data
+
+
+def clear_cache():
+    """キャッシュを破棄する（テスト・ベンチマーク用）"""
+    with _lock:
+        _cache.clear()
+
+
+# ---- レイアウト ----
+
+def get_layout_patterns() -> Dict[str, Dict]:
+    """全レイアウトパターンを返す"""
+    return load_template(LAYOUT_PATTERNS_FILE)
+
+
+def get_layout_pattern(pattern_name: str) -> Optional[Dict]:
+    """レイアウトパターンを返す（存在しない場合はNone）"""
+    return get_layout_patterns().get(pattern_name)
+
+
+# ---- キャラクター・感情・小物 ----
+
+def get_character_templates() -> Dict:
+    """character_templates.yaml 全体を返す"""
+    return load_template(CHARACTER_TEMPLATES_FILE)
+
+
+def get_character_infos() -> List[Dict]:
+    """旧形式の character_infos（expand_story.py が埋め込む）を返す"""
+    return get_character_templates()['character_infos']
+
+
+def get_character(character_name: str) -> Optional[Dict]:
+    """キャラクター定義を返す（存在しない場合はNone）"""
+    return get_character_templates().get('characters', {}).get(character_name)
+
+
+def get_emotion(character_name: str, emotion: str) -> Optional[Dict]:
+    """キャラクターの感情定義を返す（キャラクター・感情が存在しない場合はNone）"""
+    char_data = get_character(character_name)
+    if not char_data:
+        return None
+    return char_data.get('emotions', {}).get(emotion)
+
+
+def get_tool(tool_name: str) -> Optional[Dict]:
+    """小物定義を返す（存在しない場合はNone）"""
+    return get_character_templates().get('tools', {}).get(tool_name)
@@ -7,12 +7,15 @@
 import sys
 import argparse
 from pathlib import Path
+from typing import Optional
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
 
 # サブモジュールをインポート
 try:
     from youtube_scraper import YouTubeScraper, save_results as save_youtube
     from instagram_scraper import InstagramScraper, save_results as save_instagram
-    from trend_analyzer import TrendAnalyzer, save_analysis
+    from trend_analyzer import TrendAnalyzer, save_analysis, positive_int
 except ImportError:
     # スクリプトの場所をパスに追加
     script_dir = Path(__file__).parent
@@ -20,7 +23,7 @@ except ImportError:
 
     from youtube_scraper import YouTubeScraper, save_results as save_youtube
     from instagram_scraper import InstagramScraper, save_results as save_instagram
-    from trend_analyzer import TrendAnalyzer, save_analysis
+    from trend_analyzer import TrendAnalyzer, save_analysis, positive_int
 
 import os
 from dotenv import load_dotenv
@@ -29,67 +32,113 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-def run_phase1_scraping(skip_youtube: bool = False, skip_instagram: bool = False):
+def scrape_youtube(max_workers: Optional[int] = None):
+    """YouTube Shorts を収集して保存"""
+    api_key = os.getenv('YOUTUBE_API_KEY')
+
+    if not api_key:
+        print('[YouTube] スキップ (YOUTUBE_API_KEY が設定されていません)\n')
+        return
+
+    print('[YouTube] YouTube Shorts を収集中...\n')
+    try:
+        scraper = YouTubeScraper(api_key)
+        kwargs = {'max_workers': max_workers} if max_workers else {}
+        videos = scraper.collect_all_keywords(max_results_per_keyword=30, **kwargs)
+        save_youtube(videos)
+        print('\n✓ YouTube 収集完了\n')
+    except Exception as e:
+        print(f'✗ YouTube 収集エラー: {e}\n')
+
+
+def scrape_instagram(max_workers: Optional[int] = None, full: bool = False):
+    """
+    Instagram を収集して保存
+
+    Args:
+        max_workers: 同時検索数
+        full: 前回の取得位置を使わず、先頭から取得し直す
+    """
+    print('[Instagram] Instagram を収集中...\n')
+    try:
+        scraper = InstagramScraper(cursor_file=None) if full else InstagramScraper()
+        kwargs = {'max_workers': max_workers} if max_workers else {}
+        posts = scraper.collect_all_hashtags(max_posts_per_tag=20, **kwargs)
+        save_instagram(posts)
+        scraper.save_cursors()
+        print('\n✓ Instagram 収集完了\n')
+    except Exception as e:
+        print(f'✗ Instagram 収集エラー: {e}\n')
+
+
+def run_phase1_scraping(skip_youtube: bool = False, skip_instagram: bool = False,
+                        youtube_workers: Optional[int] = None,
+                        instagram_workers: Optional[int] = None,
+                        instagram_full: bool = False):
     """
     フェーズ1: スクレイピング
 
+    YouTube と Instagram は並行して収集する（それぞれの中でもキーワード検索は並列）。
+
     Args:
         skip_youtube: YouTube スクレイピングをスキップ
         skip_instagram: Instagram スクレイピングをスキップ
+        youtube_workers: YouTube の同時検索数（省略時はスクレイパーのデフォルト）
+        instagram_workers: Instagram の同時検索数（省略時はスクレイパーのデフォルト）
+        instagram_full: Instagram を前回の取得位置を使わずに先頭から取得する
     """
     print('=' * 60)
     print('フェーズ1: スクレイピング')
     print('=' * 60)
     print()
 
-    # YouTube
+    tasks = []
     if not skip_youtube:
-        api_key = os.getenv('YOUTUBE_API_KEY')
-
-        if api_key:
-            print('[1/2] YouTube Shorts を収集中...\n')
-            try:
-                scraper = YouTubeScraper(api_key)
-                videos = scraper.collect_all_keywords(max_results_per_keyword=30)
-                save_youtube(videos)
-                print('\n✓ YouTube 収集完了\n')
-            except Exception as e:
-                print(f'✗ YouTube 収集エラー: {e}\n')
-        else:
-            print('[1/2] YouTube スキップ (YOUTUBE_API_KEY が設定されていません)\n')
+        tasks.append((scrape_youtube, youtube_workers))
     else:
-        print('[1/2] YouTube スキップ (--skip-youtube 指定)\n')
+        print('[YouTube] スキップ (--skip-youtube 指定)\n')
 
-    # Instagram
     if not skip_instagram:
-        print('[2/2] Instagram を収集中...\n')
-        try:
-            scraper = InstagramScraper()
-            posts = scraper.collect_all_hashtags(max_posts_per_tag=20)
-            save_instagram(posts)
-            print('\n✓ Instagram 収集完了\n')
-        except Exception as e:
-            print(f'✗ Instagram 収集エラー: {e}\n')
+        tasks.append((lambda workers: scrape_instagram(workers, full=instagram_full), instagram_workers))
     else:
-        print('[2/2] Instagram スキップ (--skip-instagram 指定)\n')
+        print('[Instagram] スキップ (--skip-instagram 指定)\n')
 
+    if not tasks:
+        return
 
-def run_phase2_analysis():
-    """フェーズ2: トレンド分析"""
+    with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+        for future in [executor.submit(task, workers) for task, workers in tasks]:
+            future.result()
+
+
+def run_phase2_analysis(days: int = 1):
+    """
+    フェーズ2: トレンド分析
+
+    Args:
+        days: 分析する日数（今日を含む。1なら今日の収集分のみ）
+    """
     print('=' * 60)
     print('フェーズ2: トレンド分析')
     print('=' * 60)
     print()
 
     analyzer = TrendAnalyzer()
-    analyzer.load_latest_data()
+    today = date.today()
+    if days > 1 or analyzer.store.dates(today, today):
+        # ストアの日ごとの集計（キャッシュ済みならタイトルは走査しない）を足し合わせ、
+        # 前の期間からの伸び（急上昇スコア）も求める
+        print('\n分析中...\n')
+        analysis = analyzer.analyze_window(days)
+    else:
+        analyzer.load_latest_data()
+        print('\n分析中...\n')
+        analysis = analyzer.analyze()
 
-    if not analyzer.posts:
+    if not analysis['total_posts']:
         print('✗ データが見つかりません。先にスクレイピングを実行してください。')
         return
 
-    print('\n分析中...\n')
-    analysis = analyzer.analyze()
     save_analysis(analysis)
 
     print('\n✓ 分析完了\n')
@@ -123,6 +172,27 @@ def main():
         action='store_true',
         help='分析のみ実行（スクレイピングはスキップ）'
     )
+    parser.add_argument(
+        '--days',
+        type=positive_int,
+        default=1,
+        help='分析する日数（今日を含む、デフォルト: 1）。前の同じ日数からの急上昇スコアも出す'
+    )
+    parser.add_argument(
+        '--instagram-full',
+        action='store_true',
+        help='Instagram を前回の取得位置を使わずに先頭から取得'
+    )
+    parser.add_argument(
+        '--youtube-workers',
+        type=int,
+        help='YouTube の同時検索数（1で順番に実行）'
+    )
+    parser.add_argument(
+        '--instagram-workers',
+        type=int,
+        help='Instagram の同時検索数（1で順番に実行）'
+    )
 
     args = parser.parse_args()
 
@@ -136,13 +206,16 @@ def main():
     if not args.analyze_only:
         run_phase1_scraping(
             skip_youtube=args.skip_youtube,
-            skip_instagram=args.skip_instagram
+            skip_instagram=args.skip_instagram,
+            youtube_workers=args.youtube_workers,
+            instagram_workers=args.instagram_workers,
+            instagram_full=args.instagram_full
         )
     else:
         print('フェーズ1をスキップ (--analyze-only 指定)\n')
 
     # フェーズ2: 分析
-    run_phase2_analysis()
+    run_phase2_analysis(days=args.days)
 
     print('\n')
     print('=' * 60)
@@ -6,11 +6,15 @@ AI関連のReels/投稿タイトルを収集する
 
 import os
 import json
+import threading
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 import instaloader
 from dotenv import load_dotenv
 
+from parallel_collect import RateLimiter, collect_concurrently, setting
+from trend_store import TrendStore
+
 # 環境変数を読み込み
 load_dotenv()
 
@@ -33,49 +37,230 @@ TARGET_HASHTAGS = [
     "aiツール"
 ]
 
+# 同時に実行するハッシュタグ検索の数（Instagram は制限が厳しいので少なめ。環境変数 INSTAGRAM_MAX_WORKERS で変更可）。
+# instaloader の InstaloaderContext はスレッドセーフではないので、ワーカーごとに Instaloader を持つ
+DEFAULT_MAX_WORKERS = 2
+# ハッシュタグ検索の開始数の上限（回/分、0で無制限。環境変数 INSTAGRAM_REQUESTS_PER_MINUTE で変更可）
+REQUESTS_PER_MINUTE = 10.0
+
+# ハッシュタグごとの前回の取得位置
+DEFAULT_CURSOR_FILE = 'ideas/trend_data/instagram_cursors.json'
+# 前回取得済みの投稿がこの件数続いたら、それより古い投稿は取得済みとみなして止める
+# （ハッシュタグの投稿一覧は厳密な新着順ではないので、1件目で止めない）
+KNOWN_POSTS_TO_STOP = 3
+# カーソルに覚えておく shortcode の数（max_posts で打ち切った回の投稿を次回に読み飛ばすのに使うので多めに）
+CURSOR_SHORTCODES = 200
+
+
+class HashtagCursors:
+    """ハッシュタグごとの前回の取得位置（最新の投稿日時と shortcode）をファイルに保存する
+
+    ファイルの形式:
+        {"claudecode": {"last_seen_at": "2025-11-13T10:00:00+00:00",
+                        "shortcodes": ["DA1b2C3d4E5", ...],
+                        "updated_at": "2025-11-13T22:42:20"}, ...}
+    """
+
+    def __init__(self, path: str = DEFAULT_CURSOR_FILE):
+        """
+        Args:
+            path: カーソルファイルのパス
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.cursors: Dict[str, Dict] = {}
+
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.cursors = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f'Could not read cursors ({path}): {e}')
+
+    def get(self, hashtag: str) -> Optional[Dict]:
+        """前回の取得位置（無ければNone）"""
+        with self.lock:
+            return self.cursors.get(hashtag)
+
+    def update(self, hashtag: str, posts: List[Dict], shortcodes: List[str], complete: bool = True):
+        """
+        今回取得した投稿でカーソルを進める
+
+        last_seen_at は「そこまでの投稿はすべて取得済み」という位置なので、前回の位置まで
+        たどり着く前に max_posts で打ち切った場合（complete=False）は進めない。今回取得した投稿は
+        shortcode だけ覚えておき、次回はそれを読み飛ばして間の投稿から取得する。
+
+        Args:
+            hashtag: ハッシュタグ
+            posts: 今回取得した投稿情報
+            shortcodes: 今回取得した投稿の shortcode（新しい順）
+            complete: 前回の位置（または一覧の最後）まで読んだかどうか
+        """
+        if not posts:
+            return
+
+        with self.lock:
+            previous = self.cursors.get(hashtag, {})
+            if complete or not previous.get('last_seen_at'):
+                last_seen_at = max(
+                    [post['published_at'] for post in posts] + [previous.get('last_seen_at', '')]
+                )
+            else:
+                last_seen_at = previous['last_seen_at']
+            known = list(dict.fromkeys(shortcodes + previous.get('shortcodes', [])))
+            self.cursors[hashtag] = {
+                'last_seen_at': last_seen_at,
+                'shortcodes': known[:CURSOR_SHORTCODES],
+                'updated_at': datetime.now().isoformat()
+            }
+
+    def save(self):
+        """ファイルに保存（一時ファイル経由で書き換える）"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with self.lock:
+            data = json.dumps(self.cursors, ensure_ascii=False, indent=2)
+
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
 
 class InstagramScraper:
     """Instagram の投稿タイトルを収集するクラス"""
 
-    def __init__(self):
-        """初期化"""
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 cursor_file: Optional[str] = DEFAULT_CURSOR_FILE):
+        """
+        Args:
+            requests_per_minute: ハッシュタグ検索の開始数の上限（回/分、0で無制限。
+                省略時は INSTAGRAM_REQUESTS_PER_MINUTE）
+            cursor_file: ハッシュタグごとの取得位置の保存先（None で毎回先頭から全件取得）
+        """
+        if requests_per_minute is None:
+            requests_per_minute = setting('INSTAGRAM_REQUESTS_PER_MINUTE', REQUESTS_PER_MINUTE)
         self.loader = instaloader.Instaloader()
+        # スレッドごとの Instaloader（このスレッドでは self.loader を使う。thread_loader 参照）
+        self._local = threading.local()
+        self._local.loader = self.loader
+        # ログインしていればそのユーザー名とセッション（ワーカーの Instaloader にコピーする）
+        self.username: Optional[str] = None
+        self.session_data: Optional[Dict] = None
+        self.rate_limiter = RateLimiter(requests_per_minute, burst=1)
+        self.cursors = HashtagCursors(cursor_file) if cursor_file else None
 
         # ログインが必要な場合（オプション）
-        username = os.getenv('INSTAGRAM_USERNAME')
-        password = os.getenv('INSTAGRAM_PASSWORD')
+        username = setting('INSTAGRAM_USERNAME', '')
+        password = setting('INSTAGRAM_PASSWORD', '')
+        # 保存済みセッション（省略時は instaloader の既定の場所）
+        session_file = setting('INSTAGRAM_SESSION_FILE', '') or None
+
+        if username and self._load_session(username, session_file):
+            self._remember_session(username)
+            return
 
         if username and password:
             try:
                 self.loader.login(username, password)
                 print('Instagram login successful')
+                self._remember_session(username)
+                self.loader.save_session_to_file(session_file)
             except Exception as e:
                 print(f'Instagram login failed: {e}')
                 print('Continuing without login (limited access)')
 
+    def _load_session(self, username: str, session_file: Optional[str]) -> bool:
+        """
+        保存済みのセッションを読み込む（毎回ログインしない）
+
+        Returns:
+            有効なセッションを読み込めたかどうか
+        """
+        try:
+            self.loader.load_session_from_file(username, session_file)
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            print(f'Could not load Instagram session: {e}')
+            return False
+
+        if self.loader.test_login() != username:
+            print('Saved Instagram session has expired')
+            return False
+
+        print('Instagram session loaded')
+        return True
+
+    def _remember_session(self, username: str):
+        self.username = username
+        self.session_data = self.loader.save_session()
+
+    def thread_loader(self) -> instaloader.Instaloader:
+        """
+        このスレッド用の Instaloader を返す
+
+        InstaloaderContext（requests のセッション・レート制御）はスレッド間で共有できないので、
+        ワーカースレッドごとに作り、ログインしていればセッションをコピーする。
+        """
+        loader = getattr(self._local, 'loader', None)
+        if loader is None:
+            loader = instaloader.Instaloader()
+            if self.username:
+                loader.load_session(self.username, self.session_data)
+            self._local.loader = loader
+        return loader
+
     def search_hashtag(self, hashtag: str, max_posts: int = 30) -> List[Dict]:
         """
         指定ハッシュタグで投稿を検索
 
+        カーソルがある場合は、前回の位置（last_seen_at）以前の投稿が KNOWN_POSTS_TO_STOP 件続いたところで
+        止める。shortcode が既知の投稿（前回 max_posts で打ち切った回に取得したもの）は読み飛ばす。
+        最後まで問題なく取得できたときだけカーソルを進める。
+
         Args:
             hashtag: ハッシュタグ（# なし）
             max_posts: 取得する最大投稿数
 
         Returns:
-            投稿情報のリスト
+            投稿情報のリスト（カーソルがある場合は前回以降の新しい投稿のみ）
         """
         posts = []
+        shortcodes = []
+
+        cursor = self.cursors.get(hashtag) if self.cursors else None
+        known_shortcodes = set(cursor.get('shortcodes', [])) if cursor else set()
+        last_seen_at = cursor.get('last_seen_at') if cursor else None
+
+        # 前回の位置か一覧の最後まで読んだか（max_posts で打ち切ったら False）
+        complete = True
 
         try:
+            self.rate_limiter.acquire()
             hashtag_obj = instaloader.Hashtag.from_name(
-                self.loader.context,
+                self.thread_loader().context,
                 hashtag
             )
 
             print(f'Searching #{hashtag}...')
 
-            for i, post in enumerate(hashtag_obj.get_posts()):
-                if i >= max_posts:
+            known_in_a_row = 0
+            for post in hashtag_obj.get_posts():
+                published_at = post.date_utc.isoformat()
+                if last_seen_at and published_at <= last_seen_at:
+                    known_in_a_row += 1
+                    if known_in_a_row >= KNOWN_POSTS_TO_STOP:
+                        break
+                    continue
+                known_in_a_row = 0
+                if post.shortcode in known_shortcodes:
+                    continue
+
+                if len(posts) >= max_posts:
+                    complete = False
                     break
 
                 # Reels または通常投稿のキャプションを取得
@@ -87,72 +272,69 @@ class InstagramScraper:
                 posts.append({
                     'title': title,
                     'url': f'https://www.instagram.com/p/{post.shortcode}/',
-                    'published_at': post.date_utc.isoformat(),
+                    'published_at': published_at,
                     'likes': post.likes,
                     'comments': post.comments,
                     'is_video': post.is_video,
                     'detected_keywords': [hashtag]
                 })
+                shortcodes.append(post.shortcode)
 
         except Exception as e:
             print(f'Error searching #{hashtag}: {e}')
+            return posts
+
+        if self.cursors:
+            self.cursors.update(hashtag, posts, shortcodes, complete)
 
         return posts
 
-    def collect_all_hashtags(self, max_posts_per_tag: int = 20) -> List[Dict]:
+    def collect_all_hashtags(self, max_posts_per_tag: int = 20,
+                             max_workers: Optional[int] = None) -> List[Dict]:
         """
         すべてのターゲットハッシュタグで検索を実行
 
+        検索はハッシュタグごとに並列で実行し（レート制限付き）、終わったものから
+        重複を除いてマージする。カーソルがある場合は前回以降の新しい投稿だけを取得する
+        （結果を保存したあとで save_cursors を呼ぶこと）。
+
         Args:
             max_posts_per_tag: ハッシュタグごとの最大取得件数
+            max_workers: 同時に実行する検索の数（1なら順番に実行、省略時は INSTAGRAM_MAX_WORKERS）
 
         Returns:
             すべての投稿情報
         """
-        all_posts = []
-
-        for hashtag in TARGET_HASHTAGS:
-            posts = self.search_hashtag(hashtag, max_posts_per_tag)
-            all_posts.extend(posts)
-            print(f'  Found: {len(posts)} posts')
-
-        # 重複を削除（URLでユニーク化）
-        unique_posts = []
-        seen_urls = set()
-
-        for post in all_posts:
-            if post['url'] not in seen_urls:
-                unique_posts.append(post)
-                seen_urls.add(post['url'])
+        if max_workers is None:
+            max_workers = setting('INSTAGRAM_MAX_WORKERS', DEFAULT_MAX_WORKERS)
+        unique_posts = collect_concurrently(
+            TARGET_HASHTAGS,
+            lambda hashtag: self.search_hashtag(hashtag, max_posts_per_tag),
+            max_workers=max_workers,
+            unit='posts'
+        )
 
         print(f'\nTotal unique posts: {len(unique_posts)}')
         return unique_posts
 
+    def save_cursors(self):
+        """ハッシュタグごとの取得位置を保存（取得結果を保存したあとに呼ぶ）"""
+        if self.cursors:
+            self.cursors.save()
+
 
 def save_results(posts: List[Dict], output_dir: str = 'ideas/trend_data'):
     """
-    結果をJSONファイルに保存
+    結果をトレンドストア（output_dir/store/YYYY-MM-DD.jsonl）に追記
 
     Args:
         posts: 投稿情報のリスト
         output_dir: 保存先ディレクトリ
     """
-    os.makedirs(output_dir, exist_ok=True)
-
-    today = datetime.now().strftime('%Y-%m-%d')
-    filename = os.path.join(output_dir, f'instagram_{today}.json')
-
-    data = {
-        'collected_at': datetime.now().isoformat(),
-        'source': 'instagram',
-        'total_count': len(posts),
-        'posts': posts
-    }
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    store = TrendStore(os.path.join(output_dir, 'store'))
+    filename = store.append('instagram', posts)
 
-    print(f'\nResults saved to: {filename}')
+    print(f'\nResults saved to: {filename} ({len(posts)} records)')
 
 
 def main():
@@ -163,6 +345,7 @@ def main():
     posts = scraper.collect_all_hashtags(max_posts_per_tag=20)
 
     save_results(posts)
+    scraper.save_cursors()
 
     print('\nDone!')
 
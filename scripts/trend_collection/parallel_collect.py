@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+キーワード検索の並列実行（スクレイパー共通）
+
+キーワードごとの検索を上限付きのスレッドプールで並べて実行し、
+終わったものから順に URL で重複を除きながらマージする。
+マージ結果は順番に1つずつ検索した場合と同じになる
+（同じURLが複数キーワードで見つかったら、キーワードリストで先のものを残す）。
+
+ソースごとのレート制限には scripts/rate_limiter.py の RateLimiter（トークンバケット）を使う
+（Gemini API の呼び出しと共有する、標準ライブラリだけのモジュール）。
+同時検索数などの設定は、scripts/settings.py の setting で使う時点に読む（.env を含む）。
+
+使い方:
+    limiter = RateLimiter(60)
+    posts = collect_concurrently(TARGET_KEYWORDS, search, max_workers=4)
+"""
+
+import sys
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List
+
+try:
+    from rate_limiter import RateLimiter
+    from settings import setting
+except ImportError:
+    # scripts/ 直下の共有モジュールをパスに追加
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from rate_limiter import RateLimiter
+    from settings import setting
+
+
+class IncrementalMerger:
+    """キーワードごとの検索結果を、届いた順に URL で重複を除きながらマージする"""
+
+    def __init__(self):
+        # {URL: (キーワード順位, キーワード内の順位, 投稿)}
+        self.entries: Dict[str, tuple] = {}
+
+    def add(self, keyword_index: int, posts: List[Dict]) -> int:
+        """
+        1キーワード分の結果を追加
+
+        Args:
+            keyword_index: キーワードリスト内の位置
+            posts: そのキーワードの検索結果
+
+        Returns:
+            新しく見つかったURLの数
+        """
+        added = 0
+        for position, post in enumerate(posts):
+            url = post['url']
+            current = self.entries.get(url)
+            if current is None:
+                added += 1
+            if current is None or (keyword_index, position) < current[:2]:
+                self.entries[url] = (keyword_index, position, post)
+        return added
+
+    def results(self) -> List[Dict]:
+        """順番に検索した場合と同じ並びの結果"""
+        return [post for _, _, post in sorted(self.entries.values(), key=lambda entry: entry[:2])]
+
+
+def collect_concurrently(keywords: List[str], search: Callable[[str], List[Dict]],
+                         max_workers: int = 4, unit: str = 'posts') -> List[Dict]:
+    """
+    キーワードごとの検索を並列で実行し、URLでユニーク化した結果を返す
+
+    Args:
+        keywords: 検索キーワードのリスト
+        search: 1キーワード分を検索する関数（例外は関数内で処理すること）
+        max_workers: 同時に実行する検索の数（1なら順番に実行）
+        unit: ログ表示用の単位（'videos' / 'posts'）
+
+    Returns:
+        すべての結果（URLでユニーク化済み）
+    """
+    merger = IncrementalMerger()
+
+    if max_workers <= 1:
+        for index, keyword in enumerate(keywords):
+            posts = search(keyword)
+            merger.add(index, posts)
+            print(f'  Found: {len(posts)} {unit}')
+        return merger.results()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(search, keyword): index
+            for index, keyword in enumerate(keywords)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            index = futures[future]
+            posts = future.result()
+            added = merger.add(index, posts)
+            print(f'  [{done}/{len(keywords)}] {keywords[index]}: '
+                  f'{len(posts)} {unit} (new: {added})')
+
+    return merger.results()
@@ -7,10 +7,15 @@
 import os
 import json
 import re
-from datetime import datetime
-from typing import List, Dict, Tuple
+import math
+import hashlib
+import argparse
+from datetime import datetime, timedelta
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from collections import Counter, defaultdict
 
+from trend_store import TrendStore, to_date
+
 # 対象の固有名詞（LLM、AI関連）
 TARGET_KEYWORDS = [
     # Claude系
@@ -54,41 +59,399 @@ TARGET_KEYWORDS = [
 ]
 
 # 文脈パターン（どのように紹介されているか）
+# 上から順に評価し、最初にマッチしたカテゴリを採用する
+# （以前は前後に (.{0,20}) が付いていたが、0文字でもマッチするため判定結果は変わらず、
+#   バックトラックが増えるだけなので外している）
 CONTEXT_PATTERNS = [
     # リリース・アップデート系
-    (r'(.{0,20})(リリース|発表|登場|公開|アップデート)(.{0,20})', 'リリース・アップデート'),
-    (r'(.{0,20})(出る|来た|キタ)(!|！|？|\?)', '速報・噂'),
+    (r'リリース|発表|登場|公開|アップデート', 'リリース・アップデート'),
+    (r'(?:出る|来た|キタ)[!！？?]', '速報・噂'),
 
     # 使い方・Tips系
-    (r'(.{0,20})(使い方|方法|やり方|活用|テクニック)(.{0,20})', '使い方・Tips'),
-    (r'(.{0,20})(便利|すごい|最強|神)(.{0,20})', '評価・レビュー'),
+    (r'使い方|方法|やり方|活用|テクニック', '使い方・Tips'),
+    (r'便利|すごい|最強|神', '評価・レビュー'),
 
     # 比較系
-    (r'(.{0,20})(vs|比較|違い)(.{0,20})', '比較'),
+    (r'vs|比較|違い', '比較'),
 
     # 問題・注意系
-    (r'(.{0,20})(危険|注意|問題|ヤバい)(.{0,20})', '問題・注意'),
+    (r'危険|注意|問題|ヤバい', '問題・注意'),
 
     # その他
-    (r'(.{0,20})(裏技|秘密|知らない|初心者)(.{0,20})', 'ハウツー'),
+    (r'裏技|秘密|知らない|初心者', 'ハウツー'),
 ]
 
+# どのパターンにもマッチしない場合のカテゴリ
+DEFAULT_CONTEXT = 'その他'
+
+# ランキングに載せるキーワード数
+RANKING_SIZE = 20
+
+# キーワードごとに保持するサンプルタイトル数
+SAMPLE_TITLES = 5
+
+# 急上昇スコアでの いいね数の重み（再生数の log に対する倍率）
+LIKE_WEIGHT = 2.0
+
+# 日ごとの集計のキャッシュ置き場
+DEFAULT_AGGREGATE_CACHE_DIR = 'cache/trend_aggregates'
+
+
+class KeywordMatcher:
+    """TARGET_KEYWORDS を1回のスキャンで全部見つけるマッチャー
+
+    キーワードごとに re.search を繰り返す代わりに、全キーワードを1本の正規表現
+    （先読み + 名前付きグループの選択）にまとめ、タイトルを1回だけ走査する。
+    各位置では最長のキーワードだけがマッチするので、「Claude Code」に含まれる
+    「Claude」のように、他のキーワードに部分文字列として含まれるキーワードは事前に
+    求めた包含関係から補う。結果は キーワードごとの re.search(..., re.IGNORECASE) と一致する。
+    """
+
+    def __init__(self, keywords: List[str]):
+        """
+        Args:
+            keywords: 検出対象のキーワード（この順序で結果を返す）
+        """
+        self.keywords = list(dict.fromkeys(keywords))
+        self.order = {keyword: i for i, keyword in enumerate(self.keywords)}
+
+        # 長い順に並べて、同じ位置では最長のキーワードを優先する
+        by_length = sorted(range(len(self.keywords)), key=lambda i: -len(self.keywords[i]))
+        alternatives = '|'.join(f'(?P<k{i}>{re.escape(self.keywords[i])})' for i in by_length)
+        self.pattern = re.compile(f'(?=(?:{alternatives}))', re.IGNORECASE)
+
+        # キーワードが見つかったときに一緒に含まれることが確定するキーワード
+        folded = [keyword.casefold() for keyword in self.keywords]
+        self.implied = [
+            [j for j, other in enumerate(folded) if j != i and other in text]
+            for i, text in enumerate(folded)
+        ]
+
+    def find(self, title: str) -> List[str]:
+        """タイトルに含まれるキーワードを返す（keywords の順）"""
+        found = set()
+        for match in self.pattern.finditer(title):
+            i = int(match.lastgroup[1:])
+            if i not in found:
+                found.add(i)
+                found.update(self.implied[i])
+        return [self.keywords[i] for i in sorted(found)]
+
+
+KEYWORD_MATCHER = KeywordMatcher(TARGET_KEYWORDS)
+
+
+class ContextClassifier:
+    """CONTEXT_PATTERNS でタイトルの文脈カテゴリを1回の走査で判定する
+
+    全パターンを1本の正規表現（先読み + 名前付きグループの選択）にまとめる。
+    各位置ではリストの前にあるパターンが優先され、全位置の中で最も前のパターンを
+    採用するので、「上から順に re.search して最初にマッチしたもの」と同じ結果になる。
+    """
+
+    def __init__(self, patterns: List[Tuple[str, str]], default: str = DEFAULT_CONTEXT):
+        """
+        Args:
+            patterns: (正規表現, カテゴリ) のリスト（優先順）
+            default: どれにもマッチしない場合のカテゴリ
+        """
+        self.categories = [category for _, category in patterns]
+        self.default = default
+        alternatives = '|'.join(f'(?P<c{i}>{pattern})' for i, (pattern, _) in enumerate(patterns))
+        self.pattern = re.compile(f'(?=(?:{alternatives}))')
+
+    def classify(self, title: str) -> str:
+        """タイトルの文脈カテゴリを返す"""
+        best = None
+        for match in self.pattern.finditer(title):
+            i = int(match.lastgroup[1:])
+            if best is None or i < best:
+                best = i
+                if best == 0:
+                    break
+        return self.default if best is None else self.categories[best]
+
+
+CONTEXT_CLASSIFIER = ContextClassifier(CONTEXT_PATTERNS)
+
+
+class TrendAggregate:
+    """キーワード数・文脈カテゴリ数・サンプルタイトルを1件ずつ積み上げる集計
+
+    投稿を全部メモリに載せずに分析するための入れ物。保持するのは
+    キーワード・カテゴリごとのカウンタと、キーワードごとに最大 sample_size 件の
+    サンプルタイトルだけなので、大きさはキーワード数で決まり、投稿数には比例しない。
+    サンプルタイトルは無作為抽出ではなく、最初に見つかった sample_size 件（analyze の以前の出力と同じ）。
+    """
+
+    def __init__(self, sample_size: int = SAMPLE_TITLES):
+        """
+        Args:
+            sample_size: キーワードごとに保持するサンプルタイトル数
+        """
+        self.sample_size = sample_size
+        self.total_posts = 0
+        self.keyword_counts = Counter()
+        self.context_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.sample_titles: Dict[str, List[str]] = defaultdict(list)
+        # キーワードごとの再生数・いいね数の合計と、エンゲージメントで重み付けしたスコア
+        self.views = Counter()
+        self.likes = Counter()
+        self.scores = Counter()
+
+    def add(self, title: str, keywords: List[str], context: str,
+            views: int = 0, likes: int = 0, weight: float = 1.0):
+        """
+        1件分の検出結果を加える
+
+        Args:
+            title: タイトル
+            keywords: 検出したキーワード
+            context: 文脈カテゴリ（キーワードが無い場合は使わない）
+            views: 再生数
+            likes: いいね数
+            weight: エンゲージメントで重み付けした1件分のスコア（engagement_weight）
+        """
+        self.total_posts += 1
+        self.keyword_counts.update(keywords)
+
+        for keyword in keywords:
+            self.context_counts[keyword][context] += 1
+            samples = self.sample_titles[keyword]
+            if len(samples) < self.sample_size:
+                samples.append(title)
+            self.views[keyword] += views
+            self.likes[keyword] += likes
+            self.scores[keyword] += weight
+
+    def merge(self, other: 'TrendAggregate'):
+        """
+        別の集計（別の日など）を足し合わせる
+
+        サンプルタイトルは self の分を優先し、足りない分だけ other から補う。
+        """
+        self.total_posts += other.total_posts
+        self.keyword_counts.update(other.keyword_counts)
+        for keyword, contexts in other.context_counts.items():
+            self.context_counts[keyword].update(contexts)
+        for keyword, titles in other.sample_titles.items():
+            samples = self.sample_titles[keyword]
+            samples.extend(titles[:max(0, self.sample_size - len(samples))])
+        self.views.update(other.views)
+        self.likes.update(other.likes)
+        self.scores.update(other.scores)
+
+    def ranking(self, top: int = RANKING_SIZE) -> List[Dict]:
+        """出現回数の多い順のランキング（analyze の ranking と同じ形式）"""
+        return [
+            {
+                'keyword': keyword,
+                'count': count,
+                'contexts': dict(self.context_counts.get(keyword, {})),
+                'sample_titles': list(self.sample_titles.get(keyword, []))
+            }
+            for keyword, count in self.keyword_counts.most_common(top)
+        ]
+
+    def to_dict(self) -> Dict:
+        """JSON に保存できる形に変換"""
+        return {
+            'sample_size': self.sample_size,
+            'total_posts': self.total_posts,
+            'keyword_counts': dict(self.keyword_counts),
+            'context_counts': {keyword: dict(counts) for keyword, counts in self.context_counts.items()},
+            'sample_titles': dict(self.sample_titles),
+            'views': dict(self.views),
+            'likes': dict(self.likes),
+            'scores': dict(self.scores),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TrendAggregate':
+        """to_dict の結果から復元"""
+        aggregate = cls(data['sample_size'])
+        aggregate.total_posts = data['total_posts']
+        aggregate.keyword_counts = Counter(data['keyword_counts'])
+        for keyword, counts in data['context_counts'].items():
+            aggregate.context_counts[keyword] = Counter(counts)
+        for keyword, titles in data['sample_titles'].items():
+            aggregate.sample_titles[keyword] = list(titles)
+        aggregate.views = Counter(data['views'])
+        aggregate.likes = Counter(data['likes'])
+        aggregate.scores = Counter(data['scores'])
+        return aggregate
+
+
+def analyzer_fingerprint() -> str:
+    """集計結果に影響する設定（キーワード・文脈パターン・重み）のハッシュ
+
+    どれかを変えたら、キャッシュ済みの日ごとの集計は作り直しになる。
+    """
+    settings = json.dumps(
+        [TARGET_KEYWORDS, CONTEXT_PATTERNS, DEFAULT_CONTEXT, SAMPLE_TITLES, LIKE_WEIGHT],
+        ensure_ascii=False
+    )
+    return hashlib.sha256(settings.encode('utf-8')).hexdigest()[:16]
+
+
+class AggregateCache:
+    """日ごとの集計（TrendAggregate）のディスクキャッシュ
+
+    cache_dir/YYYY-MM-DD.json に、元データ（ストアのその日のパーティション）の
+    SHA-256 と一緒に保存する。元データのハッシュか analyzer_fingerprint が変わった日だけ作り直す。
+    mtime・サイズが保存時と同じならハッシュの計算も省く。
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_AGGREGATE_CACHE_DIR):
+        """
+        Args:
+            cache_dir: キャッシュファイルを置くディレクトリ
+        """
+        self.cache_dir = cache_dir
+        self.fingerprint = analyzer_fingerprint()
+
+    def _path(self, day) -> str:
+        return os.path.join(self.cache_dir, f'{day.isoformat()}.json')
+
+    def get(self, day, source_path: str):
+        """
+        キャッシュ済みの集計を返す
+
+        Args:
+            day: 日付
+            source_path: その日のパーティションファイル
+
+        Returns:
+            Tuple: (TrendAggregate または None, 元データの情報)。
+                   元データの情報は put にそのまま渡す
+        """
+        stat = os.stat(source_path)
+        source = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': None}
+
+        try:
+            with open(self._path(day), 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            cached = None
+
+        if cached and cached.get('fingerprint') == self.fingerprint:
+            cached_source = cached.get('source', {})
+            if (cached_source.get('size'), cached_source.get('mtime_ns')) == (source['size'], source['mtime_ns']):
+                return TrendAggregate.from_dict(cached['aggregate']), source
+
+            # mtime だけ変わった（コピー・checkout など）場合は内容で比べる
+            source['digest'] = file_digest(source_path)
+            if cached_source.get('digest') == source['digest']:
+                aggregate = TrendAggregate.from_dict(cached['aggregate'])
+                self.put(day, source, aggregate)
+                return aggregate, source
+
+        return None, source
+
+    def put(self, day, source: Dict, aggregate: TrendAggregate):
+        """集計を保存（一時ファイル経由で書き換える）"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(day)
+
+        data = {
+            'date': day.isoformat(),
+            'fingerprint': self.fingerprint,
+            'source': source,
+            'aggregate': aggregate.to_dict(),
+        }
+
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+def file_digest(path: str) -> str:
+    """ファイル内容の SHA-256"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def engagement_weight(post: Dict) -> float:
+    """
+    急上昇スコアに使う1件分の重み
+
+    1 + log10(1 + 再生数) + LIKE_WEIGHT × log10(1 + いいね数)。
+    log を取るので、1本のバズ動画だけでキーワード全体のスコアが決まらない。
+    Instagram（再生数なし）は likes を使う。
+    """
+    views = post.get('view_count') or 0
+    likes = post.get('like_count', post.get('likes')) or 0
+    return 1 + math.log10(1 + views) + LIKE_WEIGHT * math.log10(1 + likes)
+
+
+def iter_jsonl(paths: Iterable[str]) -> Iterator[Dict]:
+    """
+    JSON Lines ファイルから投稿を1件ずつ読む
+
+    Args:
+        paths: JSON Lines ファイルのパス
+    """
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def unique_by_url(posts: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    URL の重複を除いて投稿を1件ずつ返す（最初に出てきたものを残す）
+
+    投稿そのものは保持しないが、見たURLの集合はユニークなURLの数に比例して大きくなる
+    （期間全体で重複を除くため、上限は設けない）。
+    """
+    seen = set()
+    for post in posts:
+        url = post.get('url')
+        if url:
+            if url in seen:
+                continue
+            seen.add(url)
+        yield post
+
 
 class TrendAnalyzer:
     """トレンド分析クラス"""
 
-    def __init__(self, data_dir: str = 'ideas/trend_data'):
+    def __init__(self, data_dir: str = 'ideas/trend_data',
+                 cache_dir: Optional[str] = DEFAULT_AGGREGATE_CACHE_DIR):
         """
         Args:
             data_dir: 生データが保存されているディレクトリ
+            cache_dir: 日ごとの集計のキャッシュ置き場（None でキャッシュしない）
         """
         self.data_dir = data_dir
+        self.store = TrendStore(os.path.join(data_dir, 'store'))
         self.posts = []
+        self.matcher = KEYWORD_MATCHER
+        self.classifier = CONTEXT_CLASSIFIER
+        # {日付: その日の TrendAggregate}
+        self._daily: Dict = {}
+        self.aggregate_cache = AggregateCache(cache_dir) if cache_dir else None
 
     def load_latest_data(self):
-        """最新の収集データを読み込む"""
-        today = datetime.now().strftime('%Y-%m-%d')
+        """最新の収集データ（今日の分）を読み込む"""
+        today = datetime.now().date()
+
+        if self.store.dates(today, today):
+            self.load_window(today, today)
+            return
 
+        # ストア導入前の日次スナップショット
+        today = today.isoformat()
         youtube_file = os.path.join(self.data_dir, f'youtube_{today}.json')
         instagram_file = os.path.join(self.data_dir, f'instagram_{today}.json')
 
@@ -101,91 +464,230 @@ class TrendAnalyzer:
 
         print(f'Total posts loaded: {len(self.posts)}')
 
+    def load_window(self, start, end=None):
+        """
+        指定期間の収集データをストアから読み込む（URLごとに最新の値で1件にまとめる）
+
+        Args:
+            start: 開始日（含む、date または 'YYYY-MM-DD'）
+            end: 終了日（含む、省略時は今日）
+        """
+        end = end or datetime.now().date()
+
+        for source in ('youtube', 'instagram'):
+            posts = self.store.latest_posts(start, end, source=source)
+            self.posts.extend(posts)
+            if posts:
+                print(f'Loaded: {source} {start} - {end} ({len(posts)} posts)')
+
+        print(f'Total posts loaded: {len(self.posts)}')
+
+    def iter_window(self, start, end=None) -> Iterator[Dict]:
+        """
+        指定期間の収集データをストアから1件ずつ読む（URLの重複は最初の観測だけ残す）
+
+        load_window と違って投稿を self.posts に溜めない
+        （重複除去のため、見たURLの集合だけは持つ。unique_by_url 参照）。
+
+        Args:
+            start: 開始日（含む、date または 'YYYY-MM-DD'）
+            end: 終了日（含む、省略時は今日）
+        """
+        end = end or datetime.now().date()
+        return unique_by_url(self.store.iter_records(start, end))
+
     def extract_keywords(self) -> Counter:
         """
-        タイトルから固有名詞を抽出し、出現頻度をカウント
+        タイトルから固有名詞を抽出し、出現頻度をカウント（読み込み済みの self.posts が対象）
 
         Returns:
             Counter: キーワードと出現回数
         """
         keyword_counter = Counter()
-
         for post in self.posts:
-            title = post.get('title', '')
-
-            # 各キーワードの出現をチェック
-            for keyword in TARGET_KEYWORDS:
-                # 大文字小文字を区別しない検索
-                if re.search(re.escape(keyword), title, re.IGNORECASE):
-                    keyword_counter[keyword] += 1
-
+            keyword_counter.update(self.matcher.find(post.get('title', '')))
         return keyword_counter
 
     def extract_contexts(self) -> Dict[str, List[Tuple[str, str]]]:
         """
-        キーワードごとの文脈を抽出
+        キーワードごとの文脈を抽出（読み込み済みの self.posts が対象）
 
         Returns:
             Dict: {キーワード: [(タイトル, 文脈カテゴリ), ...]}
         """
         keyword_contexts = defaultdict(list)
-
         for post in self.posts:
             title = post.get('title', '')
+            keywords = self.matcher.find(title)
+            if not keywords:
+                continue
+            # 文脈はタイトルごとに1回だけ分類して、全キーワードで共有する
+            context = self.classifier.classify(title)
+            for keyword in keywords:
+                keyword_contexts[keyword].append((title, context))
+        return keyword_contexts
 
-            # キーワードを検出
-            detected_keywords = []
-            for keyword in TARGET_KEYWORDS:
-                if re.search(re.escape(keyword), title, re.IGNORECASE):
-                    detected_keywords.append(keyword)
+    def aggregate(self, posts: Iterable[Dict]) -> TrendAggregate:
+        """
+        投稿を1件ずつ読みながら集計する（タイトルはそれぞれ1回だけ走査）
 
-            # 文脈パターンをマッチング
-            for keyword in detected_keywords:
-                context_category = 'その他'
+        Args:
+            posts: 投稿のイテラブル（ジェネレータでもよい）
 
-                for pattern, category in CONTEXT_PATTERNS:
-                    if re.search(pattern, title):
-                        context_category = category
-                        break
+        Returns:
+            TrendAggregate: 集計結果
+        """
+        aggregate = TrendAggregate()
 
-                keyword_contexts[keyword].append((title, context_category))
+        for post in posts:
+            title = post.get('title', '')
+            keywords = self.matcher.find(title)
+            context = self.classifier.classify(title) if keywords else DEFAULT_CONTEXT
+            aggregate.add(
+                title, keywords, context,
+                views=post.get('view_count') or 0,
+                likes=post.get('like_count', post.get('likes')) or 0,
+                weight=engagement_weight(post)
+            )
+
+        return aggregate
+
+    def daily_aggregate(self, day) -> TrendAggregate:
+        """
+        1日分の集計（その日に観測した投稿を URL ごとに1件、数値はその日の最新値）
 
-        return keyword_contexts
+        同じ日を何度求めても集計は1回だけ。ディスクキャッシュがあれば、
+        その日の元データが変わっていない限りタイトルを走査せずにそれを使う。
 
-    def analyze(self) -> Dict:
+        Args:
+            day: 日付（date または 'YYYY-MM-DD'）
         """
-        トレンド分析を実行
-
-        Returns:
-            分析結果の辞書
+        day = to_date(day)
+        aggregate = self._daily.get(day)
+        if aggregate is not None:
+            return aggregate
+
+        source_path = self.store.partition_path(day)
+        if self.aggregate_cache is None or not source_path.exists():
+            aggregate = self.aggregate(self.store.latest_posts(day, day))
+        else:
+            aggregate, source = self.aggregate_cache.get(day, str(source_path))
+            if aggregate is None:
+                aggregate = self.aggregate(self.store.latest_posts(day, day))
+                if source['digest'] is None:
+                    source['digest'] = file_digest(str(source_path))
+                self.aggregate_cache.put(day, source, aggregate)
+
+        self._daily[day] = aggregate
+        return aggregate
+
+    def window_aggregate(self, start, end) -> TrendAggregate:
+        """期間内の日ごとの集計を足し合わせる"""
+        start, end = to_date(start), to_date(end)
+        aggregate = TrendAggregate()
+        day = start
+        while day <= end:
+            aggregate.merge(self.daily_aggregate(day))
+            day += timedelta(days=1)
+        return aggregate
+
+    def analyze_window(self, days: int = 7, end=None) -> Dict:
         """
-        keyword_freq = self.extract_keywords()
-        keyword_contexts = self.extract_contexts()
+        直近 days 日間の分析と、キーワードごとの急上昇スコア
 
-        # ランキング作成
-        ranking = []
-        for keyword, count in keyword_freq.most_common(20):
-            contexts = keyword_contexts.get(keyword, [])
+        直近の期間・その前の期間・さらに前の期間のスコア（engagement_weight の合計）を比べ、
+        velocity = (今の期間 - 前の期間) / 日数、acceleration = velocity - 前の期間の velocity
+        を求める。どれも日ごとの集計を足し合わせるだけなので、投稿は各日1回しか走査しない。
 
-            # 文脈カテゴリごとに集計
-            context_summary = Counter([ctx[1] for ctx in contexts])
+        Args:
+            days: 期間の日数
+            end: 期間の最終日（省略時は今日）
 
-            # サンプルタイトル（最大5件）
-            sample_titles = [ctx[0] for ctx in contexts[:5]]
+        Returns:
+            分析結果の辞書（analyze の形式 + window / rising）
 
-            ranking.append({
+        Raises:
+            ValueError: days が1未満
+        """
+        if days < 1:
+            raise ValueError(f"days は1以上を指定してください: {days}")
+        end = to_date(end) or datetime.now().date()
+        span = timedelta(days=days)
+        start = end - span + timedelta(days=1)
+
+        current = self.window_aggregate(start, end)
+        previous = self.window_aggregate(start - span, end - span)
+        before_previous = self.window_aggregate(start - 2 * span, end - 2 * span)
+
+        daily = [(start + timedelta(days=i), self.daily_aggregate(start + timedelta(days=i)))
+                 for i in range(days)]
+
+        rising = []
+        for keyword in set(current.keyword_counts) | set(previous.keyword_counts):
+            score = current.scores[keyword]
+            previous_score = previous.scores[keyword]
+            velocity = (score - previous_score) / days
+            previous_velocity = (previous_score - before_previous.scores[keyword]) / days
+
+            rising.append({
                 'keyword': keyword,
-                'count': count,
-                'contexts': dict(context_summary),
-                'sample_titles': sample_titles
+                'count': current.keyword_counts[keyword],
+                'views': current.views[keyword],
+                'likes': current.likes[keyword],
+                'score': round(score, 2),
+                'previous_score': round(previous_score, 2),
+                'growth': round((score - previous_score) / previous_score, 3) if previous_score else None,
+                'velocity': round(velocity, 3),
+                'acceleration': round(velocity - previous_velocity, 3),
+                'series': [
+                    {
+                        'date': day.isoformat(),
+                        'count': aggregate.keyword_counts[keyword],
+                        'views': aggregate.views[keyword],
+                        'likes': aggregate.likes[keyword],
+                        'score': round(aggregate.scores[keyword], 2)
+                    }
+                    for day, aggregate in daily
+                ]
             })
 
+        rising.sort(key=lambda item: (-item['velocity'], -item['acceleration'], item['keyword']))
+
+        return {
+            'analyzed_at': datetime.now().isoformat(),
+            'total_posts': current.total_posts,
+            'window': {'start': start.isoformat(), 'end': end.isoformat(), 'days': days},
+            'ranking': current.ranking(),
+            'rising': rising[:RANKING_SIZE]
+        }
+
+    def analyze_stream(self, posts: Iterable[Dict]) -> Dict:
+        """
+        投稿をメモリに溜めずにトレンド分析を実行（集計は TrendAggregate に1件ずつ積み上げる）
+
+        Args:
+            posts: 投稿のイテラブル（iter_window / iter_jsonl など）
+
+        Returns:
+            分析結果の辞書（analyze と同じ形式）
+        """
+        aggregate = self.aggregate(posts)
+
         return {
             'analyzed_at': datetime.now().isoformat(),
-            'total_posts': len(self.posts),
-            'ranking': ranking
+            'total_posts': aggregate.total_posts,
+            'ranking': aggregate.ranking()
         }
 
+    def analyze(self) -> Dict:
+        """
+        トレンド分析を実行（読み込み済みの self.posts が対象）
+
+        Returns:
+            分析結果の辞書
+        """
+        return self.analyze_stream(self.posts)
+
 
 def save_analysis(analysis: Dict, output_dir: str = 'ideas/trend_analysis'):
     """
@@ -211,6 +713,23 @@ def save_analysis(analysis: Dict, output_dir: str = 'ideas/trend_analysis'):
         f.write(f'分析日時: {analysis["analyzed_at"]}\n')
         f.write(f'総投稿数: {analysis["total_posts"]}\n\n')
 
+        window = analysis.get('window')
+        if window:
+            f.write(f'集計期間: {window["start"]} 〜 {window["end"]}（{window["days"]}日間、日ごとの観測数の合計）\n\n')
+
+        if analysis.get('rising'):
+            f.write('## 急上昇キーワード\n\n')
+            f.write('前の期間からのスコア（再生数・いいね数で重み付け）の伸び順\n\n')
+            f.write('| # | キーワード | 件数 | スコア | 前期間 | 伸び率 | velocity | acceleration |\n')
+            f.write('|---|---|---|---|---|---|---|---|\n')
+            for i, item in enumerate(analysis['rising'], 1):
+                growth = '-' if item['growth'] is None else f'{item["growth"]:+.0%}'
+                f.write(
+                    f'| {i} | {item["keyword"]} | {item["count"]} | {item["score"]} | '
+                    f'{item["previous_score"]} | {growth} | {item["velocity"]:+} | {item["acceleration"]:+} |\n'
+                )
+            f.write('\n')
+
         f.write('## 固有名詞ランキング\n\n')
 
         for i, item in enumerate(analysis['ranking'], 1):
@@ -242,18 +761,51 @@ def save_analysis(analysis: Dict, output_dir: str = 'ideas/trend_analysis'):
     print(f'  Markdown: {md_file}')
 
 
+def positive_int(value: str) -> int:
+    """argparse 用: 1以上の整数"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"整数を指定してください: {value}") from None
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"1以上を指定してください: {value}")
+    return number
+
+
 def main():
     """メイン処理"""
+    parser = argparse.ArgumentParser(description='収集したタイトルのトレンド分析')
+    parser.add_argument('--since', help='ストアから読む開始日（YYYY-MM-DD、指定時は1件ずつ読みながら分析）')
+    parser.add_argument('--until', help='ストアから読む終了日（YYYY-MM-DD、デフォルト: 今日）')
+    parser.add_argument('--jsonl', nargs='+', help='分析する JSON Lines ファイル（1件ずつ読みながら分析）')
+    parser.add_argument('--days', type=positive_int, help='直近N日間を分析し、前のN日間からの急上昇スコアも出す')
+
+    args = parser.parse_args()
+
     print('Starting trend analysis...\n')
 
     analyzer = TrendAnalyzer()
-    analyzer.load_latest_data()
 
-    if not analyzer.posts:
-        print('No data found. Please run scraping scripts first.')
-        return
+    if args.days is not None:
+        analysis = analyzer.analyze_window(args.days, end=args.until)
+        if not analysis['total_posts']:
+            print('No data found. Please run scraping scripts first.')
+            return
+    elif args.jsonl or args.since:
+        posts = iter_jsonl(args.jsonl) if args.jsonl else analyzer.iter_window(args.since, args.until)
+        analysis = analyzer.analyze_stream(posts)
+        if not analysis['total_posts']:
+            print('No data found. Please run scraping scripts first.')
+            return
+    else:
+        analyzer.load_latest_data()
+
+        if not analyzer.posts:
+            print('No data found. Please run scraping scripts first.')
+            return
+
+        analysis = analyzer.analyze()
 
-    analysis = analyzer.analyze()
     save_analysis(analysis)
 
     print('\nDone!')
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+トレンド収集データの追記型ストア（日付パーティションの JSON Lines）
+
+収集した投稿を ideas/trend_data/store/YYYY-MM-DD.jsonl に1行1件で追記する。
+1日分の保存は追記だけなので、蓄積が何か月分になっても時間は変わらない。
+
+URL を主キーとして扱い、同じ URL が何度収集されても読み込み時に1件にまとめる
+（再生数・いいね数などは最後に観測した値で上書き = upsert）。
+日付の範囲を指定すれば、その期間のファイルだけを1行ずつ読む。
+
+使い方:
+    store = TrendStore()
+    store.append('youtube', videos)
+    posts = store.latest_posts(start=date(2025, 11, 1), end=date(2025, 11, 13))
+
+    # 以前の日次スナップショット（youtube_YYYY-MM-DD.json）を取り込む
+    python scripts/trend_collection/trend_store.py import ideas/trend_data/*.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import threading
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_STORE_DIR = 'ideas/trend_data/store'
+
+# 同じプロセス内から同じパーティションへ並行して追記するときのロック
+_append_lock = threading.Lock()
+
+
+def normalize_post(source: str, post: Dict, observed_at: str) -> Dict:
+    """
+    スクレイパーの投稿情報を保存用のレコードに変換
+
+    YouTube（like_count / comment_count）と Instagram（likes / comments）で
+    名前の違う数値を揃え、元のフィールドはそのまま残す。
+
+    Args:
+        source: 'youtube' / 'instagram'
+        post: スクレイパーの投稿情報
+        observed_at: 観測日時（ISO形式）
+
+    Returns:
+        保存用のレコード
+    """
+    return {
+        **post,
+        'source': source,
+        'observed_at': observed_at,
+        'view_count': post.get('view_count'),
+        'like_count': post.get('like_count', post.get('likes')),
+        'comment_count': post.get('comment_count', post.get('comments')),
+    }
+
+
+def to_date(value) -> Optional[date]:
+    """date / datetime / 'YYYY-MM-DD' を date に揃える"""
+    if value is None or type(value) is date:
+        return value
+    if isinstance(value, datetime):
+        return value.date()
+    return date.fromisoformat(str(value)[:10])
+
+
+class TrendStore:
+    """日付パーティションの JSON Lines ストア"""
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR):
+        """
+        Args:
+            store_dir: パーティションファイルを置くディレクトリ
+        """
+        self.store_dir = Path(store_dir)
+
+    def partition_path(self, day) -> Path:
+        """指定日のパーティションファイルのパス"""
+        return self.store_dir / f'{to_date(day).isoformat()}.jsonl'
+
+    def append(self, source: str, posts: List[Dict], collected_at: Optional[datetime] = None) -> Path:
+        """
+        投稿をその日のパーティションに追記
+
+        Args:
+            source: 'youtube' / 'instagram'
+            posts: 投稿情報のリスト
+            collected_at: 収集日時（省略時は現在時刻）
+
+        Returns:
+            追記したファイルのパス
+        """
+        collected_at = collected_at or datetime.now()
+        observed_at = collected_at.isoformat()
+        path = self.partition_path(collected_at)
+
+        lines = ''.join(
+            json.dumps(normalize_post(source, post, observed_at), ensure_ascii=False) + '\n'
+            for post in posts
+        )
+
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        with _append_lock:
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(lines)
+
+        return path
+
+    def dates(self, start=None, end=None) -> List[date]:
+        """
+        データのある日付の一覧（昇順）
+
+        Args:
+            start: 開始日（含む、省略時は制限なし）
+            end: 終了日（含む、省略時は制限なし）
+        """
+        start, end = to_date(start), to_date(end)
+        if not self.store_dir.exists():
+            return []
+
+        days = []
+        for path in self.store_dir.glob('*.jsonl'):
+            try:
+                day = date.fromisoformat(path.stem)
+            except ValueError:
+                continue
+            if (start is None or day >= start) and (end is None or day <= end):
+                days.append(day)
+
+        return sorted(days)
+
+    def iter_records(self, start=None, end=None, source: Optional[str] = None) -> Iterator[Dict]:
+        """
+        期間内の観測レコードを古い順に1件ずつ返す（同じ URL の重複を含む）
+
+        Args:
+            start: 開始日（含む）
+            end: 終了日（含む）
+            source: 'youtube' / 'instagram' で絞り込む場合に指定
+        """
+        for day in self.dates(start, end):
+            with open(self.partition_path(day), 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 書き込み途中で止まった最終行などは読み飛ばす
+                        continue
+                    if source is None or record.get('source') == source:
+                        yield record
+
+    def latest_posts(self, start=None, end=None, source: Optional[str] = None) -> List[Dict]:
+        """
+        期間内の投稿を URL ごとに1件にまとめて返す
+
+        数値やタイトルは最後に観測したレコードの値、detected_keywords は全観測の和、
+        first_seen / last_seen には最初と最後の観測日時が入る。並びは最初に観測した順。
+
+        Args:
+            start: 開始日（含む）
+            end: 終了日（含む）
+            source: 'youtube' / 'instagram' で絞り込む場合に指定
+
+        Returns:
+            投稿情報のリスト
+        """
+        posts: Dict[str, Dict] = {}
+
+        for record in self.iter_records(start, end, source):
+            url = record.get('url')
+            if not url:
+                continue
+
+            current = posts.get(url)
+            if current is None:
+                posts[url] = {**record, 'first_seen': record['observed_at'], 'last_seen': record['observed_at']}
+                continue
+
+            keywords = list(current.get('detected_keywords', []))
+            for keyword in record.get('detected_keywords', []):
+                if keyword not in keywords:
+                    keywords.append(keyword)
+
+            current.update(record)
+            current['detected_keywords'] = keywords
+            current['last_seen'] = record['observed_at']
+
+        return list(posts.values())
+
+    def import_snapshot(self, json_path) -> int:
+        """
+        以前の日次スナップショット（youtube_YYYY-MM-DD.json など）を取り込む
+
+        Args:
+            json_path: スナップショットのパス
+
+        Returns:
+            取り込んだ件数
+        """
+        with open(json_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        source = 'instagram' if data.get('source') == 'instagram' else 'youtube'
+        collected_at = datetime.fromisoformat(data['collected_at'])
+        posts = data.get('posts', [])
+
+        self.append(source, posts, collected_at)
+        return len(posts)
+
+
+def main():
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description='トレンド収集データのストア')
+    parser.add_argument('--store-dir', default=DEFAULT_STORE_DIR, help='ストアのディレクトリ')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = subparsers.add_parser('import', help='日次スナップショット（JSON）を取り込む')
+    import_parser.add_argument('paths', nargs='+', help='youtube_YYYY-MM-DD.json / instagram_YYYY-MM-DD.json')
+
+    stats_parser = subparsers.add_parser('stats', help='日付ごとの件数を表示')
+    stats_parser.add_argument('--since', help='開始日（YYYY-MM-DD）')
+    stats_parser.add_argument('--until', help='終了日（YYYY-MM-DD）')
+
+    args = parser.parse_args()
+    store = TrendStore(args.store_dir)
+
+    if args.command == 'import':
+        for path in args.paths:
+            if not os.path.exists(path):
+                print(f'Not found: {path}')
+                continue
+            count = store.import_snapshot(path)
+            print(f'Imported: {path} ({count} posts)')
+        return
+
+    days = store.dates(args.since, args.until)
+    if not days:
+        print('No data found.')
+        sys.exit(1)
+
+    for day in days:
+        records = sum(1 for _ in store.iter_records(day, day))
+        unique = len(store.latest_posts(day, day))
+        print(f'{day.isoformat()}  records: {records:5}  unique urls: {unique:5}')
+
+    print(f'\nTotal unique urls: {len(store.latest_posts(args.since, args.until))}')
+
+
+if __name__ == '__main__':
+    main()
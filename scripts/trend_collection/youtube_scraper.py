@@ -5,13 +5,15 @@ AI関連のショート動画タイトルを収集する
 """
 
 import os
-import json
-from datetime import datetime
-from typing import List, Dict
+import threading
+from typing import List, Dict, Optional
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from dotenv import load_dotenv
 
+from parallel_collect import RateLimiter, collect_concurrently, setting
+from trend_store import TrendStore
+
 # 環境変数を読み込み
 load_dotenv()
 
@@ -36,30 +38,62 @@ TARGET_KEYWORDS = [
 ]
 
 
+# videos.list の id に一度に渡せる最大件数
+VIDEOS_LIST_MAX_IDS = 50
+
+# 同時に実行する検索の数（環境変数 YOUTUBE_MAX_WORKERS で変更可）
+DEFAULT_MAX_WORKERS = 4
+# YouTube Data API へのリクエスト数の上限（リクエスト/分、0で無制限。環境変数 YOUTUBE_REQUESTS_PER_MINUTE で変更可）
+REQUESTS_PER_MINUTE = 60.0
+
+
 class YouTubeScraper:
     """YouTube Shorts のタイトルを収集するクラス"""
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, youtube=None, requests_per_minute: Optional[float] = None):
         """
         Args:
             api_key: YouTube Data API v3 の API キー
+            youtube: discovery クライアント（テスト用のフェイクを渡す場合。省略時は build で作成）
+            requests_per_minute: API リクエスト数の上限（リクエスト/分、0で無制限。
+                省略時は YOUTUBE_REQUESTS_PER_MINUTE）
         """
-        self.youtube = build('youtube', 'v3', developerKey=api_key)
-
-    def search_shorts(self, keyword: str, max_results: int = 50) -> List[Dict]:
+        if requests_per_minute is None:
+            requests_per_minute = setting('YOUTUBE_REQUESTS_PER_MINUTE', REQUESTS_PER_MINUTE)
+        self.api_key = api_key
+        self.injected = youtube is not None
+        self.youtube = youtube or build('youtube', 'v3', developerKey=api_key)
+        self.rate_limiter = RateLimiter(requests_per_minute)
+
+        # build で作ったクライアント（httplib2）はスレッドセーフではないので、スレッドごとに作る
+        self.local = threading.local()
+        self.local.youtube = self.youtube
+
+    def _client(self):
+        """このスレッド用の discovery クライアント"""
+        youtube = getattr(self.local, 'youtube', None)
+        if youtube is None:
+            youtube = self.youtube if self.injected else build('youtube', 'v3', developerKey=self.api_key)
+            self.local.youtube = youtube
+        return youtube
+
+    def _search(self, keyword: str, max_results: int = 50) -> List[Dict]:
         """
-        指定キーワードでショート動画を検索
+        指定キーワードでショート動画を検索（統計情報は含まない）
 
         Args:
             keyword: 検索キーワード
             max_results: 取得する最大件数
 
         Returns:
-            動画情報のリスト
+            動画情報のリスト（view_count などは未設定）
         """
+        print(f'Searching for: {keyword}')
+
         try:
             # Shorts は通常60秒以下の動画
-            request = self.youtube.search().list(
+            self.rate_limiter.acquire()
+            request = self._client().search().list(
                 part='snippet',
                 q=keyword,
                 type='video',
@@ -71,88 +105,133 @@ class YouTubeScraper:
 
             response = request.execute()
 
-            videos = []
-            for item in response.get('items', []):
-                video_id = item['id']['videoId']
-                snippet = item['snippet']
-
-                # 動画の詳細情報を取得（視聴回数など）
-                video_details = self._get_video_details(video_id)
-
-                videos.append({
-                    'title': snippet['title'],
-                    'url': f'https://youtube.com/shorts/{video_id}',
-                    'published_at': snippet['publishedAt'],
-                    'channel_title': snippet['channelTitle'],
-                    'view_count': video_details.get('view_count', 0),
-                    'like_count': video_details.get('like_count', 0),
-                    'comment_count': video_details.get('comment_count', 0),
-                    'detected_keywords': [keyword]
-                })
-
-            return videos
-
         except HttpError as e:
             print(f'YouTube API Error: {e}')
             return []
 
-    def _get_video_details(self, video_id: str) -> Dict:
+        videos = []
+        for item in response.get('items', []):
+            video_id = item['id']['videoId']
+            snippet = item['snippet']
+
+            videos.append({
+                'video_id': video_id,
+                'title': snippet['title'],
+                'url': f'https://youtube.com/shorts/{video_id}',
+                'published_at': snippet['publishedAt'],
+                'channel_title': snippet['channelTitle'],
+                'detected_keywords': [keyword]
+            })
+
+        return videos
+
+    def _get_video_statistics(self, video_ids: List[str]) -> Dict[str, Dict]:
         """
-        動画の詳細情報を取得
+        複数動画の統計情報をまとめて取得（videos.list を最大50件ずつ呼ぶ）
 
         Args:
-            video_id: 動画ID
+            video_ids: 動画IDのリスト
 
         Returns:
-            詳細情報の辞書
+            {動画ID: 詳細情報の辞書}（削除済みの動画や、失敗したまとまりの動画は含まない）
         """
-        try:
-            request = self.youtube.videos().list(
+        statistics = {}
+        unique_ids = list(dict.fromkeys(video_ids))
+
+        for start in range(0, len(unique_ids), VIDEOS_LIST_MAX_IDS):
+            batch = unique_ids[start:start + VIDEOS_LIST_MAX_IDS]
+            # id を指定する場合 maxResults は併用できない（1回で最大50件返る）
+            self.rate_limiter.acquire()
+            request = self._client().videos().list(
                 part='statistics',
-                id=video_id
+                id=','.join(batch)
             )
 
-            response = request.execute()
+            try:
+                response = request.execute()
+            except HttpError as e:
+                # クォータ切れなどで途中から失敗しても、検索結果は統計なしで残す
+                print(f'YouTube API Error (videos.list, {len(batch)} ids): {e}')
+                continue
 
-            if response.get('items'):
-                stats = response['items'][0]['statistics']
-                return {
+            for item in response.get('items', []):
+                stats = item.get('statistics', {})
+                statistics[item['id']] = {
                     'view_count': int(stats.get('viewCount', 0)),
                     'like_count': int(stats.get('likeCount', 0)),
                     'comment_count': int(stats.get('commentCount', 0))
                 }
 
-            return {}
+        return statistics
 
-        except HttpError:
-            return {}
+    def _attach_statistics(self, videos: List[Dict]) -> List[Dict]:
+        """
+        動画情報に統計情報を付けて、保存用の形式に整える
+
+        Args:
+            videos: _search の結果
 
-    def collect_all_keywords(self, max_results_per_keyword: int = 30) -> List[Dict]:
+        Returns:
+            view_count などを含む動画情報のリスト（統計を取れなかった動画は None。0再生と区別する）
         """
-        すべてのターゲットキーワードで検索を実行
+        statistics = self._get_video_statistics([video['video_id'] for video in videos])
+
+        results = []
+        for video in videos:
+            details = statistics.get(video['video_id'], {})
+            results.append({
+                'title': video['title'],
+                'url': video['url'],
+                'published_at': video['published_at'],
+                'channel_title': video['channel_title'],
+                'view_count': details.get('view_count'),
+                'like_count': details.get('like_count'),
+                'comment_count': details.get('comment_count'),
+                'detected_keywords': video['detected_keywords']
+            })
+
+        return results
+
+    def search_shorts(self, keyword: str, max_results: int = 50) -> List[Dict]:
+        """
+        指定キーワードでショート動画を検索
 
         Args:
-            max_results_per_keyword: キーワードごとの最大取得件数
+            keyword: 検索キーワード
+            max_results: 取得する最大件数
 
         Returns:
-            すべての動画情報
+            動画情報のリスト
         """
-        all_videos = []
+        return self._attach_statistics(self._search(keyword, max_results))
 
-        for keyword in TARGET_KEYWORDS:
-            print(f'Searching for: {keyword}')
-            videos = self.search_shorts(keyword, max_results_per_keyword)
-            all_videos.extend(videos)
-            print(f'  Found: {len(videos)} videos')
+    def collect_all_keywords(self, max_results_per_keyword: int = 30,
+                             max_workers: Optional[int] = None) -> List[Dict]:
+        """
+        すべてのターゲットキーワードで検索を実行
 
-        # 重複を削除（URLでユニーク化）
-        unique_videos = []
-        seen_urls = set()
+        検索はキーワードごとに並列で実行し（レート制限付き）、終わったものから
+        重複を除いてマージする。統計情報は最後にまとめて取得する
+        （16キーワード × 30件でも videos.list は10回程度で済む）。
 
-        for video in all_videos:
-            if video['url'] not in seen_urls:
-                unique_videos.append(video)
-                seen_urls.add(video['url'])
+        Args:
+            max_results_per_keyword: キーワードごとの最大取得件数
+            max_workers: 同時に実行する検索の数（1なら順番に実行、省略時は YOUTUBE_MAX_WORKERS）
+
+        Returns:
+            すべての動画情報
+        """
+        if max_workers is None:
+            max_workers = setting('YOUTUBE_MAX_WORKERS', DEFAULT_MAX_WORKERS)
+        unique_videos = collect_concurrently(
+            TARGET_KEYWORDS,
+            lambda keyword: self._search(keyword, max_results_per_keyword),
+            max_workers=max_workers,
+            unit='videos'
+        )
+
+        # 統計情報をまとめて取得
+        unique_videos = self._attach_statistics(unique_videos)
 
         print(f'\nTotal unique videos: {len(unique_videos)}')
         return unique_videos
@@ -160,28 +239,16 @@ class YouTubeScraper:
 
 def save_results(videos: List[Dict], output_dir: str = 'ideas/trend_data'):
     """
-    結果をJSONファイルに保存
+    結果をトレンドストア（output_dir/store/YYYY-MM-DD.jsonl）に追記
 
     Args:
         videos: 動画情報のリスト
         output_dir: 保存先ディレクトリ
     """
-    os.makedirs(output_dir, exist_ok=True)
-
-    today = datetime.now().strftime('%Y-%m-%d')
-    filename = os.path.join(output_dir, f'youtube_{today}.json')
-
-    data = {
-        'collected_at': datetime.now().isoformat(),
-        'source': 'youtube_shorts',
-        'total_count': len(videos),
-        'posts': videos
-    }
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    store = TrendStore(os.path.join(output_dir, 'store'))
+    filename = store.append('youtube', videos)
 
-    print(f'\nResults saved to: {filename}')
+    print(f'\nResults saved to: {filename} ({len(videos)} records)')
 
 
 def main():
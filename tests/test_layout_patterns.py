@@ -0,0 +1,59 @@
+"""
+templates/layout_patterns.yaml のコマ配置（layout ブロック）のテスト
+
+パネルモードの合成は layout.rows を使うので、全パターンに layout があり、
+total_panels のコマを1回ずつ、重ならずにページ内へ並べていることを確かめる。
+
+実行:
+    python -m pytest tests/
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from compositor import layout_from_pattern, pattern_rows
+from template_registry import get_layout_patterns
+
+PATTERNS = get_layout_patterns()
+
+
+@pytest.mark.parametrize('name', sorted(PATTERNS))
+def test_pattern_has_layout_rows_for_every_panel(name):
+    pattern = PATTERNS[name]
+
+    assert pattern.get('layout', {}).get('rows'), f"{name} に layout.rows がありません"
+    numbers = sorted(number for row in pattern_rows(pattern) for number in row['panels'])
+    assert numbers == list(range(1, pattern['total_panels'] + 1))
+
+
+@pytest.mark.parametrize('name', sorted(PATTERNS))
+def test_layout_panels_fit_page_without_overlap(name):
+    layout = layout_from_pattern(PATTERNS[name])
+
+    rects = layout.panels
+    for rect in rects:
+        assert rect.width > 0 and rect.height > 0
+        assert 0 <= rect.x and rect.x + rect.width <= layout.width
+        assert 0 <= rect.y and rect.y + rect.height <= layout.height
+    for a in rects:
+        for b in rects:
+            if a is not b:
+                assert (a.x + a.width <= b.x or b.x + b.width <= a.x or
+                        a.y + a.height <= b.y or b.y + b.height <= a.y)
+
+
+def test_pattern_rows_rejects_missing_panel():
+    pattern = {'total_panels': 3, 'layout': {'rows': [{'panels': [1]}, {'panels': [3]}]}}
+
+    with pytest.raises(ValueError):
+        pattern_rows(pattern)
+
+
+def test_pattern_rows_rejects_mismatched_widths():
+    pattern = {'total_panels': 2, 'layout': {'rows': [{'panels': [1, 2], 'widths': [1]}]}}
+
+    with pytest.raises(ValueError):
+        pattern_rows(pattern)
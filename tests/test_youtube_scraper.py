@@ -0,0 +1,151 @@
+"""
+YouTubeScraper の統計情報のまとめ取得のテスト
+
+YouTube Data API の discovery クライアントの代わりに FakeYouTube を渡して、
+ネットワークに出ずに videos.list の呼び出し方（50件ずつ・重複なし）を確かめる。
+
+実行:
+    python -m pytest tests/
+"""
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from googleapiclient.errors import HttpError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts" / "trend_collection"))
+
+import youtube_scraper
+from youtube_scraper import VIDEOS_LIST_MAX_IDS, YouTubeScraper
+
+
+class FakeRequest:
+    """discovery の HttpRequest の代わり（execute で結果を返すか例外を投げる）"""
+
+    def __init__(self, result):
+        self.result = result
+
+    def execute(self):
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class FakeYouTube:
+    """YouTube Data API v3 の discovery クライアントのフェイク
+
+    search().list はキーワードごとに用意した動画IDを返し、videos().list は
+    渡された id の統計情報を返す。呼び出しの引数は search_calls / videos_calls に記録する。
+    """
+
+    def __init__(self, results_by_keyword, fail_videos_calls=()):
+        """
+        Args:
+            results_by_keyword: {キーワード: [動画ID, ...]}
+            fail_videos_calls: HttpError にする videos.list の呼び出し番号（0始まり）
+        """
+        self.results_by_keyword = results_by_keyword
+        self.fail_videos_calls = set(fail_videos_calls)
+        self.search_calls = []
+        self.videos_calls = []
+
+    def search(self):
+        return SimpleNamespace(list=self._search_list)
+
+    def videos(self):
+        return SimpleNamespace(list=self._videos_list)
+
+    def _search_list(self, **kwargs):
+        self.search_calls.append(kwargs)
+        video_ids = self.results_by_keyword.get(kwargs['q'], [])[:kwargs.get('maxResults', 5)]
+        return FakeRequest({'items': [
+            {
+                'id': {'videoId': video_id},
+                'snippet': {
+                    'title': f'title {video_id}',
+                    'publishedAt': '2025-11-13T00:00:00Z',
+                    'channelTitle': 'channel',
+                },
+            }
+            for video_id in video_ids
+        ]})
+
+    def _videos_list(self, **kwargs):
+        self.videos_calls.append(kwargs)
+        if len(self.videos_calls) - 1 in self.fail_videos_calls:
+            return FakeRequest(HttpError(SimpleNamespace(status=403, reason='quotaExceeded'), b'quota'))
+        # 実際の API と同じく、id と maxResults は併用できない
+        if 'maxResults' in kwargs:
+            return FakeRequest(HttpError(SimpleNamespace(status=400, reason='Bad Request'), b'maxResults'))
+        ids = kwargs['id'].split(',')
+        if len(ids) > VIDEOS_LIST_MAX_IDS:
+            return FakeRequest(HttpError(SimpleNamespace(status=400, reason='Bad Request'), b'too many ids'))
+        return FakeRequest({'items': [
+            {
+                'id': video_id,
+                'statistics': {'viewCount': str(int(video_id[1:]) * 10), 'likeCount': '3', 'commentCount': '1'},
+            }
+            for video_id in ids
+        ]})
+
+
+@pytest.fixture
+def keywords(monkeypatch):
+    """5キーワード × 30件、隣り合うキーワードで10件ずつ重複（ユニークは110件）"""
+    results = {
+        f'keyword{k}': [f'v{k * 20 + i:03d}' for i in range(30)]
+        for k in range(5)
+    }
+    monkeypatch.setattr(youtube_scraper, 'TARGET_KEYWORDS', list(results))
+    return results
+
+
+def make_scraper(fake):
+    return YouTubeScraper('dummy-key', youtube=fake, requests_per_minute=0)
+
+
+def test_collect_all_keywords_batches_statistics_by_50_unique_ids(keywords):
+    fake = FakeYouTube(keywords)
+
+    videos = make_scraper(fake).collect_all_keywords(max_results_per_keyword=30, max_workers=2)
+
+    unique_ids = list(dict.fromkeys(video_id for ids in keywords.values() for video_id in ids))
+    assert len(unique_ids) == 110
+    assert len(fake.search_calls) == len(keywords)
+
+    # 110件 → 50 + 50 + 10 の3回。maxResults は付けない
+    assert [len(call['id'].split(',')) for call in fake.videos_calls] == [50, 50, 10]
+    assert all('maxResults' not in call for call in fake.videos_calls)
+    requested = [video_id for call in fake.videos_calls for video_id in call['id'].split(',')]
+    assert requested == unique_ids
+
+    assert len(videos) == 110
+    by_url = {video['url']: video for video in videos}
+    assert by_url['https://youtube.com/shorts/v025']['view_count'] == 250
+    assert all(video['like_count'] == 3 for video in videos)
+
+
+def test_search_shorts_uses_one_videos_list_call(keywords):
+    fake = FakeYouTube(keywords)
+
+    videos = make_scraper(fake).search_shorts('keyword0', max_results=30)
+
+    assert len(videos) == 30
+    assert len(fake.videos_calls) == 1
+    assert videos[0]['view_count'] == 0 * 10
+    assert videos[-1]['view_count'] == 29 * 10
+
+
+def test_failed_statistics_batch_keeps_videos_without_statistics(keywords):
+    # 2回目の videos.list（51〜100件目）だけクォータ切れ
+    fake = FakeYouTube(keywords, fail_videos_calls=[1])
+
+    videos = make_scraper(fake).collect_all_keywords(max_results_per_keyword=30, max_workers=1)
+
+    assert len(fake.videos_calls) == 3
+    assert len(videos) == 110
+    missing = [video for video in videos if video['view_count'] is None]
+    assert len(missing) == 50
+    assert all(video['like_count'] is None and video['comment_count'] is None for video in missing)
+    assert all(video['view_count'] is not None for video in videos if video not in missing)
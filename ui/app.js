@@ -1,18 +1,19 @@
 // Instagram Manga Generator - Main App Logic
 
-const API_KEY_STORAGE = 'instagram_manga_api_key';
-const GEMINI_API_URL = 'https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-image-preview:generateContent';
+// ローカル生成サーバー（scripts/generation_server.py）。同じオリジンで配信している場合は空のまま
+// APIキーはサーバー側の .env にだけ置き、ブラウザには持たせない
+const SERVER_URL = '';
+const HEALTH_CHECK_INTERVAL = 10000;
 
 // DOM Elements
-const apiKeyInput = document.getElementById('apiKey');
-const saveApiKeyBtn = document.getElementById('saveApiKey');
-const clearApiKeyBtn = document.getElementById('clearApiKey');
-const apiStatus = document.getElementById('apiStatus');
+const serverStatus = document.getElementById('serverStatus');
+const serverInfo = document.getElementById('serverInfo');
 const yamlInput = document.getElementById('yamlInput');
 const yamlStatus = document.getElementById('yamlStatus');
 const loadExampleBtn = document.getElementById('loadExample');
 const generateBtn = document.getElementById('generateBtn');
 const loadingIndicator = document.getElementById('loadingIndicator');
+const progressText = document.getElementById('progressText');
 const resultSection = document.getElementById('resultSection');
 const resultImage = document.getElementById('resultImage');
 const downloadBtn = document.getElementById('downloadBtn');
@@ -21,19 +22,18 @@ const errorMessage = document.getElementById('errorMessage');
 const closeErrorBtn = document.getElementById('closeError');
 
 // State
-let currentApiKey = null;
+let serverReady = false;
 let currentYamlData = null;
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
-    loadApiKey();
+    checkServer();
+    setInterval(checkServer, HEALTH_CHECK_INTERVAL);
     setupEventListeners();
 });
 
 // Event Listeners
 function setupEventListeners() {
-    saveApiKeyBtn.addEventListener('click', saveApiKey);
-    clearApiKeyBtn.addEventListener('click', clearApiKey);
     loadExampleBtn.addEventListener('click', loadExampleYaml);
     yamlInput.addEventListener('input', validateYaml);
     generateBtn.addEventListener('click', generateManga);
@@ -43,48 +43,28 @@ function setupEventListeners() {
     });
 }
 
-// API Key Management
-function loadApiKey() {
-    const savedKey = localStorage.getItem(API_KEY_STORAGE);
-    if (savedKey) {
-        currentApiKey = savedKey;
-        apiKeyInput.value = savedKey;
-        updateApiStatus(true);
-    } else {
-        updateApiStatus(false);
-    }
-    updateGenerateButton();
-}
-
-function saveApiKey() {
-    const key = apiKeyInput.value.trim();
-    if (!key) {
-        showError('APIキーを入力してください');
-        return;
+// Server Status
+async function checkServer() {
+    try {
+        const response = await fetch(`${SERVER_URL}/api/health`);
+        const health = await response.json();
+        serverReady = response.ok;
+        serverInfo.textContent = `モデル: ${health.model} / 同時生成: ${health.workers}ページ / 待ち: ${health.pending}件`;
+    } catch (e) {
+        serverReady = false;
+        serverInfo.textContent = '生成サーバーを起動してください: python scripts/generation_server.py';
     }
-    localStorage.setItem(API_KEY_STORAGE, key);
-    currentApiKey = key;
-    updateApiStatus(true);
+    updateServerStatus(serverReady);
     updateGenerateButton();
-    showSuccess('APIキーを保存しました');
 }
 
-function clearApiKey() {
-    localStorage.removeItem(API_KEY_STORAGE);
-    currentApiKey = null;
-    apiKeyInput.value = '';
-    updateApiStatus(false);
-    updateGenerateButton();
-    showSuccess('APIキーをクリアしました');
-}
-
-function updateApiStatus(connected) {
+function updateServerStatus(connected) {
     if (connected) {
-        apiStatus.textContent = '設定済み';
-        apiStatus.className = 'status connected';
+        serverStatus.textContent = '接続中';
+        serverStatus.className = 'status connected';
     } else {
-        apiStatus.textContent = '未設定';
-        apiStatus.className = 'status disconnected';
+        serverStatus.textContent = '未接続';
+        serverStatus.className = 'status disconnected';
     }
 }
 
@@ -125,7 +105,7 @@ function validateYaml() {
 }
 
 function updateGenerateButton() {
-    generateBtn.disabled = !(currentApiKey && currentYamlData);
+    generateBtn.disabled = !(serverReady && currentYamlData) || loadingIndicator.style.display === 'block';
 }
 
 // Load Example YAML
@@ -230,137 +210,10 @@ function loadExampleYaml() {
     validateYaml();
 }
 
-// Convert YAML to Prompt (ported from Python)
-function yamlToPrompt(comicPageData) {
-    const language = comicPageData.language || 'Japanese';
-    const style = comicPageData.style || 'japanese manga';
-    const colorMode = comicPageData.color_mode || 'カラー';
-    const aspectRatio = comicPageData.aspect_ratio || '1:1.4';
-    const instructions = comicPageData.instructions || '';
-    const layoutConstraints = comicPageData.layout_constraints || '';
-
-    // Character descriptions
-    const characterInfos = comicPageData.character_infos || [];
-    const charDescriptions = characterInfos.map(char =>
-        `Character: ${char.name}\n${char.base_prompt}`
-    ).join('\n\n');
-
-    // Panel descriptions
-    const panels = comicPageData.panels || [];
-    const panelDescriptions = panels.map(panel => {
-        const panelNum = panel.number;
-        const position = panel.page_position || 'middle';
-        const background = panel.background || '';
-        const description = panel.description || '';
-
-        // Character details
-        const characters = panel.characters || [];
-        const charDetails = characters.map(char => {
-            const charName = char.name;
-            const emotion = char.emotion || '';
-            const facing = char.facing || '';
-            const shot = char.shot || '';
-            const pose = char.pose || '';
-
-            // Dialogue
-            const lines = char.lines || [];
-            const dialogue = lines.length > 0 ? lines[0].text : '';
-
-            return `  - Character: ${charName}
-    Position: ${char.panel_position || 'center'}
-    Emotion: ${emotion}
-    Facing: ${facing}
-    Shot type: ${shot}
-    Pose: ${pose}
-    Dialogue: "${dialogue}"`;
-        }).join('\n');
-
-        return `Panel ${panelNum} (位置: ${position}):
-  Background: ${background}
-  Scene description: ${description}
-  Characters:
-${charDetails}
-  Camera angle: ${panel.camera_angle || 'medium shot'}`;
-    }).join('\n\n');
-
-    // Build full prompt
-    const fullPrompt = `Generate a complete manga page following these specifications:
-
-=== LAYOUT CONSTRAINTS ===
-${layoutConstraints}
-
-=== STYLE SPECIFICATIONS ===
-- Language: ${language}
-- Art style: ${style}
-- Color mode: ${colorMode}
-- Aspect ratio: ${aspectRatio}
-- Writing mode: ${comicPageData['writing-mode'] || 'vertical-rl'}
-
-=== INSTRUCTIONS ===
-${instructions}
-
-=== CHARACTER DESIGNS ===
-${charDescriptions}
-
-=== PANEL DETAILS ===
-${panelDescriptions}
-
-IMPORTANT:
-- Use the attached character reference images to maintain consistent character designs
-- Follow the layout constraints strictly
-- Include speech bubbles with the specified dialogue in Japanese
-- Maintain the aspect ratio of 1:1.4 (width:height)
-- Generate the complete page as a single image with all panels`;
-
-    return fullPrompt;
-}
-
-// Load Character Images
-async function loadCharacterImages(characterInfos) {
-    const images = [];
-
-    for (const charInfo of characterInfos) {
-        const charName = charInfo.name.toUpperCase().replace(/\s+/g, '');
-        const imagePath = `assets/characters/${charName}_ORIGIN.png`;
-
-        try {
-            const response = await fetch(imagePath);
-            if (!response.ok) {
-                console.warn(`Character image not found: ${imagePath}`);
-                continue;
-            }
-
-            const blob = await response.blob();
-            const base64 = await blobToBase64(blob);
-
-            images.push({
-                inlineData: {
-                    mimeType: 'image/png',
-                    data: base64.split(',')[1] // Remove data:image/png;base64, prefix
-                }
-            });
-        } catch (e) {
-            console.warn(`Failed to load character image: ${charName}`, e);
-        }
-    }
-
-    return images;
-}
-
-// Helper: Convert Blob to Base64
-function blobToBase64(blob) {
-    return new Promise((resolve, reject) => {
-        const reader = new FileReader();
-        reader.onloadend = () => resolve(reader.result);
-        reader.onerror = reject;
-        reader.readAsDataURL(blob);
-    });
-}
-
-// Generate Manga
+// Generate Manga (ローカル生成サーバーにジョブを投入し、進捗を SSE で受け取る)
 async function generateManga() {
-    if (!currentApiKey || !currentYamlData) {
-        showError('APIキーとYAMLを設定してください');
+    if (!serverReady || !currentYamlData) {
+        showError('生成サーバーに接続できないか、YAMLが正しくありません');
         return;
     }
 
@@ -372,85 +225,80 @@ async function generateManga() {
         // Show loading
         loadingIndicator.style.display = 'block';
         generateBtn.disabled = true;
+        setProgress('ジョブを投入中...');
 
-        const comicPage = currentYamlData.comic_page;
-
-        // Generate prompt
-        console.log('Generating prompt...');
-        const prompt = yamlToPrompt(comicPage);
-        console.log('Prompt length:', prompt.length);
-
-        // Load character images
-        console.log('Loading character images...');
-        const characterImages = await loadCharacterImages(comicPage.character_infos || []);
-        console.log('Loaded', characterImages.length, 'character images');
-
-        // Build request body
-        const parts = [
-            ...characterImages,
-            { text: prompt }
-        ];
-
-        const requestBody = {
-            contents: [{
-                role: 'user',
-                parts: parts
-            }]
-        };
-
-        // Call Gemini API
-        console.log('Calling Gemini API...');
-        const response = await fetch(`${GEMINI_API_URL}?key=${currentApiKey}`, {
+        const response = await fetch(`${SERVER_URL}/api/jobs`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
             },
-            body: JSON.stringify(requestBody)
+            body: JSON.stringify({ yaml: yamlInput.value })
         });
 
+        const job = await response.json();
         if (!response.ok) {
-            const errorData = await response.json();
-            throw new Error(`API Error: ${errorData.error?.message || response.statusText}`);
+            throw new Error(job.error || response.statusText);
         }
 
-        const data = await response.json();
-        console.log('API Response received');
-
-        // Extract image from response
-        if (data.candidates && data.candidates.length > 0) {
-            const candidate = data.candidates[0];
-
-            if (candidate.content && candidate.content.parts) {
-                for (const part of candidate.content.parts) {
-                    if (part.inlineData && part.inlineData.data) {
-                        console.log('Image data found!');
-
-                        // Display image
-                        const mimeType = part.inlineData.mimeType || 'image/png';
-                        const imageData = part.inlineData.data;
-                        const imageUrl = `data:${mimeType};base64,${imageData}`;
-
-                        resultImage.src = imageUrl;
-                        resultSection.style.display = 'block';
-
-                        showSuccess('漫画の生成に成功しました！');
-                        return;
-                    }
-                }
-            }
+        console.log('Job queued:', job.id);
+        const result = await watchJob(job.id);
+        if (result.status !== 'done' || result.outputs.length === 0) {
+            throw new Error(result.error || '画像が生成されませんでした');
         }
 
-        throw new Error('API response did not contain image data');
+        // Display image
+        resultImage.src = `${SERVER_URL}${result.outputs[0]}`;
+        resultSection.style.display = 'block';
+        showSuccess('漫画の生成に成功しました！');
 
     } catch (e) {
         console.error('Generation error:', e);
         showError(`生成エラー: ${e.message}`);
     } finally {
         loadingIndicator.style.display = 'none';
-        generateBtn.disabled = false;
+        updateGenerateButton();
     }
 }
 
+// Watch Job Progress (終わったら最終状態を返す)
+function watchJob(jobId) {
+    return new Promise((resolve, reject) => {
+        const source = new EventSource(`${SERVER_URL}/api/jobs/${jobId}/events`);
+        const finish = async () => {
+            source.close();
+            try {
+                const response = await fetch(`${SERVER_URL}/api/jobs/${jobId}`);
+                resolve(await response.json());
+            } catch (e) {
+                reject(e);
+            }
+        };
+
+        source.addEventListener('queued', () => setProgress('順番待ち...'));
+        source.addEventListener('running', () => setProgress('生成中... (数十秒かかる場合があります)'));
+        source.addEventListener('references', (e) => {
+            setProgress(`参照画像 ${JSON.parse(e.data).count} 枚を添付して生成中...`);
+        });
+        source.addEventListener('candidate', (e) => {
+            const data = JSON.parse(e.data);
+            setProgress(`候補 ${data.index + 1}: ${data.status}`);
+        });
+        source.addEventListener('panel', (e) => {
+            const data = JSON.parse(e.data);
+            setProgress(`コマ ${data.number}: ${data.status}`);
+        });
+        ['done', 'failed', 'cancelled'].forEach((name) => source.addEventListener(name, finish));
+        source.onerror = () => {
+            // 接続が切れた場合は EventSource が自動で再接続する（Last-Event-ID の続きから）
+            console.warn('Progress stream interrupted, reconnecting...');
+        };
+    });
+}
+
+function setProgress(message) {
+    progressText.textContent = message;
+}
+
 // Download Image
 function downloadImage() {
     const link = document.createElement('a');